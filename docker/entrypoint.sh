@@ -57,6 +57,12 @@ run_migrations() {
     python manage.py migrate --noinput
 }
 
+# Function to backfill pre-rendered markdown HTML (only stale rows)
+render_markdown() {
+    echo "Re-rendering stale markdown HTML..."
+    python manage.py rerender_markdown
+}
+
 # Function to collect static files
 collect_static() {
     echo "Collecting static files..."
@@ -74,6 +80,9 @@ wait_for_db
 # Run migrations
 run_migrations
 
+# Backfill markdown HTML rendered by an older renderer
+render_markdown
+
 # Collect static files
 collect_static
 
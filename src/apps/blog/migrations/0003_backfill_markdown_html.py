@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from core.models import backfill_markdown_html
+
+# Markdown source -> HTML column of each model, as in ``markdown_fields``.
+MARKDOWN_FIELDS = {
+    'BlogPost': {'content': 'content_html'},
+}
+
+
+def backfill(apps, schema_editor):
+    # Rows saved before the HTML columns existed hold '' until rendered.
+    for model_name, markdown_fields in MARKDOWN_FIELDS.items():
+        backfill_markdown_html(apps.get_model('blog', model_name), markdown_fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_blogpost_content_html_blogpost_markdown_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
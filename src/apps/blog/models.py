@@ -1,11 +1,16 @@
 from django.db import models
 from django.utils import timezone
 
-class BlogPost(models.Model):
+from core.models import RenderedMarkdownModel
+
+class BlogPost(RenderedMarkdownModel):
     """Model for storing blog posts with markdown support"""
+    markdown_fields = {'content': 'content_html'}
+
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, help_text="URL-friendly version of the title")
     content = models.TextField(help_text="Blog post content in markdown format")
+    content_html = models.TextField(blank=True, default='', editable=False)
     excerpt = models.TextField(blank=True, help_text="Short summary of the post (optional)")
     featured_image = models.ImageField(upload_to='blog/', blank=True, null=True)
     published = models.BooleanField(default=False, help_text="Mark as published")
@@ -1,7 +1,19 @@
 """Tests for the shared render_markdown helper."""
-from django.test import SimpleTestCase
+from unittest.mock import patch
 
-from core.markdown import render_markdown
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from core import markdown as core_markdown
+from core.markdown import (
+    clear_render_cache,
+    render_cache_stats,
+    render_markdown,
+    render_markdown_many,
+)
 
 
 class TestRenderMarkdown(SimpleTestCase):
@@ -57,3 +69,208 @@ class TestRenderMarkdown(SimpleTestCase):
         )
         html = render_markdown(text)
         self.assertEqual(html.count('linenodiv'), 1)
+
+    def test_unlabeled_block_exact_output(self):
+        html = render_markdown('```\nplain diagram\n```')
+        self.assertEqual(
+            html,
+            '<div class="codehilite"><pre><span></span><code>plain diagram\n</code></pre></div>',
+        )
+
+    def test_unlabeled_block_with_hl_lines_keeps_linenos(self):
+        text = '``` { .text hl_lines="1" }\nplain\nline2\n```'
+        html = render_markdown(text)
+        self.assertIn('linenodiv', html)
+        self.assertIn('<span class="hll">', html)
+
+    def test_unknown_language_renders_plain(self):
+        html = render_markdown('```nosuchlang\nfoo bar\n```')
+        self.assertNotIn('linenodiv', html)
+        self.assertIn('foo bar', html)
+
+
+class TestRenderMarkdownCache(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        clear_render_cache()
+
+    def test_second_render_is_a_local_hit(self):
+        first = render_markdown('**cached**')
+        second = render_markdown('**cached**')
+        self.assertEqual(first, second)
+        stats = render_cache_stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['local_hits'], 1)
+
+    def test_unchanged_text_is_rendered_once(self):
+        with patch.object(core_markdown, '_render', wraps=core_markdown._render) as mock_render:
+            render_markdown('same text')
+            render_markdown('same text')
+            render_markdown('other text')
+        self.assertEqual(mock_render.call_count, 2)
+
+    def test_shared_cache_serves_after_local_clear(self):
+        html = render_markdown('# Title')
+        clear_render_cache()
+        self.assertEqual(render_markdown('# Title'), html)
+        stats = render_cache_stats()
+        self.assertEqual(stats['shared_hits'], 1)
+        self.assertEqual(stats['misses'], 0)
+
+    def test_cache_key_depends_on_text(self):
+        self.assertNotEqual(core_markdown._cache_key('a'), core_markdown._cache_key('b'))
+
+    def test_broken_shared_cache_still_renders(self):
+        with patch.object(core_markdown.cache, 'get', side_effect=Exception('down')), \
+                patch.object(core_markdown.cache, 'set', side_effect=Exception('down')):
+            html = render_markdown('**still works**')
+        self.assertIn('<strong>still works</strong>', html)
+
+    def test_empty_text_does_not_touch_counters(self):
+        render_markdown('')
+        self.assertEqual(render_cache_stats()['misses'], 0)
+
+
+class TestMarkdownEngine(SimpleTestCase):
+
+    def test_engine_is_reused_within_a_thread(self):
+        self.assertIs(core_markdown._get_engine('web'), core_markdown._get_engine('web'))
+
+    def test_engine_is_per_thread(self):
+        import threading
+
+        engines = []
+        thread = threading.Thread(target=lambda: engines.append(core_markdown._get_engine('web')))
+        thread.start()
+        thread.join()
+        self.assertIsNot(engines[0], core_markdown._get_engine('web'))
+
+    def test_engine_state_does_not_leak_between_documents(self):
+        first = core_markdown._convert('Text[^1]\n\n[^1]: A footnote', 'web')
+        second = core_markdown._convert('Plain text', 'web')
+        self.assertIn('footnote', first)
+        self.assertNotIn('footnote', second)
+
+    def test_pdf_profile_matches_plain_markdown(self):
+        import markdown
+
+        text = '**bold**\n\n```python\nx = 1\n```'
+        self.assertEqual(core_markdown.render_pdf_markdown(text), markdown.markdown(text))
+
+    def test_pdf_profile_empty_text(self):
+        self.assertEqual(core_markdown.render_pdf_markdown(None), '')
+
+    def test_pdf_profile_is_cached_separately_from_web(self):
+        cache.clear()
+        clear_render_cache()
+        text = '```python\nx = 1\n```'
+        web = render_markdown(text)
+        pdf = core_markdown.render_pdf_markdown(text)
+        self.assertNotEqual(web, pdf)
+        self.assertNotEqual(core_markdown._cache_key(text, 'web'), core_markdown._cache_key(text, 'pdf'))
+        core_markdown.render_pdf_markdown(text)
+        self.assertEqual(render_cache_stats()['misses'], 2)
+        self.assertEqual(render_cache_stats()['local_hits'], 1)
+
+
+class TestHighlightCache(SimpleTestCase):
+
+    def test_lexer_is_cached_per_language(self):
+        first = core_markdown._cached_get_lexer_by_name('python')
+        second = core_markdown._cached_get_lexer_by_name('Python')
+        self.assertIs(first, second)
+
+    def test_unknown_lexer_is_cached_and_still_raises(self):
+        from pygments.util import ClassNotFound
+
+        with patch.object(core_markdown, 'get_lexer_by_name',
+                          wraps=core_markdown.get_lexer_by_name) as lookup:
+            for _ in range(2):
+                with self.assertRaises(ClassNotFound):
+                    core_markdown._cached_get_lexer_by_name('no-such-language-xyz')
+        self.assertEqual(lookup.call_count, 1)
+
+    def test_formatter_reused_for_same_options(self):
+        options = {'linenos': 'table', 'cssclass': 'codehilite', 'hl_lines': []}
+        self.assertIs(
+            core_markdown._cached_formatter(**options),
+            core_markdown._cached_formatter(**options),
+        )
+
+    def test_reused_formatter_decides_linenos_per_block(self):
+        text = '```python\nx = 1\n```\n\n```\nplain\n```\n\n```python\ny = 2\n```'
+        html = core_markdown._render(text)
+        self.assertEqual(html.count('linenodiv'), 2)
+
+    def test_stats_count_hits(self):
+        core_markdown._render('```python\nx = 1\n```')
+        before = core_markdown.highlight_cache_stats()['lexers']['hits']
+        core_markdown._render('```python\ny = 2\n```')
+        after = core_markdown.highlight_cache_stats()['lexers']['hits']
+        self.assertGreater(after, before)
+
+
+class TestRenderMarkdownMany(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        clear_render_cache()
+
+    def test_results_in_input_order(self):
+        html = render_markdown_many(['*a*', '**b**', None, '`c`'])
+        self.assertEqual(len(html), 4)
+        self.assertIn('<em>a</em>', html[0])
+        self.assertIn('<strong>b</strong>', html[1])
+        self.assertEqual(html[2], '')
+        self.assertIn('<code>c</code>', html[3])
+
+    def test_matches_render_markdown(self):
+        texts = ['# Title', '```python\nx = 1\n```']
+        self.assertEqual(render_markdown_many(texts), [render_markdown(t) for t in texts])
+
+    def test_duplicates_rendered_once(self):
+        with patch.object(core_markdown, '_render', wraps=core_markdown._render) as mock_render:
+            render_markdown_many(['same', 'same', 'other', 'same'])
+        self.assertEqual(mock_render.call_count, 2)
+
+    def test_cached_texts_not_rendered(self):
+        render_markdown('cached')
+        with patch.object(core_markdown, '_render', wraps=core_markdown._render) as mock_render:
+            render_markdown_many(['cached', 'fresh'])
+        mock_render.assert_called_once_with('fresh', 'web')
+
+    @override_settings(MARKDOWN_PARALLEL_THRESHOLD=2, MARKDOWN_PROCESS_WORKERS=2)
+    def test_large_batch_uses_process_pool(self):
+        with ThreadPoolExecutor(max_workers=2) as pool, \
+                patch.object(core_markdown, '_get_process_pool', return_value=pool) as get_pool:
+            html = render_markdown_many(['*one*', '*two*', '*three*'])
+        get_pool.assert_called_once()
+        self.assertIn('<em>three</em>', html[2])
+
+    @override_settings(MARKDOWN_PARALLEL_THRESHOLD=2)
+    def test_pool_is_opt_in(self):
+        with patch.object(core_markdown, '_get_process_pool') as get_pool:
+            html = render_markdown_many(['*one*', '*two*', '*three*'])
+        get_pool.assert_not_called()
+        self.assertIn('<em>three</em>', html[2])
+
+    @override_settings(MARKDOWN_PARALLEL_THRESHOLD=2)
+    def test_processes_argument_enables_the_pool(self):
+        with ThreadPoolExecutor(max_workers=2) as pool, \
+                patch.object(core_markdown, '_get_process_pool', return_value=pool) as get_pool:
+            render_markdown_many(['*one*', '*two*'], processes=3)
+        get_pool.assert_called_once_with(3)
+
+    @override_settings(MARKDOWN_PARALLEL_THRESHOLD=2, MARKDOWN_PROCESS_WORKERS=2)
+    def test_broken_pool_falls_back_to_sequential(self):
+        with patch.object(core_markdown, '_get_process_pool', side_effect=BrokenProcessPool()):
+            html = render_markdown_many(['*one*', '*two*'])
+        self.assertIn('<em>two</em>', html[1])
+
+    @override_settings(MARKDOWN_PARALLEL_THRESHOLD=1, MARKDOWN_PROCESS_WORKERS=1)
+    def test_real_process_pool_renders(self):
+        self.addCleanup(core_markdown._shutdown_process_pool)
+        html = render_markdown_many(['```python\nx = 1\n```', '```\nplain\n```'])
+        self.assertIn('linenodiv', html[0])
+        self.assertNotIn('linenodiv', html[1])
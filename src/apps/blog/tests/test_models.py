@@ -11,6 +11,10 @@ class TestBlogPostModel(TestCase):
         post = BlogPost(title='My Post', slug='my-post', content='test')
         self.assertEqual(str(post), 'My Post')
 
+    def test_content_html_rendered_on_save(self):
+        post = BlogPost.objects.create(title='Post', slug='post', content='# Heading')
+        self.assertIn('<h1>Heading</h1>', post.content_html)
+
     def test_slug_auto_generated_from_title(self):
         post = BlogPost.objects.create(title='Hello World', content='test')
         self.assertEqual(post.slug, 'hello-world')
@@ -2,7 +2,6 @@ from django.shortcuts import render, get_object_or_404
 from django.views.generic import ListView, DetailView
 from django.core.paginator import Paginator
 from .models import BlogPost
-from core.markdown import render_markdown
 
 class PostListView(ListView):
     """Blog post listing view"""
@@ -31,8 +30,8 @@ class PostDetailView(DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Convert markdown content to HTML
+        # Markdown is rendered to HTML when the post is saved
         post = context['post']
-        context['post_html'] = render_markdown(post.content)
+        context['post_html'] = post.content_html
         
         return context
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import JobApplication, ChatMessage, CVVersion, RecruiterResponse
+from .models import JobApplication, ChatMessage, CVVersion, PdfRenderJob, RecruiterResponse
 
 
 @admin.register(JobApplication)
@@ -7,7 +7,13 @@ class JobApplicationAdmin(admin.ModelAdmin):
     list_display = ['company', 'position', 'status', 'created_at']
     list_filter = ['status']
     search_fields = ['company', 'position']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = [
+        'created_at',
+        'updated_at',
+        'conversation_summary',
+        'summarized_through',
+        'summary_updated_at',
+    ]
 
 
 @admin.register(ChatMessage)
@@ -35,4 +41,12 @@ class CVVersionAdmin(admin.ModelAdmin):
 class RecruiterResponseAdmin(admin.ModelAdmin):
     list_display = ['cv_version', 'response_type', 'responded_at', 'created_at']
     list_filter = ['response_type']
-    readonly_fields = ['created_at']
\ No newline at end of file
+    readonly_fields = ['created_at']
+
+
+@admin.register(PdfRenderJob)
+class PdfRenderJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'status', 'cv_version', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'digest']
+    exclude = ['html']
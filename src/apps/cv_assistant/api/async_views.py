@@ -0,0 +1,257 @@
+"""Async versions of the AI-bound cv_assistant endpoints.
+
+``messages``, ``messages/stream`` and ``generate-cv`` spend nearly all of
+their time waiting on the LLM. Served by an ASGI server (``core.asgi``,
+e.g. ``gunicorn -k uvicorn.workers.UvicornWorker``), these views await the
+provider through ``AsyncOpenAI`` on the event loop, so one worker can keep
+many calls in flight instead of pinning a thread per call. Requests and
+responses match the DRF endpoints under ``jobs/<pk>/``; the views are plain
+Django async views (DRF has no async support), authenticated with the
+API's DRF authentication classes. Short ORM work uses the async ORM;
+transactional steps and PDF rendering reuse the sync helpers of
+``views`` through ``sync_to_async``.
+
+The views answer 404 under WSGI (``core.wsgi``). There each request would
+still pin a thread, run on an event loop of its own (building, and
+dropping unclosed, an ``AsyncOpenAI`` client and its TLS connection per
+request) and have its stream buffered; the ``jobs/<pk>/`` endpoints serve
+WSGI clients.
+"""
+import asyncio
+import functools
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from apps.cv_assistant.models import ChatMessage, JobApplication
+from apps.cv_assistant.services import conversation_summary, cv_adapter
+from apps.cv_assistant.services.ai_client import (
+    achat_completion,
+    achat_completion_stream,
+    discard_cached_response,
+)
+
+from .permissions import IsAdminUser
+from .serializers import ChatMessageSerializer
+from .views import (
+    _adaptation_messages,
+    _chat_conversation,
+    _cv_version_response,
+    _save_cv_version,
+    _sse_event,
+)
+
+logger = logging.getLogger(__name__)
+
+AI_UNAVAILABLE = "AI service temporarily unavailable. Please try again."
+
+
+def _authenticate(request):
+    """Apply the API's authentication and staff permission to ``request``.
+
+    Returns an error response, or ``None`` when the request may proceed.
+    Session-authenticated requests get DRF's CSRF check, as on the DRF
+    endpoints.
+    """
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    try:
+        user = drf_request.user
+    except exceptions.APIException as exc:
+        return JsonResponse({"detail": str(exc.detail)}, status=exc.status_code)
+    if IsAdminUser().has_permission(drf_request, None):
+        return None
+    if user.is_authenticated:
+        return JsonResponse(
+            {"detail": "You do not have permission to perform this action."},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+    return JsonResponse(
+        {"detail": "Authentication credentials were not provided."},
+        status=status.HTTP_401_UNAUTHORIZED,
+    )
+
+
+def _asgi_only(view):
+    """Answer 404 unless the request came through the ASGI handler."""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {"detail": "The async endpoints are only served over ASGI."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _prepare(request, pk):
+    """Authenticate and load the job application and JSON body.
+
+    Returns ``(job_application, data, None)`` or ``(None, None, response)``.
+    """
+    error = await sync_to_async(_authenticate)(request)
+    if error is not None:
+        return None, None, error
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None, None, JsonResponse(
+            {"detail": "Request body must be JSON."}, status=status.HTTP_400_BAD_REQUEST,
+        )
+    if not isinstance(data, dict):
+        return None, None, JsonResponse(
+            {"detail": "Request body must be a JSON object."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    job_application = await JobApplication.objects.filter(pk=pk).afirst()
+    if job_application is None:
+        return None, None, JsonResponse(
+            {"detail": "No JobApplication matches the given query."},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    return job_application, data, None
+
+
+async def _serialize_messages(*messages):
+    # Markdown rendering may hit Django's cache, which is sync-only.
+    return await sync_to_async(
+        lambda: ChatMessageSerializer(messages, many=True).data
+    )()
+
+
+async def _start_chat_turn(request, pk):
+    """Save the user message of a chat turn and build its conversation.
+
+    Returns ``(job_application, user_message, conversation, None)`` or an
+    error response in the last slot.
+    """
+    job_application, data, error = await _prepare(request, pk)
+    if error is not None:
+        return None, None, None, error
+    content = data.get("content")
+    if not content:
+        return None, None, None, JsonResponse(
+            {"detail": "'content' is required."}, status=status.HTTP_400_BAD_REQUEST,
+        )
+    user_message = await job_application.messages.acreate(
+        role=ChatMessage.ROLE_USER,
+        content=content,
+    )
+    conversation = await sync_to_async(_chat_conversation)(job_application, user_message)
+    return job_application, user_message, conversation, None
+
+
+@csrf_exempt
+@require_POST
+@_asgi_only
+async def chat_messages(request, pk):
+    """Async POST ``jobs/<pk>/messages/``: send a message, return both messages."""
+    job_application, user_message, conversation, error = await _start_chat_turn(request, pk)
+    if error is not None:
+        return error
+
+    try:
+        ai_response = await achat_completion(conversation)
+    except Exception:
+        return JsonResponse(
+            {"detail": AI_UNAVAILABLE}, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+
+    assistant_message = await job_application.messages.acreate(
+        role=ChatMessage.ROLE_ASSISTANT,
+        content=ai_response,
+    )
+    await sync_to_async(conversation_summary.schedule_update)(job_application)
+    data = await _serialize_messages(user_message, assistant_message)
+    return JsonResponse(data, status=status.HTTP_201_CREATED, safe=False)
+
+
+@csrf_exempt
+@require_POST
+@_asgi_only
+async def chat_messages_stream(request, pk):
+    """Async POST ``jobs/<pk>/messages/stream/``: the reply as Server-Sent Events."""
+    job_application, user_message, conversation, error = await _start_chat_turn(request, pk)
+    if error is not None:
+        return error
+
+    async def events():
+        (user_data,) = await _serialize_messages(user_message)
+        yield _sse_event("user", user_data)
+        parts = []
+        try:
+            async for delta in achat_completion_stream(conversation):
+                parts.append(delta)
+                yield _sse_event("token", {"content": delta})
+        except (GeneratorExit, asyncio.CancelledError):
+            # The client went away: keep what the model said so far.
+            if parts:
+                await job_application.messages.acreate(
+                    role=ChatMessage.ROLE_ASSISTANT,
+                    content="".join(parts),
+                )
+            raise
+        except Exception:
+            logger.exception("Streaming the AI reply for job %s failed", job_application.pk)
+            yield _sse_event("error", {"detail": AI_UNAVAILABLE})
+            return
+
+        assistant_message = await job_application.messages.acreate(
+            role=ChatMessage.ROLE_ASSISTANT,
+            content="".join(parts),
+        )
+        await sync_to_async(conversation_summary.schedule_update)(job_application)
+        (assistant_data,) = await _serialize_messages(assistant_message)
+        yield _sse_event("done", assistant_data)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@csrf_exempt
+@require_POST
+@_asgi_only
+async def generate_cv(request, pk):
+    """Async POST ``jobs/<pk>/generate-cv/``: adapt the CV and store a version."""
+    job_application, data, error = await _prepare(request, pk)
+    if error is not None:
+        return error
+
+    messages = await sync_to_async(_adaptation_messages)(
+        job_application, data.get("user_instructions"),
+    )
+    try:
+        ai_response = await achat_completion(messages)
+    except Exception as e:
+        return JsonResponse(
+            {"detail": f"AI service temporarily unavailable. {e.args[0] if e.args else ''}"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+
+    def finish():
+        # Parsing validates experience ids against the database.
+        try:
+            parsed = cv_adapter.parse_ai_response(ai_response)
+        except ValueError as e:
+            discard_cached_response(messages)
+            return JsonResponse({"detail": f"AI response was not valid: {e}"}, status=422)
+        cv_version, pdf_job = _save_cv_version(
+            job_application, parsed, data.get("prompt_summary", ""),
+        )
+        response = _cv_version_response(cv_version, pdf_job, status.HTTP_201_CREATED)
+        return JsonResponse(response.data, status=response.status_code)
+
+    return await sync_to_async(finish)()
@@ -0,0 +1,14 @@
+"""Renderer classes for the cv_assistant API."""
+from rest_framework.renderers import JSONRenderer
+
+
+class EventStreamRenderer(JSONRenderer):
+    """Accepts ``Accept: text/event-stream`` on the Server-Sent Events actions.
+
+    The events themselves are a ``StreamingHttpResponse`` that bypasses
+    rendering; this only renders the errors answered before the stream
+    starts (400, 401, 404), as JSON so clients can read their detail.
+    """
+
+    media_type = "text/event-stream"
+    format = "event-stream"
@@ -1,32 +1,14 @@
 """DRF serializers for the cv_assistant app models."""
-import nh3
 from rest_framework import serializers
 
-from core.markdown import render_markdown
-
 from apps.cv_assistant.models import (
     ChatMessage,
     CVVersion,
     JobApplication,
+    PdfRenderJob,
     RecruiterResponse,
 )
 
-# Allow-list for sanitizing rendered chat markdown. Global class attribute
-# covers pygments/codehilite hooks; link/image attrs kept for rich replies.
-NH3_ATTRIBUTES = {
-    "*": {"class"},
-    "a": {"href", "title"},
-    "img": {"src", "alt"},
-    "code": {"class", "data-lang"},
-    "span": {"class"},
-    "div": {"class", "id"},
-    "td": {"class"},
-    "th": {"class"},
-    "tr": {"class"},
-    "table": {"class"},
-    "pre": {"class"},
-}
-
 
 class JobApplicationSerializer(serializers.ModelSerializer):
     """Serializer for the JobApplication model."""
@@ -39,10 +21,11 @@ class JobApplicationSerializer(serializers.ModelSerializer):
             "position",
             "job_description",
             "status",
+            "conversation_summary",
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "created_at", "updated_at"]
+        read_only_fields = ["id", "conversation_summary", "created_at", "updated_at"]
 
 
 class ChatMessageSerializer(serializers.ModelSerializer):
@@ -67,14 +50,14 @@ class ChatMessageSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "job_application"]
 
     def get_content_html(self, obj):
-        """Render markdown to HTML, then sanitize.
+        """Return the sanitized HTML stored when the message was saved.
 
-        Chat content is LLM output influenced by external job descriptions,
-        so raw HTML must never reach the client unescaped. nh3 keeps the
-        tags/attributes markdown+pygments legitimately produce.
+        Rows rendered by an older renderer (not yet backfilled by
+        ``rerender_markdown``) are re-rendered on the fly instead.
         """
-        html = render_markdown(obj.content)
-        return nh3.clean(html, attributes=NH3_ATTRIBUTES)
+        if obj.markdown_is_stale:
+            return obj.render_markdown_field(obj.content)
+        return obj.content_html
 
 
 class CVVersionSerializer(serializers.ModelSerializer):
@@ -93,10 +76,11 @@ class CVVersionSerializer(serializers.ModelSerializer):
             "ai_model",
             "prompt_summary",
             "pdf_file",
+            "base_fingerprint",
             "created_at",
             "is_final",
         ]
-        read_only_fields = ["id", "version_number", "created_at", "ai_model"]
+        read_only_fields = ["id", "version_number", "base_fingerprint", "created_at", "ai_model"]
 
 
 class RecruiterResponseSerializer(serializers.ModelSerializer):
@@ -112,4 +96,22 @@ class RecruiterResponseSerializer(serializers.ModelSerializer):
             "responded_at",
             "created_at",
         ]
-        read_only_fields = ["id", "created_at"]
\ No newline at end of file
+        read_only_fields = ["id", "created_at"]
+
+
+class PdfRenderJobSerializer(serializers.ModelSerializer):
+    """Read-only status view of a PdfRenderJob (the HTML is never exposed)."""
+
+    class Meta:
+        model = PdfRenderJob
+        fields = [
+            "id",
+            "status",
+            "cv_version",
+            "attempts",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
@@ -6,15 +6,18 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 
+from . import async_views
 from .views import (
     CVVersionViewSet,
     JobApplicationViewSet,
+    PdfRenderJobViewSet,
     RecruiterResponseViewSet,
 )
 
 router = DefaultRouter()
 router.register(r"jobs", JobApplicationViewSet, basename="job")
 router.register(r"cv-versions", CVVersionViewSet, basename="cv-version")
+router.register(r"pdf-jobs", PdfRenderJobViewSet, basename="pdf-job")
 router.register(r"recruiter-responses", RecruiterResponseViewSet, basename="recruiter-response")
 
 app_name = "cv_assistant_api"
@@ -24,6 +27,23 @@ urlpatterns = [
     path("auth/login/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("auth/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
 
+    # Async (ASGI) variants of the AI-bound job endpoints
+    path(
+        "async/jobs/<int:pk>/messages/",
+        async_views.chat_messages,
+        name="async_job_messages",
+    ),
+    path(
+        "async/jobs/<int:pk>/messages/stream/",
+        async_views.chat_messages_stream,
+        name="async_job_messages_stream",
+    ),
+    path(
+        "async/jobs/<int:pk>/generate-cv/",
+        async_views.generate_cv,
+        name="async_job_generate_cv",
+    ),
+
     # Registered viewsets
     path("", include(router.urls)),
 ]
\ No newline at end of file
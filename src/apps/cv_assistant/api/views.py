@@ -1,30 +1,151 @@
 """DRF views for the cv_assistant app."""
+import json
+import logging
+
 from django.conf import settings
-from django.core.files.base import ContentFile
 from django.db import transaction
 from django.db.models import Max
+from django.http import StreamingHttpResponse
 
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
 from apps.cv_assistant.models import (
     ChatMessage,
     CVVersion,
     JobApplication,
+    PdfRenderJob,
     RecruiterResponse,
 )
-from apps.cv_assistant.services import cv_adapter, cv_builder, pdf_generator
-from apps.cv_assistant.services.ai_client import chat_completion
+from apps.cv_assistant.services import (
+    conversation_summary,
+    cv_adapter,
+    cv_builder,
+    cv_versions,
+    pdf_jobs,
+)
+from apps.cv_assistant.services.ai_client import (
+    chat_completion,
+    chat_completion_stream,
+    discard_cached_response,
+)
 
 from .permissions import IsAdminUser
+from .renderers import EventStreamRenderer
 from .serializers import (
     ChatMessageSerializer,
     CVVersionSerializer,
     JobApplicationSerializer,
+    PdfRenderJobSerializer,
     RecruiterResponseSerializer,
 )
 
+logger = logging.getLogger(__name__)
+
+
+def _cv_version_response(cv_version, pdf_job, done_status):
+    """Serialize ``cv_version``; answer 202 with the job while its PDF is queued."""
+    data = CVVersionSerializer(cv_version).data
+    if pdf_job is None:
+        return Response(data, status=done_status)
+    data["pdf_job"] = PdfRenderJobSerializer(pdf_job).data
+    return Response(data, status=status.HTTP_202_ACCEPTED)
+
+
+def _history_newest_first(job_application, exclude_pk=None):
+    """Unsummarized chat turns, newest first, fetched lazily in small chunks.
+
+    Turns covered by the job's conversation summary are skipped, and the
+    prompt window stops reading once its token budget is spent, so long
+    conversations are not loaded in full.
+    """
+    messages = conversation_summary.unsummarized_messages(job_application)
+    if exclude_pk is not None:
+        messages = messages.exclude(pk=exclude_pk)
+    return messages.order_by("-created_at", "-pk").values("role", "content").iterator(
+        chunk_size=50,
+    )
+
+
+def _chat_conversation(job_application, user_message):
+    """Build the AI conversation for a chat turn ending in ``user_message``."""
+    # The system prompt carries the CV + job description as read-only
+    # context. It explicitly forbids dumping a full adapted CV in the
+    # chat — that is the "Generate CV" button's job. It is memoized, so
+    # every turn of a job sends the same prompt prefix.
+    system_prompt = cv_adapter.chat_system_prompt(job_application.job_description)
+    # The conversation summary stands in for older turns; later messages
+    # (excluding the just-created user message) fill the token budget
+    # newest first; the new user message is ALWAYS sent.
+    conversation, _stats = cv_adapter.build_chat_messages(
+        system_prompt,
+        {"role": "user", "content": user_message.content},
+        _history_newest_first(job_application, exclude_pk=user_message.pk),
+        summary=job_application.conversation_summary,
+    )
+    return conversation
+
+
+def _adaptation_messages(job_application, user_instructions):
+    """Build the AI messages that adapt the base CV to ``job_application``."""
+    # The most recent chat turns for this job application are included as
+    # additional context: the gaps/strengths/emphases discussed with the
+    # assistant inform the adaptation (without introducing facts outside
+    # the base CV).
+    messages, _stats = cv_adapter.build_adaptation_messages(
+        None,
+        job_application.job_description,
+        user_instructions,
+        history_newest_first=_history_newest_first(job_application),
+        summary=job_application.conversation_summary,
+    )
+    return messages
+
+
+def _save_cv_version(job_application, parsed, prompt_summary):
+    """Store a parsed adaptation as the next ``CVVersion`` and render its PDF.
+
+    Returns ``(cv_version, pdf_job)``; ``pdf_job`` is the pending render job
+    when the PDF was queued, otherwise ``None``.
+    """
+    # Determine version_number and create CVVersion atomically.
+    with transaction.atomic():
+        existing_versions = job_application.cv_versions.select_for_update()
+        existing_max = existing_versions.aggregate(
+            _max_version=Max("version_number"),
+        )["_max_version"]
+        next_version = (existing_max or 0) + 1
+
+        cv_version = job_application.cv_versions.create(
+            version_number=next_version,
+            adapted_summary=parsed["summary"],
+            adapted_experiences=parsed["experiences"],
+            ai_model=settings.AI_MODEL,
+            prompt_summary=prompt_summary,
+        )
+
+    # Build the adapted context and generate the PDF (or queue it for the
+    # render worker when PDF_RENDER_ASYNC is on).
+    adapted_data = {
+        "summary": parsed["summary"],
+        "experiences": parsed["experiences"],
+    }
+    context = cv_builder.build_cv_context(adapted_data=adapted_data)
+    pdf_name = f"cv_v{next_version}_{job_application.company}.pdf"
+    pdf_job = pdf_jobs.render_for_cv_version(cv_version, context, pdf_name)
+
+    # Update the job application status.
+    job_application.status = "cv_generated"
+    job_application.save()
+    return cv_version, pdf_job
+
+
+def _sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 
 class JobApplicationViewSet(viewsets.ModelViewSet):
     """CRUD endpoints for JobApplication records (staff only)."""
@@ -66,23 +187,7 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
         )
 
         # 2. Build the conversation context for the AI.
-        # The system prompt carries the CV + job description as read-only
-        # context. It explicitly forbids dumping a full adapted CV in the
-        # chat — that is the "Generate CV" button's job.
-        base_cv_data = cv_builder.build_cv_context()
-        system_prompt = cv_adapter.build_chat_system_prompt(
-            base_cv_data,
-            job_description=job_application.job_description,
-        )
-        conversation = [{"role": "system", "content": system_prompt}]
-
-        # Add prior messages from DB (excluding the just-created user message)
-        prior = messages_qs.exclude(pk=user_message.pk).values("role", "content")
-        for m in prior:
-            conversation.append({"role": m["role"], "content": m["content"]})
-
-        # ALWAYS add the new user message (never discard it)
-        conversation.append({"role": "user", "content": user_message.content})
+        conversation = _chat_conversation(job_application, user_message)
 
         # 3. Call the AI client.
         try:
@@ -98,12 +203,75 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
             role=ChatMessage.ROLE_ASSISTANT,
             content=ai_response,
         )
+        conversation_summary.schedule_update(job_application)
 
         serializer = ChatMessageSerializer(
             [user_message, assistant_message], many=True
         )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(
+        detail=True, methods=["post"], url_path="messages/stream",
+        renderer_classes=[JSONRenderer, EventStreamRenderer],
+    )
+    def messages_stream(self, request, pk=None):
+        """Like POST ``messages/`` but stream the AI reply as Server-Sent Events.
+
+        Emits ``user`` (the saved user message), one ``token`` event per
+        ``{"content": delta}`` as the completion arrives, then ``done`` with
+        the saved assistant message, or ``error`` if the AI call fails. If
+        the client disconnects mid-stream the partial reply is saved.
+        """
+        job_application = self.get_object()
+        content = request.data.get("content")
+        if not content:
+            return Response(
+                {"detail": "'content' is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        user_message = job_application.messages.create(
+            role=ChatMessage.ROLE_USER,
+            content=content,
+        )
+        conversation = _chat_conversation(job_application, user_message)
+
+        def events():
+            yield _sse_event("user", ChatMessageSerializer(user_message).data)
+            parts = []
+            try:
+                for delta in chat_completion_stream(conversation):
+                    parts.append(delta)
+                    yield _sse_event("token", {"content": delta})
+            except GeneratorExit:
+                # The client went away (the response was closed mid-stream):
+                # keep what the model said so far.
+                if parts:
+                    job_application.messages.create(
+                        role=ChatMessage.ROLE_ASSISTANT,
+                        content="".join(parts),
+                    )
+                raise
+            except Exception:
+                logger.exception("Streaming the AI reply for job %s failed", job_application.pk)
+                yield _sse_event("error", {
+                    "detail": "AI service temporarily unavailable. Please try again.",
+                })
+                return
+
+            assistant_message = job_application.messages.create(
+                role=ChatMessage.ROLE_ASSISTANT,
+                content="".join(parts),
+            )
+            conversation_summary.schedule_update(job_application)
+            yield _sse_event("done", ChatMessageSerializer(assistant_message).data)
+
+        response = StreamingHttpResponse(events(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Tell nginx not to buffer the stream.
+        response["X-Accel-Buffering"] = "no"
+        return response
+
     # ------------------------------------------------------------------
     # Task 10: Generate an adapted CV version for this job application.
     # ------------------------------------------------------------------
@@ -118,26 +286,10 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
         """
         job_application = self.get_object()
 
-        # 1-2. Build the base CV context and prompt messages. The full chat
-        # history for this job application is included as additional context:
-        # the gaps/strengths/emphases discussed with the assistant inform the
-        # adaptation (without introducing facts outside the base CV).
-        conversation_history = list(
-            job_application.messages.all().order_by("created_at").values(
-                "role", "content"
-            )
-        )
-        base_cv_data = cv_builder.build_cv_context()
-        system_prompt = cv_adapter.build_system_prompt(base_cv_data)
-        adaptation_prompt = cv_adapter.build_adaptation_prompt(
-            job_application.job_description,
-            request.data.get("user_instructions"),
-            conversation_history=conversation_history,
+        # 1-2. Build the base CV context and prompt messages.
+        messages = _adaptation_messages(
+            job_application, request.data.get("user_instructions"),
         )
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": adaptation_prompt},
-        ]
 
         # 3. Call the AI and parse the structured response.
         try:
@@ -151,44 +303,20 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
         try:
             parsed = cv_adapter.parse_ai_response(ai_response)
         except ValueError as e:
+            # Let a retry ask the AI again instead of replaying this reply.
+            discard_cached_response(messages)
             return Response(
                 {"detail": f"AI response was not valid: {e}"},
                 status=422,
             )
 
-        # 4-5. Determine version_number and create CVVersion atomically.
-        with transaction.atomic():
-            existing_versions = job_application.cv_versions.select_for_update()
-            existing_max = existing_versions.aggregate(
-                _max_version=Max("version_number"),
-            )["_max_version"]
-            next_version = (existing_max or 0) + 1
-
-            cv_version = job_application.cv_versions.create(
-                version_number=next_version,
-                adapted_summary=parsed["summary"],
-                adapted_experiences=parsed["experiences"],
-                ai_model=settings.AI_MODEL,
-                prompt_summary=request.data.get("prompt_summary", ""),
-            )
-
-        # 6. Build the adapted context and generate the PDF.
-        adapted_data = {
-            "summary": parsed["summary"],
-            "experiences": parsed["experiences"],
-        }
-        context = cv_builder.build_cv_context(adapted_data=adapted_data)
-        pdf_bytes = pdf_generator.generate_cv_pdf(context)
-        pdf_name = f"cv_v{next_version}_{job_application.company}.pdf"
-        cv_version.pdf_file.save(pdf_name, ContentFile(pdf_bytes), save=True)
-
-        # 7. Update the job application status.
-        job_application.status = "cv_generated"
-        job_application.save()
+        # 4-7. Store the new version, render its PDF, update the status.
+        cv_version, pdf_job = _save_cv_version(
+            job_application, parsed, request.data.get("prompt_summary", ""),
+        )
 
         # 8. Return the serialized CV version.
-        serializer = CVVersionSerializer(cv_version)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return _cv_version_response(cv_version, pdf_job, status.HTTP_201_CREATED)
 
     # ------------------------------------------------------------------
     # Task 13: Dashboard endpoint — CV success metrics.
@@ -264,27 +392,72 @@ class CVVersionViewSet(viewsets.ModelViewSet):
         """
         cv_version = self.get_object()
 
-        # 1. Rebuild the adapted context from the stored fields.
-        adapted_data = {
-            "summary": cv_version.adapted_summary or "",
-            "experiences": cv_version.adapted_experiences or [],
-        }
-        context = cv_builder.build_cv_context(adapted_data=adapted_data)
-
-        # 2. Generate the PDF bytes.
-        pdf_bytes = pdf_generator.generate_cv_pdf(context)
-
-        # 3. Overwrite the existing file (or create a new one).
-        existing_name = cv_version.pdf_file.name if cv_version.pdf_file else None
-        pdf_name = (
-            existing_name.split("/")[-1] if existing_name
-            else f"cv_v{cv_version.version_number}_regenerated.pdf"
-        )
-        cv_version.pdf_file.save(pdf_name, ContentFile(pdf_bytes), save=True)
+        # Rebuild the adapted context from the stored fields and overwrite
+        # the existing file (or create a new one), rendering inline or
+        # through the render worker.
+        pdf_job = cv_versions.regenerate(cv_version)
 
-        # 4. Return the updated CV version.
-        serializer = CVVersionSerializer(cv_version)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return _cv_version_response(cv_version, pdf_job, status.HTTP_200_OK)
+
+    @action(detail=False, methods=["post"], url_path="regenerate-pdfs")
+    def regenerate_pdfs(self, request):
+        """Re-render the PDFs of many versions at once (``?job=`` filters).
+
+        Streams NDJSON: one ``{"id", "version_number", "status"}`` line per
+        version as its PDF is saved (or queued), then a ``{"done": true}``
+        line with the counts. All versions share one base context and the
+        layouts run in parallel (``{"workers": n}`` bounds them, up to one
+        per renderer process).
+        """
+        versions = list(self.get_queryset().select_related("job_application"))
+        workers = request.data.get("workers")
+        try:
+            workers = int(workers) if workers is not None else None
+        except (TypeError, ValueError):
+            workers = 0
+        if workers is not None and workers < 1:
+            return Response(
+                {"error": "workers must be a positive integer."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if workers is not None:
+            workers = min(workers, cv_versions.max_workers())
+
+        def progress():
+            counts = {"regenerated": 0, "queued": 0, "failed": 0}
+            for cv_version, outcome, error in cv_versions.regenerate_many(
+                versions, workers=workers,
+            ):
+                counts[outcome] += 1
+                line = {
+                    "id": cv_version.pk,
+                    "version_number": cv_version.version_number,
+                    "status": outcome,
+                }
+                if error:
+                    line["error"] = error
+                yield json.dumps(line) + "\n"
+            yield json.dumps({"done": True, "total": len(versions), **counts}) + "\n"
+
+        return StreamingHttpResponse(progress(), content_type="application/x-ndjson")
+
+    @action(detail=False, methods=["post"], url_path="regenerate-stale")
+    def regenerate_stale(self, request):
+        """Re-render only the PDFs built from outdated portfolio data.
+
+        ``{"force": true}`` re-renders every version. Returns the
+        ``regenerated``/``queued``/``skipped``/``failed`` counts.
+        """
+        counts = cv_versions.regenerate_stale(force=bool(request.data.get("force")))
+        return Response(counts, status=status.HTTP_200_OK)
+
+
+class PdfRenderJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status of queued PDF renders, polled by the frontend (staff only)."""
+
+    queryset = PdfRenderJob.objects.all()
+    serializer_class = PdfRenderJobSerializer
+    permission_classes = [IsAdminUser]
 
 
 class RecruiterResponseViewSet(viewsets.ModelViewSet):
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class CvAssistantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.cv_assistant'
-    verbose_name = 'CV Assistant'
\ No newline at end of file
+    verbose_name = 'CV Assistant'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,147 @@
+"""Load test: concurrent chat capacity of the sync vs async endpoints.
+
+Starts the stub LLM (``services.stub_llm``) answering after ``--latency``
+seconds, points ``AI_BASE_URL`` at it and sends ``--requests`` chat
+messages through each path, in-process:
+
+* sync: ``jobs/<pk>/messages/`` (DRF, WSGI handler) from ``--threads``
+  threads, the request threads of the gunicorn deployment (3 workers x 2
+  threads in docker-compose);
+* async: ``async/jobs/<pk>/messages/`` (ASGI handler), all requests at
+  once on one event loop, as in a single uvicorn worker.
+
+A throwaway staff user and one job application per request (so every
+chat is a short, independent conversation) are created for the run and
+deleted afterwards, together with their messages.
+"""
+import asyncio
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import AsyncClient, Client, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.cv_assistant.models import JobApplication
+from apps.cv_assistant.services import ai_client
+from apps.cv_assistant.services.stub_llm import StubLLMServer
+
+API_BASE = "/api/v1/cv-assistant/"
+
+
+class Command(BaseCommand):
+    help = "Compare concurrent chat throughput of the sync and async endpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=60,
+                            help="Chat messages sent per path (default: 60).")
+        parser.add_argument("--latency", type=float, default=1.0,
+                            help="Seconds the fake provider takes per reply (default: 1.0).")
+        parser.add_argument("--threads", type=int, default=6,
+                            help="Request threads of the sync path (default: 6).")
+
+    def handle(self, *args, **options):
+        total = options["requests"]
+        server = StubLLMServer(latency=options["latency"], reply_tokens=2).start()
+
+        user = get_user_model().objects.create_user(
+            username=f"benchmark-{uuid.uuid4().hex[:8]}", is_staff=True,
+        )
+        jobs = JobApplication.objects.bulk_create(
+            JobApplication(
+                company=f"Benchmark {index}", position="Load test",
+                job_description="Benchmark run.",
+            )
+            for index in range(total)
+        )
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+        payload = json.dumps({"content": "How well does my CV fit?"})
+        # Neither path should queue on the AI client's connection pool. The
+        # sync threads stand for every gunicorn worker, so the per-process
+        # sync limit is lifted; the async path keeps its configured limit.
+        # The test clients send requests as "testserver".
+        run_settings = override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            AI_BASE_URL=server.base_url,
+            AI_API_KEY="benchmark",
+            AI_MAX_CONNECTIONS=total,
+            AI_MAX_KEEPALIVE_CONNECTIONS=total,
+            AI_MAX_IN_FLIGHT=0,
+        )
+        try:
+            with run_settings:
+                ai_client.reset_ai_client()
+                results = [
+                    (f"sync ({options['threads']} threads)",
+                     self._run_sync(jobs, payload, headers, options["threads"])),
+                    ("async (1 event loop)",
+                     asyncio.run(self._run_async(jobs, payload, headers))),
+                ]
+        finally:
+            ai_client.reset_ai_client()
+            server.stop()
+            JobApplication.objects.filter(pk__in=[job.pk for job in jobs]).delete()
+            user.delete()
+
+        for label, (elapsed, latencies, failures) in results:
+            mean = sum(latencies) / len(latencies) if latencies else 0.0
+            self.stdout.write(
+                f"{label:<22} {total} chats: {elapsed:.2f}s, "
+                f"{total / elapsed:.1f} chats/s, mean latency {mean:.2f}s, "
+                f"{failures} failed"
+            )
+        sync_time, async_time = results[0][1][0], results[1][1][0]
+        self.stdout.write(self.style.SUCCESS(
+            f"Async path completes {sync_time / async_time:.1f}x the chats per second."
+        ))
+
+    def _run_sync(self, jobs, payload, headers, threads):
+        local = threading.local()
+
+        def send(job):
+            if not hasattr(local, "client"):
+                local.client = Client(headers=headers)
+            start = time.perf_counter()
+            try:
+                resp = local.client.post(
+                    f"{API_BASE}jobs/{job.pk}/messages/",
+                    data=payload,
+                    content_type="application/json",
+                )
+            finally:
+                close_old_connections()
+            return time.perf_counter() - start, resp.status_code == 201
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            outcomes = list(executor.map(send, jobs))
+        return self._summarize(time.perf_counter() - start, outcomes)
+
+    async def _run_async(self, jobs, payload, headers):
+        client = AsyncClient()
+
+        async def send(job):
+            start = time.perf_counter()
+            resp = await client.post(
+                f"{API_BASE}async/jobs/{job.pk}/messages/",
+                data=payload,
+                content_type="application/json",
+                headers=headers,
+            )
+            return time.perf_counter() - start, resp.status_code == 201
+
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(send(job) for job in jobs))
+        return self._summarize(time.perf_counter() - start, outcomes)
+
+    @staticmethod
+    def _summarize(elapsed, outcomes):
+        latencies = [latency for latency, _ok in outcomes]
+        failures = sum(1 for _latency, ok in outcomes if not ok)
+        return elapsed, latencies, failures
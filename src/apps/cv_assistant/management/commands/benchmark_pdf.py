@@ -0,0 +1,55 @@
+"""Benchmark cold vs warm CV PDF layout.
+
+"Cold" parses the CV stylesheet and builds a new ``FontConfiguration`` for
+every document, like the former inline ``<style>`` block did; "warm" reuses
+the stylesheet compiled once by ``pdf_generator``. Both lay out the same
+CV HTML (built from the current portfolio data) in this process.
+"""
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from weasyprint import HTML
+
+from apps.cv_assistant.services import cv_builder, pdf_generator
+
+
+class Command(BaseCommand):
+    help = "Benchmark CV PDF rendering with a freshly parsed vs a cached stylesheet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20,
+                            help='PDFs rendered per strategy (default: 20).')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        html = pdf_generator.render_cv_html(cv_builder.build_cv_context())
+
+        def cold():
+            css, font_config = pdf_generator.compile_stylesheet()
+            HTML(string=html).write_pdf(io.BytesIO(), stylesheets=[css], font_config=font_config)
+
+        def warm():
+            pdf_generator.layout_pdf(html)
+
+        # One untimed render loads WeasyPrint/fontconfig for both strategies.
+        warm()
+
+        results = {}
+        for label, func in (('cold stylesheet', cold), ('cached stylesheet', warm)):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            elapsed = time.perf_counter() - start
+            results[label] = elapsed
+            self.stdout.write(
+                f"{label:<18} {iterations} PDFs: {elapsed:.3f}s "
+                f"({elapsed / iterations * 1000:.1f} ms/PDF)"
+            )
+
+        cold_time = results['cold stylesheet']
+        warm_time = results['cached stylesheet']
+        saved = (cold_time - warm_time) / iterations * 1000
+        self.stdout.write(self.style.SUCCESS(
+            f"Cached stylesheet saves {saved:.1f} ms/PDF ({cold_time / warm_time:.2f}x)."
+        ))
@@ -0,0 +1,185 @@
+"""Load test of the AI-bound cv_assistant endpoints against the stub LLM.
+
+Starts ``services.stub_llm`` in-process (or uses ``--ai-base-url``, e.g. a
+``run_stub_llm`` instance), points ``AI_BASE_URL`` at it and sends
+``--requests`` requests to each selected endpoint from ``--concurrency``
+threads through Django's test client:
+
+* ``messages``: ``jobs/<pk>/messages/``, one chat turn per fresh job;
+* ``generate-cv``: ``jobs/<pk>/generate-cv/``, including the PDF render.
+
+Reports throughput and p50/p95/p99 latency per endpoint. A throwaway staff
+user and its job applications (with their messages and CV versions) are
+created for the run and deleted afterwards. The response cache is off so
+every request reaches the stub. Calls are admitted under the configured
+``AI_MAX_IN_FLIGHT`` unless ``--max-in-flight`` overrides it; requests
+that get no slot within ``AI_QUEUE_TIMEOUT`` show up as 503 failures.
+"""
+import json
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.cv_assistant.models import CVVersion, JobApplication
+from apps.cv_assistant.services import ai_client
+from apps.cv_assistant.services.stub_llm import StubLLMServer
+
+API_BASE = "/api/v1/cv-assistant/"
+
+ENDPOINTS = {
+    "messages": ("messages/", {"content": "How well does my CV fit this role?"}),
+    "generate-cv": ("generate-cv/", {"prompt_summary": "load test"}),
+}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list (0 for an empty one)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(-(-pct * len(sorted_values) // 100)), 1)
+    return sorted_values[rank - 1]
+
+
+class Command(BaseCommand):
+    help = "Load-test the chat and generate-cv endpoints against a stub LLM."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--endpoint", choices=[*ENDPOINTS, "all"], default="all",
+                            help="Endpoint to drive (default: all).")
+        parser.add_argument("--requests", type=int, default=50,
+                            help="Requests per endpoint (default: 50).")
+        parser.add_argument("--concurrency", type=int, default=4,
+                            help="Concurrent client threads (default: 4).")
+        parser.add_argument("--latency", type=float, default=0.2,
+                            help="Stub seconds before the first token (default: 0.2).")
+        parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                            help="Stub generation rate; 0 replies at once (default: 0).")
+        parser.add_argument("--error-rate", type=float, default=0.0,
+                            help="Fraction of stub requests that fail (default: 0).")
+        parser.add_argument("--max-in-flight", type=int, default=None,
+                            help="AI calls admitted at once; 0 = no limit "
+                                 "(default: the AI_MAX_IN_FLIGHT setting).")
+        parser.add_argument("--ai-base-url", default=None,
+                            help="Use this OpenAI-compatible endpoint instead of an in-process stub.")
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--requests and --concurrency must be at least 1.")
+        endpoints = list(ENDPOINTS) if options["endpoint"] == "all" else [options["endpoint"]]
+
+        server = None
+        base_url = options["ai_base_url"]
+        if base_url is None:
+            server = StubLLMServer(
+                latency=options["latency"],
+                tokens_per_second=options["tokens_per_second"],
+                error_rate=options["error_rate"],
+            ).start()
+            base_url = server.base_url
+
+        user = get_user_model().objects.create_user(
+            username=f"loadtest-{uuid.uuid4().hex[:8]}", is_staff=True,
+        )
+        headers = {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+        job_ids = []
+        run_settings = override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+            AI_BASE_URL=base_url,
+            AI_API_KEY=settings.AI_API_KEY or "stub",
+            AI_MAX_CONNECTIONS=max(options["concurrency"], 1),
+            AI_MAX_KEEPALIVE_CONNECTIONS=max(options["concurrency"], 1),
+            AI_RESPONSE_CACHE_SIZE=0,
+            AI_MAX_IN_FLIGHT=(settings.AI_MAX_IN_FLIGHT if options["max_in_flight"] is None
+                              else options["max_in_flight"]),
+        )
+        try:
+            with run_settings:
+                ai_client.reset_ai_client()
+                ai_client.reset_admission_stats()
+                for endpoint in endpoints:
+                    jobs = JobApplication.objects.bulk_create(
+                        JobApplication(
+                            company=f"Load test {index}", position="Load test",
+                            job_description="Python developer with Django and REST APIs.",
+                        )
+                        for index in range(options["requests"])
+                    )
+                    job_ids.extend(job.pk for job in jobs)
+                    result = self._run(endpoint, jobs, headers, options["concurrency"])
+                    self._report(endpoint, result)
+                admission = ai_client.admission_stats()
+                self.stdout.write(
+                    f"admission (max in flight {admission['max_in_flight'] or 'unlimited'}): "
+                    f"{admission['admitted']} admitted, {admission['queued']} queued, "
+                    f"{admission['rejected']} rejected"
+                )
+        finally:
+            ai_client.reset_ai_client()
+            if server is not None:
+                stub_stats = server.stats()
+                server.stop()
+                self.stdout.write(
+                    f"stub: {stub_stats['requests']} requests, "
+                    f"{stub_stats['errors']} injected failures"
+                )
+            for cv_version in CVVersion.objects.filter(job_application_id__in=job_ids):
+                if cv_version.pdf_file:
+                    cv_version.pdf_file.delete(save=False)
+            JobApplication.objects.filter(pk__in=job_ids).delete()
+            user.delete()
+
+    def _run(self, endpoint, jobs, headers, concurrency):
+        path, payload = ENDPOINTS[endpoint]
+        body = json.dumps(payload)
+        local = threading.local()
+
+        def send(job):
+            if not hasattr(local, "client"):
+                # Server errors are counted as failed requests.
+                local.client = Client(headers=headers, raise_request_exception=False)
+            start = time.perf_counter()
+            try:
+                resp = local.client.post(
+                    f"{API_BASE}jobs/{job.pk}/{path}", data=body, content_type="application/json",
+                )
+            finally:
+                if concurrency > 1:
+                    close_old_connections()
+            return time.perf_counter() - start, resp.status_code
+
+        start = time.perf_counter()
+        if concurrency == 1:
+            outcomes = [send(job) for job in jobs]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                outcomes = list(executor.map(send, jobs))
+        return time.perf_counter() - start, outcomes
+
+    def _report(self, endpoint, result):
+        elapsed, outcomes = result
+        latencies = sorted(latency for latency, _status in outcomes)
+        statuses = Counter(code for _latency, code in outcomes)
+        ok = sum(count for code, count in statuses.items() if 200 <= code < 300)
+        failures = ", ".join(
+            f"{count}x{code}" for code, count in sorted(statuses.items()) if not 200 <= code < 300
+        ) or "none"
+        self.stdout.write(
+            f"{endpoint:<12} {len(outcomes)} requests in {elapsed:.2f}s: "
+            f"{len(outcomes) / elapsed:.1f} req/s, {ok} ok, failures: {failures}"
+        )
+        self.stdout.write(
+            "             latency ms: "
+            + ", ".join(
+                f"p{pct} {percentile(latencies, pct) * 1000:.0f}" for pct in (50, 95, 99)
+            )
+            + f", max {latencies[-1] * 1000:.0f}"
+        )
@@ -0,0 +1,34 @@
+"""Re-render the PDFs of CV versions built from outdated portfolio data.
+
+Compares each version's stored base fingerprint with the current one (see
+``services.cv_versions``) and only touches the stale ones.
+"""
+from django.core.management.base import BaseCommand
+
+from apps.cv_assistant.services import cv_versions
+
+
+class Command(BaseCommand):
+    help = "Regenerate the PDFs of stale CV versions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate every CV version, not only the stale ones.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Parallel PDF layouts (default and maximum: PDF_RENDER_POOL_SIZE, at least 1).',
+        )
+
+    def handle(self, *args, **options):
+        counts = cv_versions.regenerate_stale(
+            force=options['force'], workers=options['workers'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            "Regenerated {regenerated}, queued {queued}, skipped {skipped} up to date, "
+            "failed {failed}".format(**counts)
+        ))
@@ -0,0 +1,56 @@
+"""Worker that renders queued CV PDFs (see ``services.pdf_jobs``).
+
+Runs as its own process/container next to gunicorn so WeasyPrint never
+occupies a request thread. Polls the jobs table, and queues the CV versions
+left stale by a portfolio change whenever the base data version moves;
+``--once`` drains the queue and exits (handy for cron or tests).
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.cv_assistant.models import PdfRenderJob
+from apps.cv_assistant.services import cv_versions, pdf_jobs, pdf_pool
+
+
+class Command(BaseCommand):
+    help = "Process queued PDF render jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process every queued job and exit instead of polling forever.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to sleep when the queue is empty (default: 1.0).',
+        )
+
+    def handle(self, *args, **options):
+        if pdf_pool.is_enabled():
+            # Start (and warm) the renderer processes before the first job.
+            pdf_pool.get_pool()
+
+        processed = 0
+        base_version = None
+        while True:
+            close_old_connections()
+            base_version = cv_versions.queue_stale_if_changed(base_version)
+            job = pdf_jobs.process_next()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            processed += 1
+            if job.status == PdfRenderJob.STATUS_DONE:
+                self.stdout.write(f"Rendered PDF job {job.pk}")
+            else:
+                self.stderr.write(f"PDF job {job.pk} {job.status}: {job.error}")
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} PDF job(s)"))
@@ -0,0 +1,55 @@
+"""Serve the OpenAI-compatible stub LLM (``services.stub_llm``) until stopped.
+
+Point the app at it for offline development or load tests::
+
+    python manage.py run_stub_llm --port 8001 --latency 0.5 --tokens-per-second 40
+    AI_BASE_URL=http://127.0.0.1:8001/v1 AI_API_KEY=stub python manage.py runserver
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.cv_assistant.services.stub_llm import StubLLMServer
+
+
+class Command(BaseCommand):
+    help = "Run a local OpenAI-compatible /v1/chat/completions stub."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1).")
+        parser.add_argument("--port", type=int, default=8001, help="Port (default: 8001).")
+        parser.add_argument("--latency", type=float, default=0.5,
+                            help="Seconds before the first token (default: 0.5).")
+        parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                            help="Generation rate; 0 sends the reply at once (default: 0).")
+        parser.add_argument("--reply-tokens", type=int, default=60,
+                            help="Words in a chat reply (default: 60).")
+        parser.add_argument("--error-rate", type=float, default=0.0,
+                            help="Fraction of requests that fail (default: 0).")
+        parser.add_argument("--error-status", type=int, default=500,
+                            help="HTTP status of injected failures (default: 500).")
+        parser.add_argument("--seed", type=int, default=None,
+                            help="Random seed for error injection.")
+
+    def handle(self, *args, **options):
+        if not 0 <= options["error_rate"] <= 1:
+            raise CommandError("--error-rate must be between 0 and 1.")
+        server = StubLLMServer(
+            (options["host"], options["port"]),
+            latency=options["latency"],
+            tokens_per_second=options["tokens_per_second"],
+            reply_tokens=options["reply_tokens"],
+            error_rate=options["error_rate"],
+            error_status=options["error_status"],
+            seed=options["seed"],
+            verbose=options["verbosity"] > 1,
+        )
+        self.stdout.write(f"Stub LLM listening on {server.base_url} (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            stats = server.stats()
+            self.stdout.write(
+                f"Served {stats['requests']} requests ({stats['errors']} injected failures)."
+            )
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_assistant', '0002_alter_cvversion_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='markdown_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_assistant', '0004_pdfrenderjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cvversion',
+            name='base_fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='pdfrenderjob',
+            name='base_fingerprint',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_assistant', '0005_cvversion_base_fingerprint_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobapplication',
+            name='conversation_summary',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='jobapplication',
+            name='summarized_through',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='jobapplication',
+            name='summary_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
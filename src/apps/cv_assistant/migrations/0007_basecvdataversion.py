@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cv_assistant', '0006_jobapplication_conversation_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BaseCVDataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=32)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Base CV Data Version',
+            },
+        ),
+    ]
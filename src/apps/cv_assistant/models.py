@@ -1,5 +1,24 @@
+import nh3
 from django.db import models
 
+from core.models import RenderedMarkdownModel
+
+# Allow-list for sanitizing rendered chat markdown. Global class attribute
+# covers pygments/codehilite hooks; link/image attrs kept for rich replies.
+NH3_ATTRIBUTES = {
+    "*": {"class"},
+    "a": {"href", "title"},
+    "img": {"src", "alt"},
+    "code": {"class", "data-lang"},
+    "span": {"class"},
+    "div": {"class", "id"},
+    "td": {"class"},
+    "th": {"class"},
+    "tr": {"class"},
+    "table": {"class"},
+    "pre": {"class"},
+}
+
 
 class JobApplication(models.Model):
     """A job the user is applying to and wants to tailor a CV for."""
@@ -12,6 +31,12 @@ class JobApplication(models.Model):
     position = models.CharField(max_length=200)
     job_description = models.TextField()
     status = models.CharField(max_length=20, default=STATUS_DRAFT)
+    # Rolling summary of the chat (see services/conversation_summary.py): it
+    # covers every message with pk <= summarized_through, so prompts send
+    # the summary plus the later messages only.
+    conversation_summary = models.TextField(blank=True, default='', editable=False)
+    summarized_through = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    summary_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -24,9 +49,11 @@ class JobApplication(models.Model):
         return f"{self.position} at {self.company}"
 
 
-class ChatMessage(models.Model):
+class ChatMessage(RenderedMarkdownModel):
     """A single message in the conversation about a job application."""
 
+    markdown_fields = {'content': 'content_html'}
+
     ROLE_USER = 'user'
     ROLE_ASSISTANT = 'assistant'
     ROLE_SYSTEM = 'system'
@@ -38,6 +65,9 @@ class ChatMessage(models.Model):
     )
     role = models.CharField(max_length=20)
     content = models.TextField()
+    # Sanitized HTML: chat content is LLM output influenced by external job
+    # descriptions, so it is cleaned before it is ever stored.
+    content_html = models.TextField(blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -48,6 +78,13 @@ class ChatMessage(models.Model):
     def __str__(self):
         return f"{self.role}: {self.content[:50]}"
 
+    def clean_markdown_html(self, html):
+        """Sanitize rendered markdown.
+
+        nh3 keeps the tags/attributes markdown+pygments legitimately produce.
+        """
+        return nh3.clean(html, attributes=NH3_ATTRIBUTES)
+
 
 class CVVersion(models.Model):
     """An adapted version of the CV produced for a specific job application."""
@@ -70,6 +107,9 @@ class CVVersion(models.Model):
         help_text="Brief note of what was adapted",
     )
     pdf_file = models.FileField(upload_to='cv_versions/', blank=True, null=True)
+    # cv_builder.base_fingerprint() of the portfolio data pdf_file was built
+    # from; a mismatch means the PDF is stale.
+    base_fingerprint = models.CharField(max_length=64, blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     is_final = models.BooleanField(
         default=False,
@@ -105,4 +145,69 @@ class RecruiterResponse(models.Model):
         verbose_name_plural = "Recruiter Responses"
 
     def __str__(self):
-        return f"{self.response_type} for {self.cv_version}"
\ No newline at end of file
+        return f"{self.response_type} for {self.cv_version}"
+
+
+class PdfRenderJob(models.Model):
+    """A queued WeasyPrint render, processed by the ``render_pdf_jobs`` worker.
+
+    ``html`` is the fully rendered CV template, so the worker needs no
+    request context. The result always lands in the content-addressed PDF
+    cache under ``digest``; when ``cv_version`` is set it is also saved to
+    that version's ``pdf_file`` as ``pdf_name``.
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    status = models.CharField(max_length=20, default=STATUS_QUEUED, db_index=True)
+    digest = models.CharField(max_length=64, db_index=True)
+    html = models.TextField(blank=True)
+    cv_version = models.ForeignKey(
+        CVVersion,
+        related_name='pdf_jobs',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+    )
+    pdf_name = models.CharField(max_length=255, blank=True)
+    # Recorded on cv_version once the PDF is saved.
+    base_fingerprint = models.CharField(max_length=64, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = "PDF Render Job"
+        verbose_name_plural = "PDF Render Jobs"
+
+    def __str__(self):
+        return f"PDF job {self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+
+class BaseCVDataVersion(models.Model):
+    """Version token of the portfolio data the base CV is built from.
+
+    A single row whose ``token`` is replaced whenever that data changes
+    (see ``cv_builder.invalidate_base_context``). The cached base CV
+    snapshot is keyed by it, so every worker stops serving the old snapshot
+    once the change commits, whatever the cache backend.
+    """
+
+    token = models.CharField(max_length=32)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Base CV Data Version"
+
+    def __str__(self):
+        return f"Base CV data {self.token}"
@@ -2,20 +2,729 @@
 
 Works with any provider that implements the OpenAI API spec
 (OpenAI, ZAI/GLM, DeepSeek, etc.) via configurable base_url.
+
+One client (and so one httpx connection pool) is shared by every thread of
+the process, so chat turns reuse open keep-alive connections instead of
+paying a DNS lookup and TLS handshake per call. The client is rebuilt when
+the ``AI_*`` settings it was built from change, and ``client_stats()``
+reports how many requests went out over a reused connection.
+
+The ``a*`` functions are the asyncio counterparts used by the async views.
+An ``AsyncOpenAI`` client's pool belongs to the event loop it was created
+on, so there is one per running loop: a single shared client under an ASGI
+server. (The async views are not served under WSGI, where each request
+would run on a loop, and so build a client, of its own.)
+
+Non-streamed completions can be served from an opt-in, per-process response
+cache (``AI_RESPONSE_CACHE_SIZE``) keyed by a hash of the provider, model,
+sampling parameters and messages. Only deterministic requests (temperature
+0) are cached unless ``AI_RESPONSE_CACHE_FORCE`` or ``cache=True`` says
+otherwise; ``response_cache_stats()`` reports the hit rate.
+
+Every provider call runs under a per-call deadline (``AI_DEADLINE``): each
+attempt times out after ``AI_TIMEOUT`` or the time left, whichever is
+shorter, and transient failures (connection errors, timeouts, 408/409/429
+and 5xx responses) are retried up to ``AI_MAX_RETRIES`` times with
+exponential backoff while time remains. A per-process circuit breaker
+counts calls that still fail; after ``AI_BREAKER_FAILURES`` in a row it
+opens and calls raise ``AIUnavailable`` at once (the views answer 503)
+until ``AI_BREAKER_RESET_TIMEOUT`` has passed and a trial call succeeds.
+``breaker_state()`` is reported by ``/health``.
+
+Calls are admitted by a limiter so a busy assistant cannot take every
+request thread from the public pages: at most ``AI_MAX_IN_FLIGHT`` sync
+provider calls (streams until they end) run at once per process, each
+pinning a request thread, and at most ``AI_CLUSTER_MAX_IN_FLIGHT`` calls
+across the workers sharing the cache backend. Async calls pin no thread
+and have their own, by default unlimited, ``AI_ASYNC_MAX_IN_FLIGHT``.
+A call that gets no slot within ``AI_QUEUE_TIMEOUT`` raises ``AIBusy``, an
+``AIUnavailable``. Background calls (``background=True``) skip the
+per-process limit and never wait for a cluster slot, so they only use
+idle capacity. Replies served from the response cache need no slot.
 """
-from openai import OpenAI
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+import uuid
+import weakref
+
+import httpx
+import openai
 from django.conf import settings
+from django.core.cache import cache as django_cache
+from openai import AsyncOpenAI, OpenAI
+
+from core.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_key = None
+_client_pid = None
+_client_lock = threading.Lock()
+# event loop -> (settings key, AsyncOpenAI client)
+_async_clients = weakref.WeakKeyDictionary()
+
+_stats_lock = threading.Lock()
+_clients_created = 0
+_requests = 0
+_connections_opened = 0
+
+_response_cache = None
+_response_cache_config = None
+_response_cache_lock = threading.Lock()
+_cache_bypassed = 0
+
+_admission_lock = threading.Lock()
+# limit setting name -> (limit, semaphore)
+_semaphores = {}
+_in_flight = 0
+_admitted = 0
+_queued = 0
+_rejected = 0
+
+
+def _settings_key():
+    return (
+        settings.AI_API_KEY,
+        settings.AI_BASE_URL,
+        getattr(settings, 'AI_TIMEOUT', 60.0),
+        getattr(settings, 'AI_CONNECT_TIMEOUT', 10.0),
+        getattr(settings, 'AI_MAX_CONNECTIONS', 10),
+        getattr(settings, 'AI_MAX_KEEPALIVE_CONNECTIONS', 5),
+        getattr(settings, 'AI_KEEPALIVE_EXPIRY', 60.0),
+    )
+
+
+def _trace(event_name, info):
+    # httpcore reports every TCP connect; a request without one reused a
+    # pooled connection.
+    global _connections_opened
+    if event_name == 'connection.connect_tcp.complete':
+        with _stats_lock:
+            _connections_opened += 1
+
+
+def _on_request(request):
+    global _requests
+    request.extensions['trace'] = _trace
+    with _stats_lock:
+        _requests += 1
+
+
+async def _atrace(event_name, info):
+    _trace(event_name, info)
+
+
+async def _aon_request(request):
+    global _requests
+    request.extensions['trace'] = _atrace
+    with _stats_lock:
+        _requests += 1
+
+
+def _build_client(key, is_async=False):
+    global _clients_created
+    (api_key, base_url, timeout, connect_timeout, max_connections,
+     max_keepalive, keepalive_expiry) = key
+    http_client_class, client_class, on_request = (
+        (httpx.AsyncClient, AsyncOpenAI, _aon_request) if is_async
+        else (httpx.Client, OpenAI, _on_request)
+    )
+    http_client = http_client_class(
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        event_hooks={'request': [on_request]},
+    )
+    with _stats_lock:
+        _clients_created += 1
+    return client_class(
+        api_key=api_key,
+        base_url=base_url,
+        # Retries are ours (_call), bounded by the call's deadline.
+        max_retries=0,
+        http_client=http_client,
+    )
+
+
+def _log_usage(response):
+    # Actual prompt size as counted by the provider (cv_adapter logs its
+    # estimate before the call).
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        logger.info(
+            "AI completion (%s): %s prompt tokens, %s completion tokens",
+            response.model, usage.prompt_tokens, usage.completion_tokens,
+        )
 
 
 def get_ai_client():
-    """Return an OpenAI client configured with the project's AI_* settings."""
-    return OpenAI(
-        api_key=settings.AI_API_KEY,
-        base_url=settings.AI_BASE_URL,
+    """Return the process-wide OpenAI client for the current AI_* settings.
+
+    The client is thread-safe and built lazily; a forked child or a change
+    to the settings gets a fresh one (the old client closes its pool once
+    in-flight calls drop their reference).
+    """
+    global _client, _client_key, _client_pid
+    key = _settings_key()
+    pid = os.getpid()
+    client = _client
+    if client is not None and _client_key == key and _client_pid == pid:
+        return client
+    with _client_lock:
+        if _client is None or _client_key != key or _client_pid != pid:
+            _client = _build_client(key)
+            _client_key = key
+            _client_pid = pid
+        return _client
+
+
+def get_async_ai_client():
+    """Return the ``AsyncOpenAI`` client of the running event loop.
+
+    Must be called from a coroutine. Rebuilt when the AI_* settings change.
+    """
+    loop = asyncio.get_running_loop()
+    key = _settings_key()
+    with _client_lock:
+        entry = _async_clients.get(loop)
+        if entry is None or entry[0] != key:
+            entry = (key, _build_client(key, is_async=True))
+            _async_clients[loop] = entry
+        return entry[1]
+
+
+def reset_ai_client():
+    """Drop the shared clients so the next call builds new ones."""
+    global _client, _client_key, _client_pid
+    with _client_lock:
+        client, _client, _client_key, _client_pid = _client, None, None, None
+        _async_clients.clear()
+    if client is not None:
+        client.close()
+
+
+def client_stats():
+    """Return connection-reuse counters for the shared client.
+
+    ``requests`` counts HTTP requests sent (retries included),
+    ``connections_opened`` the TCP connections made for them and
+    ``connections_reused`` the requests served over a pooled connection.
+    """
+    with _stats_lock:
+        requests, opened, created = _requests, _connections_opened, _clients_created
+    return {
+        'clients_created': created,
+        'requests': requests,
+        'connections_opened': opened,
+        'connections_reused': max(requests - opened, 0),
+    }
+
+
+def reset_client_stats():
+    global _clients_created, _requests, _connections_opened
+    with _stats_lock:
+        _clients_created = 0
+        _requests = 0
+        _connections_opened = 0
+
+
+class AIUnavailable(Exception):
+    """The circuit breaker is open: the provider was not called."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker shared by the process's AI calls.
+
+    Closed: calls go through. After ``AI_BREAKER_FAILURES`` failed calls in
+    a row it opens and ``before_call()`` raises ``AIUnavailable`` for
+    ``AI_BREAKER_RESET_TIMEOUT`` seconds; then it is half-open and lets one
+    trial call through, which closes it again or reopens it. A threshold of
+    0 disables the breaker.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    @staticmethod
+    def _threshold():
+        return getattr(settings, 'AI_BREAKER_FAILURES', 5)
+
+    @staticmethod
+    def _reset_timeout():
+        return getattr(settings, 'AI_BREAKER_RESET_TIMEOUT', 30.0)
+
+    def before_call(self):
+        """Admit a call or raise ``AIUnavailable``."""
+        if self._threshold() <= 0:
+            return
+        with self._lock:
+            if self.state == self.OPEN:
+                retry_in = self._reset_timeout() - (time.monotonic() - self.opened_at)
+                if retry_in > 0:
+                    raise AIUnavailable(
+                        f"AI provider is failing; retrying in {math.ceil(retry_in)}s."
+                    )
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    raise AIUnavailable("AI provider is recovering; please retry shortly.")
+                self._trial_in_flight = True
+
+    def record_success(self):
+        """The provider answered (with a result or a non-transient error)."""
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("AI circuit breaker closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """A call failed with a transient error after its retries."""
+        threshold = self._threshold()
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if threshold > 0 and (self.state == self.HALF_OPEN or self.failures >= threshold):
+                if self.state != self.OPEN:
+                    logger.warning("AI circuit breaker opened after %s failed calls", self.failures)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = 0.0
+            if self.state == self.OPEN:
+                elapsed = time.monotonic() - self.opened_at
+                retry_in = max(self._reset_timeout() - elapsed, 0.0)
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'retry_in': round(retry_in, 1),
+            }
+
+
+_breaker = CircuitBreaker()
+
+
+def breaker_state():
+    """Return the circuit breaker's state, failure count and reopen delay."""
+    return _breaker.snapshot()
+
+
+def reset_breaker():
+    _breaker.reset()
+
+
+class AIBusy(AIUnavailable):
+    """No in-flight slot freed up within ``AI_QUEUE_TIMEOUT``."""
+
+
+# Seconds between attempts to take a cluster slot (and, for async calls,
+# a process slot).
+_ADMISSION_POLL_INTERVAL = 0.05
+_CLUSTER_SLOT_KEY = 'ai-client:in-flight:{}'
+
+
+def _get_semaphore(setting):
+    """Return the process semaphore for the ``setting`` limit (``None`` when off)."""
+    limit = getattr(settings, setting, 0)
+    if limit <= 0:
+        return None
+    with _admission_lock:
+        # Calls admitted by a replaced semaphore release into that one.
+        entry = _semaphores.get(setting)
+        if entry is None or entry[0] != limit:
+            entry = (limit, threading.BoundedSemaphore(limit))
+            _semaphores[setting] = entry
+        return entry[1]
+
+
+def _cluster_slot_keys():
+    limit = getattr(settings, 'AI_CLUSTER_MAX_IN_FLIGHT', 0)
+    keys = [_CLUSTER_SLOT_KEY.format(index) for index in range(limit)]
+    # Concurrent callers probe the slots in different orders.
+    random.shuffle(keys)
+    return keys
+
+
+def _cluster_slot_timeout():
+    # The slot of a worker killed mid-call frees itself when its key
+    # expires; no call outlives its deadline plus one more read.
+    return math.ceil(getattr(settings, 'AI_DEADLINE', 90.0) + getattr(settings, 'AI_TIMEOUT', 60.0))
+
+
+def _count_admission(admitted, waited):
+    global _in_flight, _admitted, _queued, _rejected
+    with _admission_lock:
+        if admitted:
+            _in_flight += 1
+            _admitted += 1
+        else:
+            _rejected += 1
+        if waited:
+            _queued += 1
+
+
+def _busy():
+    return AIBusy("AI assistant is busy; please retry shortly.")
+
+
+def _cache_failed(action):
+    # A broken shared cache must never break AI calls: admission falls back
+    # to the process limit.
+    logger.warning("Could not %s a cluster AI slot; the cache is unavailable",
+                   action, exc_info=True)
+
+
+class _Admission:
+    """Hold an in-flight slot for the duration of a (sync or async) ``with`` block.
+
+    The process slot is taken first, so only admitted-locally calls poll
+    the shared cache for a cluster slot. The async form never blocks the
+    event loop: it polls the semaphore instead of waiting on it. A cluster
+    slot is a cache key holding this admission's token, so a call that
+    outlived the key's expiry does not free a slot another call has since
+    taken.
+    """
+
+    def __init__(self, background=False):
+        self._background = background
+        self._semaphore = None
+        self._slot = None
+        self._token = uuid.uuid4().hex
+        self._waited = False
+
+    def _deadline(self):
+        queue_timeout = 0 if self._background else getattr(settings, 'AI_QUEUE_TIMEOUT', 5.0)
+        return time.monotonic() + queue_timeout
+
+    def __enter__(self):
+        deadline = self._deadline()
+        semaphore = None if self._background else _get_semaphore('AI_MAX_IN_FLIGHT')
+        if semaphore is not None and not semaphore.acquire(blocking=False):
+            self._waited = True
+            if not semaphore.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                _count_admission(False, self._waited)
+                raise _busy()
+        try:
+            self._slot = self._take_cluster_slot(deadline)
+        except BaseException as exc:
+            if semaphore is not None:
+                semaphore.release()
+            if isinstance(exc, AIBusy):
+                _count_admission(False, self._waited)
+            raise
+        self._semaphore = semaphore
+        _count_admission(True, self._waited)
+        return self
+
+    def _take_cluster_slot(self, deadline):
+        keys = _cluster_slot_keys()
+        timeout = _cluster_slot_timeout()
+        while keys:
+            try:
+                slot = next(
+                    (key for key in keys if django_cache.add(key, self._token, timeout)), None,
+                )
+            except Exception:
+                _cache_failed('take')
+                return None
+            if slot is not None:
+                return slot
+            self._waited = True
+            if time.monotonic() >= deadline:
+                raise _busy()
+            time.sleep(_ADMISSION_POLL_INTERVAL)
+        return None
+
+    def __exit__(self, *exc_info):
+        try:
+            if self._slot is not None and django_cache.get(self._slot) == self._token:
+                django_cache.delete(self._slot)
+        except Exception:
+            _cache_failed('release')
+        finally:
+            self._release()
+
+    async def __aenter__(self):
+        deadline = self._deadline()
+        semaphore = None if self._background else _get_semaphore('AI_ASYNC_MAX_IN_FLIGHT')
+        while semaphore is not None and not semaphore.acquire(blocking=False):
+            self._waited = True
+            if time.monotonic() >= deadline:
+                _count_admission(False, self._waited)
+                raise _busy()
+            await asyncio.sleep(_ADMISSION_POLL_INTERVAL)
+        try:
+            self._slot = await self._atake_cluster_slot(deadline)
+        except BaseException as exc:
+            if semaphore is not None:
+                semaphore.release()
+            if isinstance(exc, AIBusy):
+                _count_admission(False, self._waited)
+            raise
+        self._semaphore = semaphore
+        _count_admission(True, self._waited)
+        return self
+
+    async def _atake_cluster_slot(self, deadline):
+        keys = _cluster_slot_keys()
+        timeout = _cluster_slot_timeout()
+        while keys:
+            try:
+                for key in keys:
+                    if await django_cache.aadd(key, self._token, timeout):
+                        return key
+            except Exception:
+                _cache_failed('take')
+                return None
+            self._waited = True
+            if time.monotonic() >= deadline:
+                raise _busy()
+            await asyncio.sleep(_ADMISSION_POLL_INTERVAL)
+        return None
+
+    async def __aexit__(self, *exc_info):
+        try:
+            if self._slot is not None and await django_cache.aget(self._slot) == self._token:
+                await django_cache.adelete(self._slot)
+        except Exception:
+            _cache_failed('release')
+        finally:
+            self._release()
+
+    def _release(self):
+        global _in_flight
+        if self._semaphore is not None:
+            self._semaphore.release()
+        with _admission_lock:
+            _in_flight -= 1
+
+
+def admission_stats():
+    """Return the in-flight limits and admission counters of this process.
+
+    ``queued`` counts calls that had to wait for a slot, ``rejected`` those
+    that gave up after ``AI_QUEUE_TIMEOUT`` (answered 503).
+    """
+    with _admission_lock:
+        return {
+            'in_flight': _in_flight,
+            'max_in_flight': getattr(settings, 'AI_MAX_IN_FLIGHT', 0),
+            'async_max_in_flight': getattr(settings, 'AI_ASYNC_MAX_IN_FLIGHT', 0),
+            'cluster_max_in_flight': getattr(settings, 'AI_CLUSTER_MAX_IN_FLIGHT', 0),
+            'admitted': _admitted,
+            'queued': _queued,
+            'rejected': _rejected,
+        }
+
+
+def reset_admission_stats():
+    global _admitted, _queued, _rejected
+    with _admission_lock:
+        _admitted = 0
+        _queued = 0
+        _rejected = 0
+
+
+def _is_transient(exc):
+    """Whether ``exc`` may succeed on retry (and counts against the breaker)."""
+    if isinstance(exc, openai.APIConnectionError):  # includes timeouts
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in (408, 409, 429) or exc.status_code >= 500
+    return False
+
+
+def _attempt_timeout(deadline):
+    remaining = max(deadline - time.monotonic(), 0.001)
+    return httpx.Timeout(
+        min(getattr(settings, 'AI_TIMEOUT', 60.0), remaining),
+        connect=min(getattr(settings, 'AI_CONNECT_TIMEOUT', 10.0), remaining),
     )
 
 
-def chat_completion(messages, model=None, temperature=None, max_tokens=None):
+def _retry_delay(attempt, exc, deadline):
+    """Seconds to wait before retry ``attempt`` (1-based), or ``None`` to give up."""
+    if not _is_transient(exc) or attempt > getattr(settings, 'AI_MAX_RETRIES', 2):
+        return None
+    base = getattr(settings, 'AI_RETRY_BACKOFF', 0.5)
+    delay = min(base * 2 ** (attempt - 1), getattr(settings, 'AI_RETRY_BACKOFF_MAX', 8.0))
+    # Jitter spreads the retries of concurrent calls.
+    delay *= random.uniform(0.5, 1.0)
+    if time.monotonic() + delay >= deadline:
+        return None
+    return delay
+
+
+def _call(create, **kwargs):
+    """Run ``create(**kwargs)`` under the deadline, retry and breaker policy."""
+    _breaker.before_call()
+    deadline = time.monotonic() + getattr(settings, 'AI_DEADLINE', 90.0)
+    attempt = 0
+    while True:
+        try:
+            result = create(timeout=_attempt_timeout(deadline), **kwargs)
+        except Exception as exc:
+            attempt += 1
+            delay = _retry_delay(attempt, exc, deadline)
+            if delay is None:
+                _record_outcome(exc)
+                raise
+            logger.warning("AI call failed (%s); retry %s in %.1fs", exc, attempt, delay)
+            time.sleep(delay)
+            continue
+        _breaker.record_success()
+        return result
+
+
+async def _acall(create, **kwargs):
+    """Async ``_call()``: ``create`` returns an awaitable."""
+    _breaker.before_call()
+    deadline = time.monotonic() + getattr(settings, 'AI_DEADLINE', 90.0)
+    attempt = 0
+    while True:
+        try:
+            result = await create(timeout=_attempt_timeout(deadline), **kwargs)
+        except Exception as exc:
+            attempt += 1
+            delay = _retry_delay(attempt, exc, deadline)
+            if delay is None:
+                _record_outcome(exc)
+                raise
+            logger.warning("AI call failed (%s); retry %s in %.1fs", exc, attempt, delay)
+            await asyncio.sleep(delay)
+            continue
+        _breaker.record_success()
+        return result
+
+
+def _record_outcome(exc):
+    if _is_transient(exc):
+        _breaker.record_failure()
+    else:
+        _breaker.record_success()
+
+
+def _get_response_cache():
+    """Return the response LRU for the current settings (``None`` when off)."""
+    global _response_cache, _response_cache_config
+    config = (
+        getattr(settings, 'AI_RESPONSE_CACHE_SIZE', 0),
+        getattr(settings, 'AI_RESPONSE_CACHE_TIMEOUT', 60 * 60),
+    )
+    if config[0] <= 0:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None or _response_cache_config != config:
+            _response_cache = LRUCache(maxsize=config[0], ttl=config[1] or None)
+            _response_cache_config = config
+        return _response_cache
+
+
+def _request_params(model, temperature, max_tokens):
+    return {
+        'model': model or settings.AI_MODEL,
+        'temperature': temperature if temperature is not None else settings.AI_TEMPERATURE,
+        'max_tokens': max_tokens or settings.AI_MAX_TOKENS,
+    }
+
+
+def _response_cache_key(messages, params):
+    payload = json.dumps(
+        [settings.AI_BASE_URL, params, messages],
+        sort_keys=True, ensure_ascii=False, separators=(',', ':'),
+    )
+    return 'ai-response:' + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _cache_for(params, cache):
+    """Return the response cache to use for a call, or ``None`` to bypass it.
+
+    ``cache`` is the per-call override: ``False`` never caches, ``True``
+    caches even a sampled (temperature > 0) request, ``None`` caches
+    temperature 0 requests, or every request with ``AI_RESPONSE_CACHE_FORCE``.
+    """
+    global _cache_bypassed
+    response_cache = _get_response_cache()
+    if response_cache is None:
+        return None
+    if cache is None:
+        cache = params['temperature'] <= 0 or getattr(settings, 'AI_RESPONSE_CACHE_FORCE', False)
+    if not cache:
+        with _stats_lock:
+            _cache_bypassed += 1
+        return None
+    return response_cache
+
+
+def response_cache_stats():
+    """Return hit/miss counters for the response cache.
+
+    ``bypassed`` counts calls that skipped the enabled cache (sampled
+    requests that were not forced); ``hit_rate`` is hits / (hits + misses).
+    """
+    response_cache = _get_response_cache()
+    if response_cache is not None:
+        stats = response_cache.stats()
+    else:
+        stats = {'hits': 0, 'misses': 0, 'size': 0, 'maxsize': 0}
+    with _stats_lock:
+        stats['bypassed'] = _cache_bypassed
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
+
+
+def clear_response_cache():
+    """Empty the response cache and reset its counters."""
+    global _cache_bypassed
+    with _response_cache_lock:
+        response_cache = _response_cache
+    if response_cache is not None:
+        response_cache.clear()
+    with _stats_lock:
+        _cache_bypassed = 0
+
+
+def discard_cached_response(messages, model=None, temperature=None, max_tokens=None):
+    """Forget the cached reply to this request, e.g. after it failed to parse.
+
+    Without this a retry would be served the same unusable reply.
+    """
+    response_cache = _get_response_cache()
+    if response_cache is not None:
+        params = _request_params(model, temperature, max_tokens)
+        response_cache.delete(_response_cache_key(messages, params))
+
+
+def chat_completion(messages, model=None, temperature=None, max_tokens=None, cache=None,
+                    background=False):
     """Send messages to the AI and return the response text.
 
     Args:
@@ -23,15 +732,94 @@ def chat_completion(messages, model=None, temperature=None, max_tokens=None):
         model: Model name override (defaults to settings.AI_MODEL).
         temperature: Sampling temperature override.
         max_tokens: Max output tokens override.
+        cache: Response cache override: ``True`` caches even a sampled
+               request, ``False`` never uses the cache.
+        background: The call runs off the request threads: it skips the
+                    per-process limit and fails with ``AIBusy`` at once
+                    rather than queue for a cluster slot.
 
     Returns:
         The assistant's response content as a string.
     """
+    params = _request_params(model, temperature, max_tokens)
+    response_cache = _cache_for(params, cache)
+    if response_cache is not None:
+        key = _response_cache_key(messages, params)
+        content = response_cache.get(key)
+        if content is not None:
+            return content
+
     client = get_ai_client()
-    response = client.chat.completions.create(
-        model=model or settings.AI_MODEL,
-        messages=messages,
-        temperature=temperature if temperature is not None else settings.AI_TEMPERATURE,
-        max_tokens=max_tokens or settings.AI_MAX_TOKENS,
-    )
-    return response.choices[0].message.content
\ No newline at end of file
+    with _Admission(background=background):
+        response = _call(client.chat.completions.create, messages=messages, **params)
+    _log_usage(response)
+    content = response.choices[0].message.content
+    if response_cache is not None and content:
+        response_cache.set(key, content)
+    return content
+
+
+async def achat_completion(messages, model=None, temperature=None, max_tokens=None, cache=None):
+    """Async ``chat_completion()``: awaits the reply without holding a thread."""
+    params = _request_params(model, temperature, max_tokens)
+    response_cache = _cache_for(params, cache)
+    if response_cache is not None:
+        key = _response_cache_key(messages, params)
+        content = response_cache.get(key)
+        if content is not None:
+            return content
+
+    client = get_async_ai_client()
+    async with _Admission():
+        response = await _acall(client.chat.completions.create, messages=messages, **params)
+    _log_usage(response)
+    content = response.choices[0].message.content
+    if response_cache is not None and content:
+        response_cache.set(key, content)
+    return content
+
+
+def chat_completion_stream(messages, model=None, temperature=None, max_tokens=None):
+    """Like ``chat_completion()`` but yield the response text as it arrives.
+
+    Yields the content deltas of a streamed completion. Closing the
+    generator early closes the HTTP response, so an abandoned stream stops
+    consuming tokens. Opening the stream is retried like ``chat_completion()``;
+    a failure once deltas have been sent is not.
+    """
+    client = get_ai_client()
+    with _Admission():
+        stream = _call(
+            client.chat.completions.create,
+            messages=messages,
+            stream=True,
+            **_request_params(model, temperature, max_tokens),
+        )
+        try:
+            with stream:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except Exception as exc:
+            _record_outcome(exc)
+            raise
+
+
+async def achat_completion_stream(messages, model=None, temperature=None, max_tokens=None):
+    """Async ``chat_completion_stream()``: an async generator of content deltas."""
+    client = get_async_ai_client()
+    async with _Admission():
+        stream = await _acall(
+            client.chat.completions.create,
+            messages=messages,
+            stream=True,
+            **_request_params(model, temperature, max_tokens),
+        )
+        try:
+            async with stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except Exception as exc:
+            _record_outcome(exc)
+            raise
@@ -0,0 +1,171 @@
+"""Rolling conversation summaries persisted per job application.
+
+Long chats would otherwise resend (or, once windowed, silently lose) their
+early turns on every request. Once ``AI_SUMMARY_EVERY`` messages have piled
+up beyond the ``AI_SUMMARY_KEEP_RECENT`` most recent ones, those older
+messages are folded into ``JobApplication.conversation_summary`` by one
+extra LLM call, and ``summarized_through`` moves past them. Chat turns and
+CV generations then send the summary plus the unsummarized tail, so prompt
+size stays bounded however long the conversation runs. The newest messages
+are never folded, and the user message being answered is always sent.
+
+Updates are scheduled after a reply is saved and run once the transaction
+commits, on a single background thread by default (``AI_SUMMARY_BACKGROUND``)
+so the chat response does not wait for them. Background updates only use
+idle AI capacity (``chat_completion(background=True)``) and are put off
+while the assistant is busy. A failed or deferred update is retried after
+the next reply.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from apps.cv_assistant.models import JobApplication
+from apps.cv_assistant.services import cv_adapter
+from apps.cv_assistant.services.ai_client import AIBusy, chat_completion
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+# Job application ids with an update queued or running.
+_pending = set()
+
+
+def summarize_every():
+    """Messages that must accumulate before a summary update (0 disables)."""
+    return getattr(settings, 'AI_SUMMARY_EVERY', 10)
+
+
+def keep_recent():
+    """Most recent messages that always stay out of the summary."""
+    return max(getattr(settings, 'AI_SUMMARY_KEEP_RECENT', 6), 0)
+
+
+def unsummarized_messages(job_application):
+    """The job application's messages not covered by its summary."""
+    messages = job_application.messages.all()
+    if job_application.summarized_through is not None:
+        messages = messages.filter(pk__gt=job_application.summarized_through)
+    return messages
+
+
+def needs_update(job_application):
+    """Whether enough messages are waiting to be folded into the summary."""
+    every = summarize_every()
+    if every <= 0:
+        return False
+    return unsummarized_messages(job_application).count() >= every + keep_recent()
+
+
+def update_summary(job_application, background=False):
+    """Fold the older unsummarized messages into the stored summary.
+
+    Calls the LLM with the previous summary and the messages to fold
+    (as a ``background`` call when run off the request threads). The new
+    summary is only stored if no concurrent update moved
+    ``summarized_through`` in the meantime.
+
+    Returns:
+        True if a new summary was stored.
+    """
+    every = summarize_every()
+    if every <= 0:
+        return False
+    turns = list(
+        unsummarized_messages(job_application)
+        .order_by('pk')
+        .values('pk', 'role', 'content')
+    )
+    keep = keep_recent()
+    if len(turns) < every + keep:
+        return False
+    folded = turns[:len(turns) - keep]
+    # Keep a trailing user message with the reply that answers it.
+    while folded and folded[-1]['role'] == 'user':
+        folded.pop()
+    if not folded:
+        return False
+
+    summary = chat_completion(
+        cv_adapter.build_summary_messages(job_application.conversation_summary, folded),
+        temperature=0,
+        max_tokens=getattr(settings, 'AI_SUMMARY_MAX_TOKENS', 500),
+        background=background,
+    )
+    summary = (summary or '').strip()
+    if not summary:
+        logger.warning("Empty conversation summary for job %s; keeping the old one",
+                       job_application.pk)
+        return False
+
+    updated = JobApplication.objects.filter(
+        pk=job_application.pk,
+        summarized_through=job_application.summarized_through,
+    ).update(
+        conversation_summary=summary,
+        summarized_through=folded[-1]['pk'],
+        summary_updated_at=timezone.now(),
+    )
+    if not updated:
+        return False
+    logger.info("Summarized %s messages of job %s (through message %s)",
+                len(folded), job_application.pk, folded[-1]['pk'])
+    job_application.conversation_summary = summary
+    job_application.summarized_through = folded[-1]['pk']
+    return True
+
+
+def _run_update(job_application_id, background=False):
+    try:
+        job_application = JobApplication.objects.filter(pk=job_application_id).first()
+        if job_application is not None:
+            update_summary(job_application, background=background)
+    except AIBusy:
+        logger.info("AI assistant busy; conversation summary of job %s deferred",
+                    job_application_id)
+    except Exception:
+        logger.exception("Updating the conversation summary of job %s failed",
+                         job_application_id)
+
+
+def _run_in_background(job_application_id):
+    try:
+        _run_update(job_application_id, background=True)
+    finally:
+        with _executor_lock:
+            _pending.discard(job_application_id)
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # One thread: updates are rare, and it serializes the summary
+            # calls instead of adding a burst of load to the provider.
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='conversation-summary')
+        return _executor
+
+
+def _submit(job_application_id):
+    if not getattr(settings, 'AI_SUMMARY_BACKGROUND', True):
+        _run_update(job_application_id)
+        return
+    with _executor_lock:
+        if job_application_id in _pending:
+            return
+        _pending.add(job_application_id)
+    _get_executor().submit(_run_in_background, job_application_id)
+
+
+def schedule_update(job_application):
+    """Update the summary of ``job_application`` after commit, if it is due."""
+    if not needs_update(job_application):
+        return
+    job_application_id = job_application.pk
+    transaction.on_commit(lambda: _submit(job_application_id))
@@ -3,11 +3,33 @@
 Builds the system + user prompts for the LLM to adapt the base CV
 to a specific job description, and parses/validates the structured
 JSON response.
+
+Conversation history is windowed to ``AI_CONTEXT_TOKEN_BUDGET`` estimated
+tokens: the system prompt, the conversation summary (see
+``conversation_summary``) and the newest user message are always sent, then
+as many of the most recent unsummarized turns as fit. Every windowed prompt
+logs its estimated size.
 """
 import json
+import logging
+import math
 import re
 
+from django.conf import settings
+
+from apps.cv_assistant.services import cv_builder
 from apps.portfolio.models import Experience
+from core.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Formatted CV block and system prompts, keyed by the base data fingerprint.
+_prompt_cache = LRUCache(maxsize=128)
+
+# Rough size of a token for English/Spanish prose; no tokenizer dependency.
+CHARS_PER_TOKEN = 4
+# Role and framing tokens the chat format adds to every message.
+MESSAGE_OVERHEAD_TOKENS = 4
 
 
 def _format_base_cv_data(base_cv_data):
@@ -114,8 +136,10 @@ def build_system_prompt(base_cv_data):
     Returns:
         System prompt string for the LLM.
     """
-    cv_block = _format_base_cv_data(base_cv_data)
+    return _adaptation_system_prompt(_format_base_cv_data(base_cv_data))
+
 
+def _adaptation_system_prompt(cv_block):
     return f"""You are a CV adaptation assistant. Given the base CV data and a job description, \
 adapt the CV to match the job requirements.
 
@@ -160,7 +184,11 @@ def build_chat_system_prompt(base_cv_data, job_description=None):
     Returns:
         System prompt string for the LLM.
     """
-    cv_block = _format_base_cv_data(base_cv_data)
+    return _chat_system_prompt(_format_base_cv_data(base_cv_data), job_description)
+
+
+def _chat_system_prompt(cv_block, job_description):
+    # The CV block comes first so the prompt prefix is shared by every job.
     job_block = job_description or "No job description provided."
 
     return f"""You are an expert career coach and CV advisor embedded in a job-application \
@@ -190,7 +218,61 @@ summarize in one or two lines what the adaptation should focus on.
 6. Do not invent experiences, skills, companies or dates that are not in the CV."""
 
 
-def build_adaptation_prompt(job_description, user_instructions=None, conversation_history=None):
+def base_cv_block(base_snapshot=None):
+    """The formatted block of the base CV data, memoized.
+
+    ``base_snapshot`` is a ``cv_builder.get_base_snapshot()`` pair (the
+    current one by default). Entries are keyed by its fingerprint, so a
+    portfolio change (which replaces the base snapshot) yields a new block.
+    """
+    snapshot, fingerprint = base_snapshot or cv_builder.get_base_snapshot()
+    key = ('cv_block', fingerprint)
+    cv_block = _prompt_cache.get(key)
+    if cv_block is None:
+        cv_block = _format_base_cv_data(snapshot)
+        _prompt_cache.set(key, cv_block)
+    return cv_block
+
+
+def adaptation_system_prompt():
+    """Memoized ``build_system_prompt()`` for the current base CV data."""
+    # One snapshot read: the key and the block always describe the same data.
+    base_snapshot = cv_builder.get_base_snapshot()
+    key = ('adaptation', base_snapshot[1])
+    prompt = _prompt_cache.get(key)
+    if prompt is None:
+        prompt = _adaptation_system_prompt(base_cv_block(base_snapshot))
+        _prompt_cache.set(key, prompt)
+    return prompt
+
+
+def chat_system_prompt(job_description=None):
+    """Memoized ``build_chat_system_prompt()`` for the current base CV data.
+
+    The prompt of a job stays byte-identical across chat turns until the
+    portfolio or the job description changes, so providers with prompt
+    prefix caching can reuse it.
+    """
+    base_snapshot = cv_builder.get_base_snapshot()
+    key = ('chat', base_snapshot[1], job_description or '')
+    prompt = _prompt_cache.get(key)
+    if prompt is None:
+        prompt = _chat_system_prompt(base_cv_block(base_snapshot), job_description)
+        _prompt_cache.set(key, prompt)
+    return prompt
+
+
+def prompt_cache_stats():
+    """Return hit/miss counters for the memoized prompt text."""
+    return _prompt_cache.stats()
+
+
+def clear_prompt_cache():
+    _prompt_cache.clear()
+
+
+def build_adaptation_prompt(job_description, user_instructions=None, conversation_history=None,
+                            history_summary=None):
     """Build the user message with the job description and optional guidance.
 
     Args:
@@ -203,12 +285,20 @@ def build_adaptation_prompt(job_description, user_instructions=None, conversatio
                              assistant before pressing "Generate CV". The
                              gaps/strengths/emphases discussed there inform
                              the adaptation.
+        history_summary: Optional summary of the turns older than
+                         ``conversation_history``.
 
     Returns:
         User message string for the LLM.
     """
     prompt = f"Please adapt my CV for the following job description:\n\n{job_description}"
 
+    if history_summary:
+        prompt += (
+            "\n\nSUMMARY OF THE EARLIER CONVERSATION with the candidate:\n\n"
+            + history_summary
+        )
+
     if conversation_history:
         history_lines = []
         for m in conversation_history:
@@ -228,6 +318,197 @@ def build_adaptation_prompt(job_description, user_instructions=None, conversatio
     return prompt
 
 
+def build_summary_messages(previous_summary, turns):
+    """Build the request that folds ``turns`` into the conversation summary.
+
+    Args:
+        previous_summary: The stored summary of the turns before ``turns``
+                          (empty for the first summary).
+        turns: Chronological chat message dicts to condense.
+
+    Returns:
+        Messages for the LLM; the reply is the new summary text.
+    """
+    transcript = "\n\n".join(
+        f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}" for m in turns
+    )
+    prompt = (
+        f"SUMMARY SO FAR:\n{previous_summary or '(none)'}\n\n"
+        f"NEW MESSAGES:\n{transcript}"
+    )
+    return [
+        {
+            'role': 'system',
+            'content': (
+                "You maintain a running summary of a conversation between a job "
+                "candidate and their CV advisor. Merge the new messages into the "
+                "summary so far. Keep every fact about the candidate, the job, "
+                "agreed strengths, gaps, emphases and open questions; drop "
+                "pleasantries. Write in the language of the conversation, at most "
+                "250 words. Return only the updated summary."
+            ),
+        },
+        {'role': 'user', 'content': prompt},
+    ]
+
+
+def estimate_tokens(text):
+    """Estimate the token count of ``text`` (about 4 characters per token)."""
+    return math.ceil(len(text or '') / CHARS_PER_TOKEN)
+
+
+def estimate_message_tokens(message):
+    """Estimate the tokens one ``{"role", "content"}`` chat message costs."""
+    return estimate_tokens(message.get('content')) + MESSAGE_OVERHEAD_TOKENS
+
+
+def context_token_budget():
+    return getattr(settings, 'AI_CONTEXT_TOKEN_BUDGET', 12000)
+
+
+def recent_turns(turns_newest_first, budget):
+    """Take the most recent turns that fit in ``budget`` estimated tokens.
+
+    ``turns_newest_first`` may be a lazy iterable (e.g. a queryset ordered
+    by ``-created_at``); it is consumed only until the budget runs out, and
+    the window stops at the first turn that does not fit so it stays
+    contiguous.
+
+    Returns:
+        ``(turns, tokens, truncated)`` with ``turns`` in chronological order
+        and ``truncated`` set when older turns were left out.
+    """
+    kept = []
+    tokens = 0
+    for turn in turns_newest_first:
+        cost = estimate_message_tokens(turn)
+        if tokens + cost > budget:
+            return kept[::-1], tokens, True
+        kept.append({'role': turn['role'], 'content': turn['content']})
+        tokens += cost
+    return kept[::-1], tokens, False
+
+
+def build_chat_messages(system_prompt, new_message, history_newest_first, summary=None,
+                        budget=None, label='chat'):
+    """Build the chat request within the context token budget.
+
+    The system prompt, the conversation ``summary`` (which covers the turns
+    before ``history_newest_first``) and ``new_message`` (the user turn being
+    answered) are always included, even if they alone exceed the budget.
+    The remaining budget holds the most recent prior turns.
+
+    Returns:
+        ``(messages, stats)``; ``stats`` is also logged (see
+        ``log_prompt_size``).
+    """
+    budget = context_token_budget() if budget is None else budget
+    system_message = {'role': 'system', 'content': system_prompt}
+    summary_message = None
+    if summary:
+        summary_message = {
+            'role': 'system',
+            'content': f"Summary of the earlier conversation:\n{summary}",
+        }
+    fixed_tokens = estimate_message_tokens(system_message) + estimate_message_tokens(new_message)
+    if summary_message is not None:
+        fixed_tokens += estimate_message_tokens(summary_message)
+    history, history_tokens, truncated = recent_turns(
+        history_newest_first, max(budget - fixed_tokens, 0),
+    )
+
+    messages = [system_message]
+    tokens = fixed_tokens + history_tokens
+    if summary_message is not None:
+        messages.append(summary_message)
+    messages.extend(history)
+    messages.append({'role': new_message['role'], 'content': new_message['content']})
+
+    stats = {
+        'label': label,
+        'estimated_tokens': tokens,
+        'budget': budget,
+        'turns': len(history),
+        'truncated': truncated,
+        'summarized': summary_message is not None,
+    }
+    log_prompt_size(stats)
+    return messages, stats
+
+
+def build_adaptation_messages(base_cv_data, job_description, user_instructions=None,
+                              history_newest_first=(), summary=None, budget=None):
+    """Build the Generate CV request within the context token budget.
+
+    The conversation history inlined into the adaptation prompt is limited
+    to the most recent turns that fit next to the system prompt, job
+    description, instructions and ``summary`` (the turns before the
+    history). ``base_cv_data=None`` uses the memoized system prompt of the
+    current base CV data.
+
+    Returns:
+        ``(messages, stats)`` like ``build_chat_messages``.
+    """
+    budget = context_token_budget() if budget is None else budget
+    system_message = {
+        'role': 'system',
+        'content': (
+            adaptation_system_prompt() if base_cv_data is None
+            else build_system_prompt(base_cv_data)
+        ),
+    }
+    # The prompt with both section headers and an empty turn: every kept
+    # turn then adds less than its estimate_message_tokens().
+    framed_prompt = build_adaptation_prompt(
+        job_description,
+        user_instructions,
+        conversation_history=[{'role': 'user', 'content': ''}],
+        history_summary=summary,
+    )
+    history_budget = (
+        budget
+        - estimate_message_tokens(system_message)
+        - estimate_tokens(framed_prompt)
+        - MESSAGE_OVERHEAD_TOKENS
+    )
+    history, _history_tokens, truncated = recent_turns(
+        history_newest_first, max(history_budget, 0),
+    )
+    user_message = {
+        'role': 'user',
+        'content': build_adaptation_prompt(
+            job_description,
+            user_instructions,
+            conversation_history=history,
+            history_summary=summary,
+        ),
+    }
+    messages = [system_message, user_message]
+    stats = {
+        'label': 'generate-cv',
+        'estimated_tokens': sum(estimate_message_tokens(m) for m in messages),
+        'budget': budget,
+        'turns': len(history),
+        'truncated': truncated,
+        'summarized': bool(summary),
+    }
+    log_prompt_size(stats)
+    return messages, stats
+
+
+def log_prompt_size(stats):
+    """Log the estimated size of a prompt sent to the LLM."""
+    logger.info(
+        "%s prompt: ~%d tokens (budget %d), %d history turns%s",
+        stats['label'],
+        stats['estimated_tokens'],
+        stats['budget'],
+        stats['turns'],
+        ', older turns summarized' if stats['summarized']
+        else ', older turns dropped' if stats['truncated'] else '',
+    )
+
+
 def parse_ai_response(ai_response):
     """Parse the AI's JSON response and validate experience IDs.
 
@@ -4,12 +4,31 @@ The context assembly previously lived inline in
 ``apps.portfolio.views.GeneratePDFView``. It is extracted here so both the
 public PDF download path and any AI-adapted CV path can share the same
 template and rendering pipeline.
+
+The base (non-adapted) part of the context only changes when the owner
+edits portfolio data, yet it is needed by every PDF download, chat turn and
+CV generation. It is therefore built once as a plain-data snapshot
+(``SimpleNamespace`` objects, no model instances) and cached in Django's
+cache for ``CV_CONTEXT_CACHE_TIMEOUT`` seconds under the token of
+``BaseCVDataVersion``, which the ``post_save``/``post_delete`` handlers in
+``apps.cv_assistant.signals`` replace. Reading the token is one primary-key
+query, and it keeps every worker (and a per-process cache) from serving a
+snapshot older than the last committed change.
+``base_fingerprint()`` hashes that snapshot and the CV stylesheet; stored
+on each ``CVVersion``, it tells whether its PDF was built from the current
+portfolio data and styles. The
+fingerprint is computed once per snapshot and cached with it, so it also
+serves as a cheap version for values derived from the base data (e.g. the
+prompt text memoized by ``cv_adapter``).
 """
 
+import hashlib
+import json
 import types
+import uuid
 
-import markdown
 from django.conf import settings
+from django.core.cache import cache
 
 from apps.portfolio.models import (
     Certification,
@@ -19,6 +38,22 @@ from apps.portfolio.models import (
     SocialSettings,
     Summary,
 )
+from apps.cv_assistant.models import BaseCVDataVersion
+from apps.cv_assistant.services import pdf_generator
+from core.markdown import RENDERER_VERSION, render_markdown_many, render_pdf_markdown
+
+BASE_CONTEXT_CACHE_KEY = 'cv_builder:base_context'
+
+
+def _snapshot(instance):
+    """Copy the concrete field values of a model instance into a plain,
+    picklable namespace (``pk`` included)."""
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+    }
+    values['pk'] = instance.pk
+    return types.SimpleNamespace(**values)
 
 
 def _build_skill_columns():
@@ -32,7 +67,7 @@ def _build_skill_columns():
     for skill in skills:
         if skill.category not in skills_by_category:
             skills_by_category[skill.category] = []
-        skills_by_category[skill.category].append(skill)
+        skills_by_category[skill.category].append(_snapshot(skill))
 
     categories = list(skills_by_category.items())
     skill_columns = [[], [], []]
@@ -42,7 +77,25 @@ def _build_skill_columns():
     return skill_columns
 
 
-def _adapted_experiences(adapted_data):
+def _attach_pdf_html(objects, source, target):
+    """Render ``source`` of every object with the PDF markdown profile and
+    store it on ``target``.
+
+    All descriptions go through ``render_markdown_many`` as one batch, so
+    fragments already rendered for an earlier CV build come from the shared
+    render cache. Objects with an empty ``source`` are left untouched.
+    """
+    objects = list(objects)
+    htmls = render_markdown_many(
+        [getattr(obj, source) for obj in objects], profile='pdf',
+    )
+    for obj, html in zip(objects, htmls):
+        if getattr(obj, source):
+            setattr(obj, target, html)
+    return objects
+
+
+def _adapted_experiences(adapted_data, base_experiences):
     """Build a list of objects exposing the attributes the PDF template needs
     (``position``, ``company``, ``location``, ``start_date``, ``end_date``,
     ``current`` and ``description_html``) from the adapted data provided by
@@ -52,16 +105,24 @@ def _adapted_experiences(adapted_data):
         - ``summary``: str (the adapted summary text)
         - ``experiences``: list of dicts with ``id``, ``position``,
           ``company`` and ``description_adapted``.
+
+    ``base_experiences`` are the experience snapshots of the base context.
     """
     adapted_exp_map = {e['id']: e for e in adapted_data.get('experiences', [])}
 
-    base_experiences = Experience.objects.all()
+    matches = [adapted_exp_map.get(exp.id) for exp in base_experiences]
+    # Not adapted -> use the original (markdown-rendered) description
+    descriptions_html = render_markdown_many(
+        [
+            exp.description if match is None else match['description_adapted']
+            for exp, match in zip(base_experiences, matches)
+        ],
+        profile='pdf',
+    )
+
     adapted = []
-    for exp in base_experiences:
-        match = adapted_exp_map.get(exp.id)
+    for exp, match, description_html in zip(base_experiences, matches, descriptions_html):
         if match is None:
-            # Not adapted -> use the original (markdown-rendered) description
-            description_html = markdown.markdown(exp.description)
             adapted.append(types.SimpleNamespace(
                 position=exp.position,
                 company=exp.company,
@@ -80,63 +141,173 @@ def _adapted_experiences(adapted_data):
             start_date=exp.start_date,
             end_date=exp.end_date,
             current=exp.current,
-            description_html=markdown.markdown(match['description_adapted']),
+            description_html=description_html,
         ))
     return adapted
 
 
-def build_cv_context(adapted_data=None):
+def _build_base_snapshot():
+    """Query the portfolio models and render their markdown (PDF flavor).
+
+    The PDF uses its own (plain) markdown flavor, so the stored web
+    ``*_html`` columns are replaced in the snapshot with the PDF rendering.
+    """
+    certifications = _attach_pdf_html(
+        [_snapshot(cert) for cert in Certification.objects.all()],
+        'description', 'description_html',
+    )
+    education_list = _attach_pdf_html(
+        [_snapshot(edu) for edu in Education.objects.all()],
+        'description', 'description_html',
+    )
+    experiences = _attach_pdf_html(
+        [_snapshot(exp) for exp in Experience.objects.all()],
+        'description', 'description_html',
+    )
+
+    summary = Summary.objects.first()
+    if summary:
+        summary = _snapshot(summary)
+        summary.content_html = render_pdf_markdown(summary.content)
+
+    social_settings = SocialSettings.objects.first()
+    if social_settings:
+        social_settings = _snapshot(social_settings)
+
+    return {
+        'summary': summary,
+        'experiences': experiences,
+        'certifications': certifications,
+        'education_list': education_list,
+        'skill_columns': _build_skill_columns(),
+        'social_settings': social_settings,
+    }
+
+
+def base_data_version():
+    """Return the token of the current base CV data ('' before any change)."""
+    token = BaseCVDataVersion.objects.filter(pk=1).values_list('token', flat=True).first()
+    return token or ''
+
+
+def _base_context_cache_key(version):
+    # Markdown output is part of the snapshot, so a renderer change must
+    # not serve snapshots rendered by the previous one; a stylesheet change
+    # must not serve the old fingerprint. The entry holds a (snapshot,
+    # fingerprint) pair.
+    css = pdf_generator.stylesheet_digest()[:16]
+    return f'{BASE_CONTEXT_CACHE_KEY}:v{RENDERER_VERSION}:css{css}:{version}:fp'
+
+
+def _base_fingerprint_cache_key(version):
+    # The fingerprint alone, so version checks need not unpickle the
+    # snapshot.
+    return f'{_base_context_cache_key(version)}:id'
+
+
+def get_base_snapshot():
+    """Return ``(snapshot, fingerprint)`` of the base CV data.
+
+    Served from the cache when possible; ``CV_CONTEXT_CACHE_TIMEOUT = 0``
+    disables caching.
+    """
+    timeout = getattr(settings, 'CV_CONTEXT_CACHE_TIMEOUT', 3600)
+    if not timeout:
+        snapshot = _build_base_snapshot()
+        return snapshot, _fingerprint(snapshot)
+
+    version = base_data_version()
+    key = _base_context_cache_key(version)
+    try:
+        entry = cache.get(key)
+    except Exception:
+        # A broken shared cache must never break CV generation.
+        entry = None
+    if entry is None:
+        snapshot = _build_base_snapshot()
+        entry = (snapshot, _fingerprint(snapshot))
+        try:
+            cache.set_many({key: entry, _base_fingerprint_cache_key(version): entry[1]}, timeout)
+        except Exception:
+            pass
+    return entry
+
+
+def get_base_context():
+    """Return the base CV snapshot, from the cache when possible."""
+    return get_base_snapshot()[0]
+
+
+def invalidate_base_context():
+    """Retire the cached base CV snapshot (called on portfolio model changes).
+
+    Stores a new version token in the current transaction: other workers
+    switch to a fresh snapshot when it commits, and a rolled-back change
+    leaves the old token, whose snapshot is still valid. Tokens are random,
+    so a rolled-back one is never reused.
+    """
+    token = uuid.uuid4().hex
+    if not BaseCVDataVersion.objects.filter(pk=1).update(token=token):
+        BaseCVDataVersion.objects.get_or_create(pk=1, defaults={'token': token})
+
+
+def _fingerprint_default(value):
+    if isinstance(value, types.SimpleNamespace):
+        return vars(value)
+    return str(value)
+
+
+def _fingerprint(base):
+    payload = json.dumps(base, default=_fingerprint_default, sort_keys=True)
+    css = pdf_generator.stylesheet_digest()
+    return hashlib.sha256(f'{RENDERER_VERSION}\0{css}\0{payload}'.encode('utf-8')).hexdigest()
+
+
+def base_fingerprint(base=None):
+    """Return a sha256 of the base CV data (``base`` defaults to the current
+    snapshot, whose fingerprint is cached with it), the markdown renderer
+    version it was rendered with and the CV stylesheet."""
+    if base is not None:
+        return _fingerprint(base)
+    if getattr(settings, 'CV_CONTEXT_CACHE_TIMEOUT', 3600):
+        try:
+            fingerprint = cache.get(_base_fingerprint_cache_key(base_data_version()))
+        except Exception:
+            fingerprint = None
+        if fingerprint is not None:
+            return fingerprint
+    return get_base_snapshot()[1]
+
+
+def build_cv_context(adapted_data=None, base=None):
     """Assemble the context dict consumed by ``portfolio/cv_pdf.html``.
 
     When ``adapted_data`` is ``None`` the context is built from the base
-    portfolio models exactly like the original ``GeneratePDFView`` did.
+    portfolio data exactly like the original ``GeneratePDFView`` did.
 
     When ``adapted_data`` is provided it must be a dict with the keys
     ``summary`` (str) and ``experiences`` (list of dicts with ``id``,
     ``position``, ``company`` and ``description_adapted``). The adapted
-    values are used instead of the base models, while skills and
-    social settings are always pulled from the base models.
-    """
-    # Always derived from the base portfolio
-    certifications = Certification.objects.all()
-    for cert in certifications:
-        if cert.description:
-            cert.description_html = markdown.markdown(cert.description)
-
-    education_list = Education.objects.all()
-    for edu in education_list:
-        if edu.description:
-            edu.description_html = markdown.markdown(edu.description)
-
-    skill_columns = _build_skill_columns()
-    social_settings = SocialSettings.objects.first()
+    values are used instead of the base data, while skills and
+    social settings are always pulled from the base data.
 
-    if adapted_data is None:
-        summary = Summary.objects.first()
-        if summary:
-            summary.content_html = markdown.markdown(summary.content)
+    ``base`` lets batch callers build many contexts from one base snapshot
+    (``get_base_context()``) instead of fetching it per call.
 
-        experiences = Experience.objects.all()
-        for exp in experiences:
-            exp.description_html = markdown.markdown(exp.description)
+    A new dict is returned on every call, so callers may add keys to it.
+    """
+    context = dict(get_base_context() if base is None else base)
 
-        summary_obj = summary
-    else:
+    if adapted_data is not None:
         adapted_summary = adapted_data.get('summary', '')
-        summary_obj = types.SimpleNamespace(
+        context['summary'] = types.SimpleNamespace(
             title='Professional Summary',
             content=adapted_summary,
-            content_html=markdown.markdown(adapted_summary),
+            content_html=render_pdf_markdown(adapted_summary),
+        )
+        context['experiences'] = _adapted_experiences(
+            adapted_data, context['experiences'],
         )
-        experiences = _adapted_experiences(adapted_data)
 
-    context = {
-        'summary': summary_obj,
-        'experiences': experiences,
-        'certifications': certifications,
-        'education_list': education_list,
-        'skill_columns': skill_columns,
-        'social_settings': social_settings,
-        'pdf_owner_name': settings.PDF_OWNER_NAME,
-    }
-    return context
\ No newline at end of file
+    context['pdf_owner_name'] = settings.PDF_OWNER_NAME
+    return context
@@ -0,0 +1,168 @@
+"""Keep stored ``CVVersion`` PDFs in sync with the portfolio data.
+
+Every saved PDF records ``cv_builder.base_fingerprint()`` of the base data
+it was built from. After the portfolio changes, ``regenerate_stale()``
+re-renders only the versions whose fingerprint no longer matches: queued
+for the ``render_pdf_jobs`` worker when ``PDF_RENDER_ASYNC`` is on, laid
+out in parallel here otherwise. The ``render_pdf_jobs`` worker calls
+``queue_stale_if_changed()`` to queue them itself once a portfolio change
+commits, whatever ``PDF_RENDER_ASYNC`` says: it runs the jobs it queues.
+Database access stays on the calling thread;
+only the WeasyPrint layout (via the renderer pool when enabled) runs in
+the worker threads.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+
+from apps.cv_assistant.models import CVVersion
+from apps.cv_assistant.services import cv_builder, pdf_cache, pdf_generator, pdf_jobs
+
+logger = logging.getLogger(__name__)
+
+
+def adapted_context(cv_version, base=None):
+    """Rebuild the PDF context of ``cv_version`` from its stored adapted data."""
+    adapted_data = {
+        "summary": cv_version.adapted_summary or "",
+        "experiences": cv_version.adapted_experiences or [],
+    }
+    return cv_builder.build_cv_context(adapted_data=adapted_data, base=base)
+
+
+def pdf_name(cv_version):
+    """Reuse the existing file name, or name a first PDF after the version."""
+    existing_name = cv_version.pdf_file.name if cv_version.pdf_file else None
+    if existing_name:
+        return existing_name.split("/")[-1]
+    return f"cv_v{cv_version.version_number}_regenerated.pdf"
+
+
+def regenerate(cv_version):
+    """Re-render the PDF of one version. Returns the pending job, if queued."""
+    return pdf_jobs.render_for_cv_version(
+        cv_version, adapted_context(cv_version), pdf_name(cv_version),
+    )
+
+
+def stale_versions(fingerprint=None):
+    """Versions whose PDF is missing or built from other base data."""
+    if fingerprint is None:
+        fingerprint = cv_builder.base_fingerprint()
+    return CVVersion.objects.exclude(base_fingerprint=fingerprint).select_related(
+        "job_application",
+    )
+
+
+def _layout(html, digest):
+    pdf_bytes = pdf_cache.get(digest)
+    if pdf_bytes is None:
+        pdf_bytes = pdf_generator.html_to_pdf(html)
+        pdf_cache.put(digest, pdf_bytes)
+    return pdf_bytes
+
+
+def max_workers():
+    """Most parallel layouts worth running: one per renderer process.
+
+    More threads than renderers would only queue for a renderer (and could
+    time out waiting); in-process layout (no pool) runs one at a time.
+    """
+    return max(1, getattr(settings, "PDF_RENDER_POOL_SIZE", 0))
+
+
+def regenerate_many(versions, workers=None, queue=None):
+    """Re-render the PDFs of ``versions``, yielding progress as it happens.
+
+    One base snapshot and fingerprint are shared by every version. Yields
+    ``(cv_version, outcome, error)`` with ``outcome`` one of
+    ``"queued"``, ``"regenerated"`` or ``"failed"``; layouts finish, and
+    are reported, in any order. ``queue`` selects queueing render jobs over
+    laying out here (defaults to ``pdf_jobs.is_async()``). ``workers``
+    bounds the parallel layouts; it defaults to, and is capped at,
+    ``max_workers()``.
+    """
+    base = cv_builder.get_base_context()
+    fingerprint = cv_builder.base_fingerprint(base)
+    queue_jobs = pdf_jobs.is_async() if queue is None else queue
+
+    # Render the HTML (cheap, needs the ORM) up front on this thread.
+    pending = []
+    for cv_version in versions:
+        html = pdf_generator.render_cv_html(adapted_context(cv_version, base=base))
+        if queue_jobs:
+            pdf_jobs.enqueue(
+                html,
+                cv_version=cv_version,
+                pdf_name=pdf_name(cv_version),
+                base_fingerprint=fingerprint,
+            )
+            yield cv_version, "queued", None
+        else:
+            pending.append((cv_version, html))
+
+    if not pending:
+        return
+
+    limit = max_workers()
+    workers = limit if workers is None else min(max(1, workers), limit)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_layout, html, pdf_cache.html_digest(html)): cv_version
+            for cv_version, html in pending
+        }
+        for future in as_completed(futures):
+            cv_version = futures[future]
+            try:
+                pdf_jobs.save_cv_version_pdf(
+                    cv_version, pdf_name(cv_version), future.result(), fingerprint,
+                )
+            except Exception as exc:
+                logger.exception("Regenerating the PDF of CV version %s failed", cv_version.pk)
+                yield cv_version, "failed", str(exc)
+            else:
+                yield cv_version, "regenerated", None
+
+
+def regenerate_stale(force=False, workers=None, queue=None):
+    """Re-render every stale CV version (every version with ``force``).
+
+    ``workers`` and ``queue`` are passed to ``regenerate_many()``. Returns
+    counts: ``regenerated``, ``queued``, ``skipped`` (up to date) and
+    ``failed``.
+    """
+    total = CVVersion.objects.count()
+    versions = list(CVVersion.objects.all() if force else stale_versions())
+    counts = {
+        "regenerated": 0,
+        "queued": 0,
+        "skipped": total - len(versions),
+        "failed": 0,
+    }
+    for _cv_version, outcome, _error in regenerate_many(versions, workers=workers, queue=queue):
+        counts[outcome] += 1
+    return counts
+
+
+def queue_stale_if_changed(seen_version=None):
+    """Queue the stale CV versions if the base data changed since ``seen_version``.
+
+    ``seen_version`` is the ``cv_builder.base_data_version()`` returned by
+    the previous call (``None`` always scans). Always queues jobs, even with
+    ``PDF_RENDER_ASYNC`` off: the caller is the worker that runs them, and
+    nothing is laid out here. Returns the current version.
+    """
+    version = cv_builder.base_data_version()
+    if version == seen_version:
+        return version
+    try:
+        counts = regenerate_stale(queue=True)
+    except Exception:
+        # The next change scans again; the worker keeps rendering meanwhile.
+        logger.exception("Queueing the stale CV versions failed")
+    else:
+        if counts["queued"]:
+            logger.info("Queued %d stale CV version(s)", counts["queued"])
+    return version
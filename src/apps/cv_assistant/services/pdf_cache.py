@@ -0,0 +1,166 @@
+"""Content-addressed on-disk cache for rendered CV PDFs.
+
+WeasyPrint layout is by far the slowest step of a CV download, while the
+HTML fed into it only changes when the portfolio data does. PDFs are
+therefore stored under ``PDF_CACHE_DIR`` as ``<sha256>.pdf`` of the HTML
+and the CV stylesheet it is laid out with: identical input always maps to
+the same file, so there is nothing to invalidate, and the digest doubles as
+a strong ETag.
+
+The directory is shared by every gunicorn worker of a container. Writes go
+through a temporary file plus ``os.replace`` so readers never see a partial
+PDF. A hit bumps the file's mtime and ``prune()`` evicts the least recently
+used files once the directory grows past ``PDF_CACHE_MAX_BYTES``
+(``0`` disables the cache). The file just stored is never evicted by its
+own write: a PDF larger than the whole budget still has to reach the
+download that waited for it.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+from apps.cv_assistant.services import pdf_generator
+
+SUFFIX = '.pdf'
+
+
+def is_enabled():
+    return getattr(settings, 'PDF_CACHE_MAX_BYTES', 0) > 0
+
+
+def cache_dir():
+    return Path(settings.PDF_CACHE_DIR)
+
+
+def html_digest(html):
+    """Return the cache key (and ETag value) for a rendered CV HTML.
+
+    Covers the stylesheet too: the CSS is not inlined in the HTML.
+    """
+    digest = hashlib.sha256(pdf_generator.stylesheet_digest().encode('ascii'))
+    digest.update(b'\0')
+    digest.update(html.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _path(digest):
+    return cache_dir() / f'{digest}{SUFFIX}'
+
+
+def open_pdf(digest):
+    """Return the cached PDF for ``digest`` as an open binary file, or ``None``.
+
+    Handing out the file (rather than its bytes) lets the response stream it
+    with ``wsgi.file_wrapper``/sendfile. An open file stays readable even if
+    a concurrent ``prune()`` unlinks it.
+    """
+    if not is_enabled():
+        return None
+    path = _path(digest)
+    try:
+        fh = path.open('rb')
+    except OSError:
+        return None
+    try:
+        # Mark as recently used for prune().
+        os.utime(path)
+    except OSError:
+        pass
+    return fh
+
+
+def get(digest):
+    """Return the cached PDF bytes for ``digest`` or ``None`` on a miss."""
+    fh = open_pdf(digest)
+    if fh is None:
+        return None
+    with fh:
+        return fh.read()
+
+
+def put_file(digest, write):
+    """Store the PDF produced by ``write(path)`` under ``digest``.
+
+    ``write`` receives a temporary path inside the cache directory, so a
+    renderer can lay the PDF out straight to disk without holding it in
+    memory; the file is then moved into place atomically and the directory
+    pruned. Returns ``False`` if the cache is disabled or the file could not
+    be stored (any ``OSError``); other errors raised by ``write`` propagate.
+    """
+    if not is_enabled():
+        return False
+    directory = cache_dir()
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        os.close(fd)
+    except OSError:
+        return False
+    path = _path(digest)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException as exc:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        if isinstance(exc, OSError):
+            return False
+        raise
+    prune(keep=path)
+    return True
+
+
+def put(digest, pdf_bytes):
+    """Store ``pdf_bytes`` under ``digest`` and prune the directory.
+
+    Storage errors are swallowed: the cache must never break a download.
+    """
+    def write(path):
+        with open(path, 'wb') as fh:
+            fh.write(pdf_bytes)
+
+    put_file(digest, write)
+
+
+def prune(max_bytes=None, keep=None):
+    """Delete least recently used PDFs until the cache fits ``max_bytes``.
+
+    ``keep`` is a path that is never deleted (it still counts towards the
+    size). Returns the number of files removed.
+    """
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'PDF_CACHE_MAX_BYTES', 0)
+    entries = []
+    for path in cache_dir().glob(f'*{SUFFIX}'):
+        try:
+            stat = path.stat()
+        except OSError:
+            # Removed by a concurrent prune in another worker.
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def clear():
+    """Remove every cached PDF."""
+    return prune(max_bytes=0)
@@ -2,14 +2,103 @@
 
 Extracted from ``apps.portfolio.views.GeneratePDFView`` so the PDF
 generation pipeline can be reused by the AI-adapted CV flow.
+
+The CV stylesheet lives in ``static/css/cv_pdf.css`` rather than inline in
+the template. It is compiled into a WeasyPrint ``CSS`` object once per
+thread, together with a ``FontConfiguration``, and both are passed to every
+``write_pdf`` call. Per thread because Pango/fontconfig objects are not
+meant to be shared across threads; the pool renderers are single-threaded
+and compile it once at warm-up. ``stylesheet_digest()`` hashes the file and
+is part of every PDF cache key, so an edited stylesheet is recompiled and
+never served from PDFs laid out with the old one.
 """
 
+import hashlib
 import io
+import threading
+from pathlib import Path
 
+from django.conf import settings
 from django.template.loader import get_template
-from weasyprint import HTML
+from weasyprint import CSS, HTML
+from weasyprint.text.fonts import FontConfiguration
+
+from apps.cv_assistant.services import pdf_pool
 
 TEMPLATE_NAME = 'portfolio/cv_pdf.html'
+STYLESHEET = Path('css') / 'cv_pdf.css'
+
+_thread_state = threading.local()
+# ((mtime_ns, size), sha256) of the stylesheet file
+_stylesheet_digest = None
+
+
+def render_cv_html(context):
+    """Render ``portfolio/cv_pdf.html`` with ``context`` into an HTML string."""
+    template = get_template(TEMPLATE_NAME)
+    return template.render(context)
+
+
+def stylesheet_path():
+    return Path(settings.BASE_DIR) / 'static' / STYLESHEET
+
+
+def stylesheet_digest():
+    """Return the sha256 of the CV stylesheet, re-hashed when the file changes."""
+    global _stylesheet_digest
+    path = stylesheet_path()
+    stat = path.stat()
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _stylesheet_digest
+    if cached is None or cached[0] != version:
+        cached = _stylesheet_digest = (version, hashlib.sha256(path.read_bytes()).hexdigest())
+    return cached[1]
+
+
+def compile_stylesheet():
+    """Parse the CV stylesheet. Returns ``(CSS, FontConfiguration)``."""
+    font_config = FontConfiguration()
+    css = CSS(filename=str(stylesheet_path()), font_config=font_config)
+    return css, font_config
+
+
+def get_stylesheet():
+    """Return this thread's compiled ``(CSS, FontConfiguration)`` pair."""
+    digest = stylesheet_digest()
+    compiled = getattr(_thread_state, 'stylesheet', None)
+    if compiled is None or compiled[0] != digest:
+        compiled = _thread_state.stylesheet = (digest, compile_stylesheet())
+    return compiled[1]
+
+
+def write_pdf(html, target=None):
+    """Lay out ``html`` with the compiled CV stylesheet into ``target``."""
+    css, font_config = get_stylesheet()
+    return HTML(string=html).write_pdf(target, stylesheets=[css], font_config=font_config)
+
+
+def layout_pdf(html):
+    """Lay out ``html`` with WeasyPrint in this process and return the bytes."""
+    buffer = io.BytesIO()
+    write_pdf(html, buffer)
+    return buffer.getvalue()
+
+
+def html_to_pdf(html, output_path=None):
+    """Lay out ``html`` with WeasyPrint.
+
+    Uses the pre-warmed renderer processes of ``pdf_pool`` when
+    ``PDF_RENDER_POOL_SIZE`` > 0 and renders in-process otherwise. Writes to
+    ``output_path`` and returns it when given, otherwise returns the PDF
+    bytes.
+    """
+    if pdf_pool.is_enabled():
+        # The renderer process writes ``output_path`` itself.
+        return pdf_pool.render(html, output_path)
+    if output_path:
+        write_pdf(html, output_path)
+        return output_path
+    return layout_pdf(html)
 
 
 def generate_cv_pdf(context, output_path=None):
@@ -19,13 +108,4 @@ def generate_cv_pdf(context, output_path=None):
     and the path is returned. When ``output_path`` is ``None`` the PDF
     bytes are returned directly.
     """
-    template = get_template(TEMPLATE_NAME)
-    html = template.render(context)
-
-    if output_path:
-        HTML(string=html).write_pdf(output_path)
-        return output_path
-
-    buffer = io.BytesIO()
-    HTML(string=html).write_pdf(buffer)
-    return buffer.getvalue()
\ No newline at end of file
+    return html_to_pdf(render_cv_html(context), output_path)
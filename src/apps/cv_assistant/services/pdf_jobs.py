@@ -0,0 +1,161 @@
+"""Database-backed queue for rendering CV PDFs off the request path.
+
+With ``PDF_RENDER_ASYNC`` enabled, request handlers that miss the PDF cache
+call ``enqueue()`` and answer 202 with the job id; the
+``render_pdf_jobs`` management command claims queued jobs, lays them out
+with WeasyPrint and stores the result in the PDF cache (and on the
+``CVVersion`` when the job belongs to one). No broker is needed: the jobs
+table is the queue, and claims are made with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` plus a conditional status update so several workers never render
+the same job (the latter also covers SQLite, which has no row locks).
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.cv_assistant.models import PdfRenderJob
+from apps.cv_assistant.services import cv_builder, pdf_cache, pdf_generator
+
+logger = logging.getLogger(__name__)
+
+
+def is_async():
+    """Whether PDF rendering should be queued instead of done inline.
+
+    Public downloads are only handed back through the PDF cache, so async
+    rendering requires the cache to be enabled.
+    """
+    return getattr(settings, 'PDF_RENDER_ASYNC', False) and pdf_cache.is_enabled()
+
+
+def enqueue(html, cv_version=None, pdf_name='', base_fingerprint=''):
+    """Queue a render of ``html`` and return the job.
+
+    Renders are deduplicated: a pending job for the same HTML and CV version
+    (or for the same HTML without one) is returned instead of a new job.
+    """
+    digest = pdf_cache.html_digest(html)
+    pending = PdfRenderJob.objects.filter(
+        digest=digest,
+        cv_version=cv_version,
+        status__in=[PdfRenderJob.STATUS_QUEUED, PdfRenderJob.STATUS_RUNNING],
+    ).first()
+    if pending is not None:
+        return pending
+    return PdfRenderJob.objects.create(
+        digest=digest,
+        html=html,
+        cv_version=cv_version,
+        pdf_name=pdf_name,
+        base_fingerprint=base_fingerprint,
+    )
+
+
+def save_cv_version_pdf(cv_version, pdf_name, pdf_bytes, base_fingerprint=''):
+    """Store the PDF on ``cv_version`` with the fingerprint it was built from."""
+    cv_version.base_fingerprint = base_fingerprint
+    cv_version.pdf_file.save(pdf_name, ContentFile(pdf_bytes), save=True)
+
+
+def render_for_cv_version(cv_version, context, pdf_name):
+    """Attach the PDF for ``context`` to ``cv_version`` or queue it.
+
+    Returns ``None`` when the PDF was saved during the call (cache hit, or
+    synchronous mode) and the pending job otherwise.
+    """
+    fingerprint = cv_builder.base_fingerprint()
+    if not is_async():
+        pdf_bytes = pdf_generator.generate_cv_pdf(context)
+        save_cv_version_pdf(cv_version, pdf_name, pdf_bytes, fingerprint)
+        return None
+
+    html = pdf_generator.render_cv_html(context)
+    pdf_bytes = pdf_cache.get(pdf_cache.html_digest(html))
+    if pdf_bytes is not None:
+        save_cv_version_pdf(cv_version, pdf_name, pdf_bytes, fingerprint)
+        return None
+    return enqueue(
+        html, cv_version=cv_version, pdf_name=pdf_name, base_fingerprint=fingerprint,
+    )
+
+
+def claim_next():
+    """Mark the oldest runnable job as running and return it (or ``None``).
+
+    Jobs left ``running`` for longer than ``PDF_JOB_STALE_AFTER`` seconds
+    (a worker that died mid-render) are picked up again.
+    """
+    stale_before = timezone.now() - timedelta(
+        seconds=getattr(settings, 'PDF_JOB_STALE_AFTER', 300),
+    )
+    runnable = Q(status=PdfRenderJob.STATUS_QUEUED) | Q(
+        status=PdfRenderJob.STATUS_RUNNING, started_at__lt=stale_before,
+    )
+    with transaction.atomic():
+        job = (
+            PdfRenderJob.objects.select_for_update(skip_locked=True)
+            .filter(runnable)
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        now = timezone.now()
+        claimed = PdfRenderJob.objects.filter(
+            pk=job.pk, status=job.status, started_at=job.started_at,
+        ).update(
+            status=PdfRenderJob.STATUS_RUNNING,
+            started_at=now,
+            attempts=job.attempts + 1,
+        )
+        if not claimed:
+            # Another worker got it first (backends without row locks).
+            return None
+    job.status = PdfRenderJob.STATUS_RUNNING
+    job.started_at = now
+    job.attempts += 1
+    return job
+
+
+def run_job(job):
+    """Render a claimed job and record the outcome on it."""
+    try:
+        pdf_bytes = pdf_cache.get(job.digest)
+        if pdf_bytes is None:
+            pdf_bytes = pdf_generator.html_to_pdf(job.html)
+            pdf_cache.put(job.digest, pdf_bytes)
+        if job.cv_version_id is not None:
+            save_cv_version_pdf(job.cv_version, job.pdf_name, pdf_bytes, job.base_fingerprint)
+    except Exception as exc:
+        logger.exception("PDF render job %s failed", job.pk)
+        max_attempts = getattr(settings, 'PDF_JOB_MAX_ATTEMPTS', 3)
+        if job.attempts < max_attempts:
+            job.status = PdfRenderJob.STATUS_QUEUED
+        else:
+            job.status = PdfRenderJob.STATUS_FAILED
+            job.finished_at = timezone.now()
+        job.error = str(exc)
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return job
+
+    job.status = PdfRenderJob.STATUS_DONE
+    job.error = ''
+    job.finished_at = timezone.now()
+    # The HTML is only needed to render; the PDF now lives in the cache.
+    job.html = ''
+    job.save(update_fields=['status', 'error', 'finished_at', 'html'])
+    return job
+
+
+def process_next():
+    """Claim and run one job. Returns the job, or ``None`` if the queue is empty."""
+    job = claim_next()
+    if job is None:
+        return None
+    return run_job(job)
@@ -0,0 +1,217 @@
+"""Pool of long-lived, pre-warmed WeasyPrint renderer processes.
+
+Laying out a PDF in a fresh interpreter state pays for importing WeasyPrint,
+fontconfig font discovery and Pango setup before any real work starts. Each
+renderer process here does that once: it imports WeasyPrint, renders the CV
+template once as a warm-up (loading the fonts and stylesheet it uses) and
+then serves rendered HTML received over a pipe. Given an output path it
+writes the PDF there itself and answers with the path, so large PDFs never
+cross the pipe; otherwise it answers with the PDF bytes.
+
+Every job has a timeout. A renderer that overruns it, crashes or dies is
+killed and replaced, so one pathological document cannot wedge the pool.
+``PDF_RENDER_POOL_SIZE = 0`` disables the pool and ``pdf_generator`` lays
+PDFs out in-process as before.
+"""
+
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+
+from django.conf import settings
+
+
+class PdfRenderError(Exception):
+    """A renderer process failed to produce a PDF."""
+
+
+class PdfRenderTimeout(PdfRenderError):
+    """No renderer was available, or the render overran its timeout."""
+
+
+def _default_render(html, output_path=None):
+    from apps.cv_assistant.services import pdf_generator
+
+    if output_path:
+        pdf_generator.write_pdf(html, output_path)
+        return output_path
+    return pdf_generator.layout_pdf(html)
+
+
+def _renderer_main(conn, render, warmup_html):
+    """Entry point of a renderer process."""
+    render = render or _default_render
+    if warmup_html:
+        try:
+            render(warmup_html)
+        except Exception:
+            # A failed warm-up only costs the first real job its cold start.
+            pass
+    conn.send(('ready', None))
+
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        try:
+            conn.send(('ok', render(*job)))
+        except Exception as exc:
+            conn.send(('error', f'{type(exc).__name__}: {exc}'))
+
+
+class _Renderer:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.ready = False
+
+    def stop(self):
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+
+
+class RendererPool:
+    """A fixed number of renderer processes handed out one job at a time.
+
+    ``render`` is an optional picklable callable run in the renderer
+    processes instead of ``pdf_generator``'s layout: ``render(html,
+    output_path)`` writes the PDF to ``output_path`` and returns it when
+    given, and returns the PDF bytes otherwise.
+    """
+
+    def __init__(self, size, timeout, warmup_html=None, render=None):
+        self.size = size
+        self.timeout = timeout
+        self._warmup_html = warmup_html
+        self._render = render
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = queue.Queue()
+        self._closed = False
+        for _ in range(size):
+            self._idle.put(self._start_renderer())
+
+    def _start_renderer(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_renderer_main,
+            args=(child_conn, self._render, self._warmup_html),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _Renderer(process, parent_conn)
+
+    def _receive(self, renderer, timeout):
+        if not renderer.conn.poll(timeout):
+            raise PdfRenderTimeout(f'PDF render exceeded {timeout}s')
+        return renderer.conn.recv()
+
+    def render(self, html, output_path=None, timeout=None):
+        """Lay out ``html`` in a renderer process.
+
+        Returns the PDF bytes, or ``output_path`` once the renderer has
+        written the PDF to that file.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            renderer = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise PdfRenderTimeout(f'No PDF renderer available within {timeout}s') from None
+
+        healthy = False
+        try:
+            if not renderer.ready:
+                # First job for this renderer: wait for its warm-up to finish
+                # so the warm-up does not count against the job timeout.
+                self._receive(renderer, timeout)
+                renderer.ready = True
+            renderer.conn.send((html, output_path))
+            status, payload = self._receive(renderer, timeout)
+            healthy = True
+        except (EOFError, OSError) as exc:
+            raise PdfRenderError('PDF renderer process died') from exc
+        finally:
+            if healthy:
+                self._idle.put(renderer)
+            else:
+                renderer.stop()
+                if not self._closed:
+                    self._idle.put(self._start_renderer())
+
+        if status == 'error':
+            raise PdfRenderError(payload)
+        return payload
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                renderer = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                renderer.conn.send(None)
+            except OSError:
+                pass
+            renderer.stop()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def is_enabled():
+    return getattr(settings, 'PDF_RENDER_POOL_SIZE', 0) > 0
+
+
+def _warmup_html():
+    from apps.cv_assistant.services import pdf_generator
+
+    try:
+        return pdf_generator.render_cv_html({'pdf_owner_name': settings.PDF_OWNER_NAME})
+    except Exception:
+        return None
+
+
+def get_pool():
+    """Return the process-wide renderer pool, starting it on first use.
+
+    A pool inherited through ``fork`` belongs to the parent, so a child
+    process starts its own.
+    """
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = RendererPool(
+                size=settings.PDF_RENDER_POOL_SIZE,
+                timeout=getattr(settings, 'PDF_RENDER_TIMEOUT', 60),
+                warmup_html=_warmup_html(),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def render(html, output_path=None):
+    return get_pool().render(html, output_path)
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None and _pool_pid == os.getpid():
+        pool.close()
+
+
+atexit.register(shutdown)
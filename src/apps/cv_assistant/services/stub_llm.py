@@ -0,0 +1,199 @@
+"""Local OpenAI-compatible stub of ``/v1/chat/completions``.
+
+Lets the AI paths run offline for benchmarks, load tests and development:
+point ``AI_BASE_URL`` at ``StubLLMServer.base_url`` (or at the
+``run_stub_llm`` management command). The stub answers like the provider
+would for each kind of request the app sends:
+
+* CV adaptation prompts get a valid adaptation JSON for the experience ids
+  listed in the prompt, so ``generate-cv`` succeeds end to end;
+* conversation summary requests get a short summary;
+* anything else gets a chat reply of ``reply_tokens`` words.
+
+``latency`` is the time to the first token and ``tokens_per_second`` the
+generation rate (0 sends the whole reply at once). Streamed requests
+(``stream: true``) get one Server-Sent Event per token. A fraction
+``error_rate`` of requests fails with ``error_status`` instead.
+"""
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from apps.cv_assistant.services.cv_adapter import CHARS_PER_TOKEN
+
+_EXPERIENCE_ID = re.compile(r'- ID: (\d+),')
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, Nagle's
+    # algorithm adds ~40 ms per reply on keep-alive connections.
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+            return
+        try:
+            payload = json.loads(body)
+            messages = payload['messages']
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {'error': {'message': 'Invalid request', 'type': 'invalid_request_error'}})
+            return
+
+        server = self.server
+        if server.record_request(payload):
+            self._send_json(server.error_status, {
+                'error': {'message': 'Injected stub failure', 'type': 'server_error'},
+            })
+            return
+
+        tokens = server.reply_tokens_for(messages)
+        usage = {
+            'prompt_tokens': len(body) // CHARS_PER_TOKEN,
+            'completion_tokens': len(tokens),
+            'total_tokens': len(body) // CHARS_PER_TOKEN + len(tokens),
+        }
+        time.sleep(server.latency)
+        if payload.get('stream'):
+            self._stream(payload, tokens)
+            return
+        if server.tokens_per_second > 0:
+            time.sleep(len(tokens) / server.tokens_per_second)
+        self._send_json(200, {
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': payload.get('model', 'stub'),
+            'choices': [{
+                'index': 0,
+                'finish_reason': 'stop',
+                'message': {'role': 'assistant', 'content': ''.join(tokens)},
+            }],
+            'usage': usage,
+        })
+
+    def _stream(self, payload, tokens):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        # The body ends when the connection closes.
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        delay = 1 / self.server.tokens_per_second if self.server.tokens_per_second > 0 else 0
+        try:
+            for index, token in enumerate(tokens):
+                if index and delay:
+                    time.sleep(delay)
+                self._write_event(payload, {'role': 'assistant', 'content': token}, None)
+            self._write_event(payload, {}, 'stop')
+            self.wfile.write(b'data: [DONE]\n\n')
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading (a cancelled stream).
+            pass
+
+    def _write_event(self, payload, delta, finish_reason):
+        chunk = {
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': payload.get('model', 'stub'),
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+        }
+        self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+        self.wfile.flush()
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    """Threaded stub server; use as a context manager or ``start()``/``stop()``."""
+
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), latency=0.0, tokens_per_second=0.0,
+                 reply_tokens=60, error_rate=0.0, error_status=500, seed=None, verbose=False):
+        super().__init__(address, StubLLMHandler)
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.verbose = verbose
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def record_request(self, payload):
+        """Count a request; return True if it should fail."""
+        with self._lock:
+            self.requests += 1
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+            return fail
+
+    def reply_tokens_for(self, messages):
+        """The reply to ``messages`` as a list of tokens (words)."""
+        system = messages[0].get('content', '') if messages else ''
+        if 'CV adaptation assistant' in system:
+            text = json.dumps({
+                'summary': 'Stub summary adapted to the job description.',
+                'experiences': [
+                    {'id': int(exp_id), 'description_adapted': 'Stub adapted description.'}
+                    for exp_id in _EXPERIENCE_ID.findall(system)
+                ],
+            })
+        elif 'running summary' in system:
+            text = f'Stub summary of {len(messages) - 1} messages.'
+        else:
+            text = ' '.join(['stub'] * max(self.reply_tokens, 1)) + '.'
+        return re.findall(r'\S+\s*', text)
+
+    def handle_error(self, request, client_address):
+        # Clients that time out or cancel hang up mid-reply; that is expected.
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'errors': self.errors}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,38 @@
+"""Signal handlers for the cv_assistant app."""
+from django.db.models.signals import post_delete, post_save
+
+from apps.cv_assistant.services import cv_builder
+from apps.portfolio.models import (
+    Certification,
+    Education,
+    Experience,
+    Skill,
+    SocialSettings,
+    Summary,
+)
+
+# Portfolio models the base CV context is built from.
+BASE_CV_MODELS = (Certification, Education, Experience, Skill, SocialSettings, Summary)
+
+
+def base_cv_data_changed(sender, **kwargs):
+    """Retire the cached base CV snapshot whenever its source data changes.
+
+    The new base data version also tells the ``render_pdf_jobs`` worker to
+    queue the CV versions built from the old data once the change commits,
+    so saving never scans them on the request.
+    """
+    cv_builder.invalidate_base_context()
+
+
+for _model in BASE_CV_MODELS:
+    post_save.connect(
+        base_cv_data_changed,
+        sender=_model,
+        dispatch_uid=f"cv_base_context_save_{_model.__name__}",
+    )
+    post_delete.connect(
+        base_cv_data_changed,
+        sender=_model,
+        dispatch_uid=f"cv_base_context_delete_{_model.__name__}",
+    )
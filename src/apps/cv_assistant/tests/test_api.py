@@ -4,27 +4,42 @@ Shared helpers and per-task test classes. Tests run against the SQLite shim
 (`core.settings_test_sqlite`) so PostgreSQL is not required.
 """
 
+import json
+import tempfile
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.test import override_settings
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from apps.cv_assistant.models import CVVersion, JobApplication, RecruiterResponse
+from apps.cv_assistant.models import CVVersion, JobApplication, PdfRenderJob, RecruiterResponse
+from apps.cv_assistant.services import ai_client, cv_builder, cv_versions
 
 User = get_user_model()
 
 # Dotted path used to mock the AI client without making real API calls.
 AI_CLIENT_PATH = "apps.cv_assistant.api.views.chat_completion"
+AI_STREAM_PATH = "apps.cv_assistant.api.views.chat_completion_stream"
 # Dotted path for mocking the PDF generator.
-PDF_GEN_PATH = "apps.cv_assistant.api.views.pdf_generator.generate_cv_pdf"
+PDF_GEN_PATH = "apps.cv_assistant.services.pdf_generator.generate_cv_pdf"
 
 JOBS_URL = "/api/v1/cv-assistant/jobs/"
 CV_VERSIONS_URL = "/api/v1/cv-assistant/cv-versions/"
 RECRUITER_RESPONSES_URL = "/api/v1/cv-assistant/recruiter-responses/"
+PDF_JOBS_URL = "/api/v1/cv-assistant/pdf-jobs/"
 TOKEN_URL = "/api/v1/cv-assistant/auth/login/"
 
 
+def _async_pdf_settings():
+    """Queue PDF renders for the worker, with a throwaway PDF cache."""
+    return override_settings(
+        PDF_RENDER_ASYNC=True,
+        PDF_CACHE_DIR=tempfile.mkdtemp(),
+        PDF_CACHE_MAX_BYTES=1024 * 1024,
+    )
+
+
 class _AuthMixin:
     """Helper to obtain a JWT token and authenticate the APIClient."""
 
@@ -230,6 +245,26 @@ class ChatEndpointsTest(APITestCase, _AuthMixin):
         )
         self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
 
+    @patch(AI_CLIENT_PATH, return_value="Short reply")
+    def test_post_long_history_is_windowed_to_budget(self, mock_ai):
+        for i in range(60):
+            self.job.messages.create(
+                role="user" if i % 2 == 0 else "assistant",
+                content=f"turn {i:02d} " + "x" * 400,
+            )
+        with override_settings(AI_CONTEXT_TOKEN_BUDGET=3000):
+            resp = self.client.post(
+                f"{JOBS_URL}{self.job.pk}/messages/",
+                {"content": "Newest question"},
+                format="json",
+            )
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        conversation = mock_ai.call_args.args[0]
+        self.assertEqual(conversation[-1], {"role": "user", "content": "Newest question"})
+        self.assertTrue(conversation[-2]["content"].startswith("turn 59"))
+        self.assertLess(len(conversation), 62)
+        self.assertNotIn("turn 00", str(conversation))
+
     @patch(AI_CLIENT_PATH, side_effect=Exception("AI service down"))
     def test_post_message_ai_failure_returns_503(self, _mock):
         resp = self.client.post(
@@ -243,6 +278,131 @@ class ChatEndpointsTest(APITestCase, _AuthMixin):
         self.assertEqual(self.job.messages.filter(role="assistant").count(), 0)
 
 
+def _sse_events(resp):
+    """Parse a Server-Sent Events response into ``(event, data)`` pairs."""
+    body = b"".join(resp.streaming_content).decode()
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@override_settings(AI_BREAKER_FAILURES=1, AI_BREAKER_RESET_TIMEOUT=60)
+class AICircuitBreakerEndpointTest(APITestCase, _AuthMixin):
+    """An open circuit breaker answers 503 without calling the provider."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(username="staff", password="pw12345!", is_staff=True)
+
+    def setUp(self):
+        self._jwt_auth(self.client, "staff", "pw12345!")
+        _seed_portfolio()
+        self.job = JobApplication.objects.create(
+            company="OpenAI", position="Backend Engineer", job_description="Django dev.",
+        )
+        ai_client.reset_breaker()
+        self.addCleanup(ai_client.reset_breaker)
+        with self.assertLogs("apps.cv_assistant.services.ai_client", "WARNING"):
+            ai_client._breaker.record_failure()
+
+    def test_chat_fails_fast(self):
+        with patch("apps.cv_assistant.services.ai_client.get_ai_client") as get_client:
+            resp = self.client.post(
+                f"{JOBS_URL}{self.job.pk}/messages/", {"content": "Hi"}, format="json"
+            )
+        self.assertEqual(resp.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        get_client.return_value.chat.completions.create.assert_not_called()
+
+    def test_generate_cv_fails_fast(self):
+        with patch("apps.cv_assistant.services.ai_client.get_ai_client") as get_client:
+            resp = self.client.post(f"{JOBS_URL}{self.job.pk}/generate-cv/", format="json")
+        self.assertEqual(resp.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn("retrying in", resp.json()["detail"])
+        get_client.return_value.chat.completions.create.assert_not_called()
+
+
+class ChatStreamEndpointTest(APITestCase, _AuthMixin):
+    """/api/v1/cv-assistant/jobs/<pk>/messages/stream/ (SSE)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            username="staff", password="pw12345!", is_staff=True
+        )
+
+    def setUp(self):
+        self._jwt_auth(self.client, "staff", "pw12345!")
+        _seed_portfolio()
+        self.job = JobApplication.objects.create(
+            company="OpenAI", position="Backend Engineer",
+            job_description="We need a Django dev with REST experience.",
+        )
+        self.url = f"{JOBS_URL}{self.job.pk}/messages/stream/"
+
+    @patch(AI_STREAM_PATH, return_value=iter(["Hello", " from", " the AI"]))
+    def test_streams_tokens_and_saves_reply(self, mock_stream):
+        resp = self.client.post(self.url, {"content": "Hi"}, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp["Content-Type"], "text/event-stream")
+
+        events = _sse_events(resp)
+        self.assertEqual(events[0][0], "user")
+        self.assertEqual(events[0][1]["content"], "Hi")
+        self.assertEqual(
+            [data["content"] for event, data in events if event == "token"],
+            ["Hello", " from", " the AI"],
+        )
+        self.assertEqual(events[-1][0], "done")
+        self.assertEqual(events[-1][1]["content"], "Hello from the AI")
+        self.assertIn("content_html", events[-1][1])
+        self.assertEqual(
+            self.job.messages.get(role="assistant").content, "Hello from the AI",
+        )
+        conversation = mock_stream.call_args.args[0]
+        self.assertEqual(conversation[0]["role"], "system")
+        self.assertEqual(conversation[-1], {"role": "user", "content": "Hi"})
+
+    @patch(AI_STREAM_PATH, return_value=iter(["Partial", " reply", " never read"]))
+    def test_disconnect_saves_partial_reply(self, _mock_stream):
+        resp = self.client.post(self.url, {"content": "Hi"}, format="json")
+        stream = iter(resp.streaming_content)
+        next(stream)  # user
+        next(stream)  # "Partial"
+        next(stream)  # " reply"
+        resp.close()
+
+        self.assertEqual(self.job.messages.get(role="assistant").content, "Partial reply")
+
+    @patch(AI_STREAM_PATH, side_effect=Exception("AI service down"))
+    def test_ai_failure_emits_error_event(self, _mock_stream):
+        with self.assertLogs("apps.cv_assistant.api.views", level="ERROR"):
+            events = _sse_events(self.client.post(self.url, {"content": "Hi"}, format="json"))
+        self.assertEqual([event for event, _ in events], ["user", "error"])
+        self.assertEqual(self.job.messages.filter(role="user").count(), 1)
+        self.assertEqual(self.job.messages.filter(role="assistant").count(), 0)
+
+    def test_missing_content_returns_400(self):
+        resp = self.client.post(self.url, {}, format="json")
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @patch(AI_STREAM_PATH, return_value=iter(["Hello"]))
+    def test_accepts_event_stream_requests(self, _mock_stream):
+        # The chat UI sends Accept: text/event-stream.
+        resp = self.client.post(
+            self.url, {"content": "Hi"}, format="json", HTTP_ACCEPT="text/event-stream",
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual([event for event, _ in _sse_events(resp)], ["user", "token", "done"])
+        self.assertEqual(self.job.messages.get(role="assistant").content, "Hello")
+
+    def test_errors_before_the_stream_are_json(self):
+        resp = self.client.post(self.url, {}, format="json", HTTP_ACCEPT="text/event-stream")
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(json.loads(resp.content), {"detail": "'content' is required."})
+
+
 # ---------------------------------------------------------------------------
 # Task 10: Generate CV version endpoint
 # ---------------------------------------------------------------------------
@@ -356,9 +516,27 @@ class GenerateCVTest(APITestCase, _AuthMixin):
 
     @patch(PDF_GEN_PATH, return_value=b"%PDF-1.4 fake")
     @patch(AI_CLIENT_PATH, return_value="not valid json at all")
-    def test_generate_cv_parse_failure_returns_422(self, _mock_ai, _mock_pdf):
-        resp = self.client.post(f"{JOBS_URL}{self.job.pk}/generate-cv/", format="json")
+    def test_generate_cv_parse_failure_returns_422(self, mock_ai, _mock_pdf):
+        with patch("apps.cv_assistant.api.views.discard_cached_response") as discard:
+            resp = self.client.post(f"{JOBS_URL}{self.job.pk}/generate-cv/", format="json")
         self.assertEqual(resp.status_code, 422)
+        # A retry must not be served the same unparsable reply from cache.
+        discard.assert_called_once_with(mock_ai.call_args[0][0])
+
+    @patch(PDF_GEN_PATH)
+    @patch(AI_CLIENT_PATH, return_value=VALID_AI_RESPONSE)
+    def test_generate_cv_async_returns_202_with_job(self, _mock_ai, mock_pdf):
+        with _async_pdf_settings():
+            resp = self.client.post(f"{JOBS_URL}{self.job.pk}/generate-cv/", format="json")
+
+        self.assertEqual(resp.status_code, status.HTTP_202_ACCEPTED)
+        data = resp.json()
+        self.assertEqual(data["version_number"], 1)
+        self.assertIsNone(data["pdf_file"])
+        job = PdfRenderJob.objects.get(pk=data["pdf_job"]["id"])
+        self.assertEqual(job.status, PdfRenderJob.STATUS_QUEUED)
+        self.assertEqual(job.cv_version.version_number, 1)
+        mock_pdf.assert_not_called()
 
 
 # ---------------------------------------------------------------------------
@@ -429,6 +607,182 @@ class RegeneratePDFTest(APITestCase, _AuthMixin):
         self.cv_version.pdf_file.close()
         self.assertIn(b"new content", content)
 
+    @patch(PDF_GEN_PATH)
+    def test_regenerate_pdf_async_returns_202_with_job(self, mock_pdf):
+        with _async_pdf_settings():
+            resp = self.client.post(
+                f"{CV_VERSIONS_URL}{self.cv_version.pk}/regenerate-pdf/", format="json"
+            )
+
+        self.assertEqual(resp.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(resp.json()["pdf_job"]["status"], PdfRenderJob.STATUS_QUEUED)
+        mock_pdf.assert_not_called()
+
+
+class RegenerateStaleEndpointTest(APITestCase, _AuthMixin):
+    """/api/v1/cv-assistant/cv-versions/regenerate-stale/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            username="staff", password="pw12345!", is_staff=True
+        )
+
+    def setUp(self):
+        self._jwt_auth(self.client, "staff", "pw12345!")
+        _seed_portfolio()
+        job = JobApplication.objects.create(
+            company="OpenAI", position="Backend Engineer", job_description="Django",
+        )
+        self.cv_version = job.cv_versions.create(version_number=1)
+
+    @patch(PDF_GEN_PATH, return_value=b"%PDF-1.4 fake")
+    @patch("apps.cv_assistant.services.pdf_generator.html_to_pdf", return_value=b"%PDF-1.4 fresh")
+    def test_regenerates_stale_and_skips_fresh(self, _mock_layout, _mock_pdf):
+        resp = self.client.post(f"{CV_VERSIONS_URL}regenerate-stale/", format="json")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json()["regenerated"], 1)
+
+        resp = self.client.post(f"{CV_VERSIONS_URL}regenerate-stale/", format="json")
+        self.assertEqual(resp.json()["regenerated"], 0)
+        self.assertEqual(resp.json()["skipped"], 1)
+
+    @patch(PDF_GEN_PATH, return_value=b"%PDF-1.4 fake")
+    def test_regenerate_pdf_records_fingerprint(self, _mock_pdf):
+        resp = self.client.post(
+            f"{CV_VERSIONS_URL}{self.cv_version.pk}/regenerate-pdf/", format="json"
+        )
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(resp.json()["base_fingerprint"]), 64)
+
+
+class RegeneratePdfsEndpointTest(APITestCase, _AuthMixin):
+    """/api/v1/cv-assistant/cv-versions/regenerate-pdfs/ bulk re-render."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            username="staff", password="pw12345!", is_staff=True
+        )
+
+    def setUp(self):
+        self._jwt_auth(self.client, "staff", "pw12345!")
+        _seed_portfolio()
+        self.job = JobApplication.objects.create(
+            company="OpenAI", position="Backend Engineer", job_description="Django",
+        )
+        self.other_job = JobApplication.objects.create(
+            company="Acme", position="Engineer", job_description="Python",
+        )
+        for number in (1, 2):
+            self.job.cv_versions.create(version_number=number)
+        self.other_job.cv_versions.create(version_number=1)
+
+    @staticmethod
+    def _lines(resp):
+        body = b"".join(resp.streaming_content).decode()
+        return [json.loads(line) for line in body.splitlines()]
+
+    @patch("apps.cv_assistant.services.pdf_generator.html_to_pdf", return_value=b"%PDF-1.4 bulk")
+    def test_streams_progress_for_every_version(self, mock_layout):
+        resp = self.client.post(f"{CV_VERSIONS_URL}regenerate-pdfs/", format="json")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp["Content-Type"], "application/x-ndjson")
+
+        lines = self._lines(resp)
+        self.assertEqual(lines[-1], {
+            "done": True, "total": 3, "regenerated": 3, "queued": 0, "failed": 0,
+        })
+        self.assertEqual({line["status"] for line in lines[:-1]}, {"regenerated"})
+        self.assertEqual(mock_layout.call_count, 3)
+        for cv_version in CVVersion.objects.all():
+            self.assertTrue(cv_version.pdf_file)
+            self.assertEqual(len(cv_version.base_fingerprint), 64)
+
+    @patch("apps.cv_assistant.services.pdf_generator.html_to_pdf", return_value=b"%PDF-1.4 bulk")
+    def test_job_filter_limits_versions(self, _mock_layout):
+        resp = self.client.post(
+            f"{CV_VERSIONS_URL}regenerate-pdfs/?job={self.job.pk}", format="json"
+        )
+        lines = self._lines(resp)
+        self.assertEqual(
+            sorted(line["id"] for line in lines[:-1]),
+            sorted(self.job.cv_versions.values_list("pk", flat=True)),
+        )
+        self.assertFalse(self.other_job.cv_versions.get().pdf_file)
+
+    @patch("apps.cv_assistant.services.pdf_generator.html_to_pdf", return_value=b"%PDF-1.4 bulk")
+    def test_base_context_is_built_once(self, _mock_layout):
+        with patch(
+            "apps.cv_assistant.services.cv_builder.get_base_context",
+            wraps=cv_builder.get_base_context,
+        ) as mock_base:
+            self._lines(self.client.post(f"{CV_VERSIONS_URL}regenerate-pdfs/", format="json"))
+        mock_base.assert_called_once()
+
+    @patch("apps.cv_assistant.services.pdf_generator.html_to_pdf", side_effect=RuntimeError("boom"))
+    def test_failures_are_reported_per_version(self, _mock_layout):
+        with self.assertLogs("apps.cv_assistant.services.cv_versions", level="ERROR"):
+            lines = self._lines(
+                self.client.post(f"{CV_VERSIONS_URL}regenerate-pdfs/", format="json")
+            )
+        self.assertEqual(lines[-1]["failed"], 3)
+        self.assertEqual(lines[0]["error"], "boom")
+
+    def test_async_mode_queues_jobs(self):
+        with _async_pdf_settings():
+            lines = self._lines(
+                self.client.post(f"{CV_VERSIONS_URL}regenerate-pdfs/", format="json")
+            )
+        self.assertEqual(lines[-1]["queued"], 3)
+        self.assertEqual(PdfRenderJob.objects.count(), 3)
+
+    def test_invalid_workers_is_rejected(self):
+        resp = self.client.post(
+            f"{CV_VERSIONS_URL}regenerate-pdfs/", {"workers": "many"}, format="json"
+        )
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+        resp = self.client.post(
+            f"{CV_VERSIONS_URL}regenerate-pdfs/", {"workers": 0}, format="json"
+        )
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(PDF_RENDER_POOL_SIZE=2)
+    def test_workers_are_capped_at_the_pool_size(self):
+        with patch.object(cv_versions, "regenerate_many", return_value=iter(())) as regen:
+            resp = self.client.post(
+                f"{CV_VERSIONS_URL}regenerate-pdfs/", {"workers": 10000}, format="json"
+            )
+            b"".join(resp.streaming_content)
+        self.assertEqual(regen.call_args.kwargs["workers"], 2)
+
+
+class PdfRenderJobEndpointTest(APITestCase, _AuthMixin):
+    """/api/v1/cv-assistant/pdf-jobs/ status polling."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            username="staff", password="pw12345!", is_staff=True
+        )
+        cls.job = PdfRenderJob.objects.create(digest="0" * 64, html="<p>secret</p>")
+
+    def test_staff_can_poll_job_status(self):
+        self._jwt_auth(self.client, "staff", "pw12345!")
+        resp = self.client.get(f"{PDF_JOBS_URL}{self.job.pk}/")
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(resp.json()["status"], PdfRenderJob.STATUS_QUEUED)
+        self.assertNotIn("html", resp.json())
+
+    def test_anonymous_is_rejected(self):
+        resp = self.client.get(f"{PDF_JOBS_URL}{self.job.pk}/")
+        self.assertIn(resp.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    def test_jobs_are_read_only(self):
+        self._jwt_auth(self.client, "staff", "pw12345!")
+        resp = self.client.delete(f"{PDF_JOBS_URL}{self.job.pk}/")
+        self.assertEqual(resp.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
 
 # ---------------------------------------------------------------------------
 # Task 12: RecruiterResponse endpoints
@@ -0,0 +1,137 @@
+"""Tests for the async (ASGI) variants of the AI-bound endpoints."""
+import json
+from unittest.mock import AsyncMock, patch
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.cv_assistant.models import JobApplication
+
+from .test_api import PDF_GEN_PATH, TOKEN_URL, VALID_AI_RESPONSE, _seed_portfolio
+
+User = get_user_model()
+
+ASYNC_JOBS_URL = "/api/v1/cv-assistant/async/jobs/"
+ACHAT_PATH = "apps.cv_assistant.api.async_views.achat_completion"
+ASTREAM_PATH = "apps.cv_assistant.api.async_views.achat_completion_stream"
+
+
+class AsyncJobEndpointsTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(username="staff", password="pw12345!", is_staff=True)
+        User.objects.create_user(username="plain", password="pw12345!")
+
+    def setUp(self):
+        _seed_portfolio()
+        self.job = JobApplication.objects.create(
+            company="OpenAI", position="Backend Engineer",
+            job_description="We need a Django dev with REST experience.",
+        )
+        self.headers = self._auth_headers("staff")
+
+    def _auth_headers(self, username):
+        resp = self.client.post(
+            TOKEN_URL, {"username": username, "password": "pw12345!"}, format="json"
+        )
+        return {"Authorization": f"Bearer {resp.json()['access']}"}
+
+    async def _post(self, path, data=None, headers=None):
+        return await self.async_client.post(
+            f"{ASYNC_JOBS_URL}{self.job.pk}/{path}",
+            data=json.dumps(data or {}),
+            content_type="application/json",
+            headers=self.headers if headers is None else headers,
+        )
+
+    @patch(ACHAT_PATH, new_callable=AsyncMock, return_value="AI reply text")
+    async def test_chat_message_returns_both_messages(self, mock_ai):
+        resp = await self._post("messages/", {"content": "Adapt my CV please"})
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        data = resp.json()
+        self.assertEqual([m["role"] for m in data], ["user", "assistant"])
+        self.assertEqual(data[1]["content"], "AI reply text")
+        self.assertIn("content_html", data[1])
+        conversation = mock_ai.await_args.args[0]
+        self.assertEqual(conversation[-1], {"role": "user", "content": "Adapt my CV please"})
+        self.assertEqual(await self.job.messages.acount(), 2)
+
+    @patch(ACHAT_PATH, new_callable=AsyncMock, side_effect=Exception("down"))
+    async def test_chat_ai_failure_returns_503(self, _mock_ai):
+        resp = await self._post("messages/", {"content": "Hello"})
+        self.assertEqual(resp.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(await self.job.messages.filter(role="assistant").acount(), 0)
+
+    async def test_missing_content_returns_400(self):
+        resp = await self._post("messages/", {})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_requires_staff(self):
+        resp = await self._post("messages/", {"content": "Hi"}, headers={})
+        self.assertEqual(resp.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        plain_headers = await self._plain_headers()
+        resp = await self._post("messages/", {"content": "Hi"}, headers=plain_headers)
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+    async def _plain_headers(self):
+        return await sync_to_async(self._auth_headers)("plain")
+
+    async def test_unknown_job_returns_404(self):
+        resp = await self.async_client.post(
+            f"{ASYNC_JOBS_URL}999999/messages/",
+            data=json.dumps({"content": "Hi"}),
+            content_type="application/json",
+            headers=self.headers,
+        )
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_stream_emits_tokens_and_saves_reply(self):
+        async def fake_stream(conversation):
+            for delta in ("Hello", " there"):
+                yield delta
+
+        with patch(ASTREAM_PATH, fake_stream):
+            resp = await self._post("messages/stream/", {"content": "Hi"})
+            body = b"".join([chunk async for chunk in resp.streaming_content]).decode()
+
+        self.assertEqual(resp["Content-Type"], "text/event-stream")
+        events = [block.split("\n")[0] for block in body.strip().split("\n\n")]
+        self.assertEqual(
+            events, ["event: user", "event: token", "event: token", "event: done"],
+        )
+        reply = await self.job.messages.aget(role="assistant")
+        self.assertEqual(reply.content, "Hello there")
+
+    @patch(PDF_GEN_PATH, return_value=b"%PDF-1.4 fake")
+    @patch(ACHAT_PATH, new_callable=AsyncMock, return_value=VALID_AI_RESPONSE)
+    async def test_generate_cv_creates_version(self, _mock_ai, _mock_pdf):
+        resp = await self._post("generate-cv/", {"prompt_summary": "async"})
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(resp.json()["version_number"], 1)
+        self.assertEqual(resp.json()["prompt_summary"], "async")
+        await self.job.arefresh_from_db()
+        self.assertEqual(self.job.status, "cv_generated")
+
+    @patch(ACHAT_PATH, new_callable=AsyncMock, return_value="not json")
+    async def test_generate_cv_invalid_ai_response_returns_422(self, _mock_ai):
+        resp = await self._post("generate-cv/")
+        self.assertEqual(resp.status_code, 422)
+        self.assertEqual(await self.job.cv_versions.acount(), 0)
+
+    async def test_get_is_not_allowed(self):
+        resp = await self.async_client.get(
+            f"{ASYNC_JOBS_URL}{self.job.pk}/messages/", headers=self.headers,
+        )
+        self.assertEqual(resp.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_not_served_over_wsgi(self):
+        resp = self.client.post(
+            f"{ASYNC_JOBS_URL}{self.job.pk}/messages/", {"content": "Hi"},
+            format="json", headers=self.headers,
+        )
+        self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(self.job.messages.exists())
@@ -0,0 +1,277 @@
+"""Tests for rolling conversation summaries, against a local stub LLM."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.cv_assistant.api.views import _chat_conversation
+from apps.cv_assistant.models import ChatMessage, JobApplication
+from apps.cv_assistant.services import ai_client, conversation_summary
+
+from .test_api import JOBS_URL, TOKEN_URL, _seed_portfolio
+
+User = get_user_model()
+
+
+class _StubLLMHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible ``/chat/completions`` stub that records requests.
+
+    Summary requests (recognized by their system prompt) are answered with
+    ``Summary <n>``, chat requests with ``Chat reply``.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        server = self.server
+        with server.lock:
+            server.requests.append(payload)
+            is_summary = 'running summary' in payload['messages'][0]['content']
+            if is_summary:
+                server.summaries += 1
+            content = f'Summary {server.summaries}' if is_summary else 'Chat reply'
+            fail = server.fail
+        if fail:
+            self.send_response(500)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps({
+            'id': 'chatcmpl-stub',
+            'object': 'chat.completion',
+            'created': 0,
+            'model': payload['model'],
+            'choices': [{
+                'index': 0,
+                'finish_reason': 'stop',
+                'message': {'role': 'assistant', 'content': content},
+            }],
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _StubLLMMixin:
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubLLMHandler)
+        cls.server.daemon_threads = True
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.stub_settings = override_settings(
+            AI_BASE_URL=f'http://127.0.0.1:{cls.server.server_port}/v1',
+            AI_API_KEY='stub',
+            AI_MAX_RETRIES=0,
+            AI_SUMMARY_EVERY=4,
+            AI_SUMMARY_KEEP_RECENT=2,
+        )
+        cls.stub_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub_settings.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.server.requests = []
+        self.server.summaries = 0
+        self.server.fail = False
+        ai_client.reset_ai_client()
+        self.addCleanup(ai_client.reset_ai_client)
+
+    def summary_requests(self):
+        return [r for r in self.server.requests
+                if 'running summary' in r['messages'][0]['content']]
+
+
+def _add_turns(job, count, start=0):
+    for i in range(start, start + count):
+        job.messages.create(
+            role=ChatMessage.ROLE_USER if i % 2 == 0 else ChatMessage.ROLE_ASSISTANT,
+            content=f'turn {i:02d}',
+        )
+
+
+class ConversationSummaryServiceTest(_StubLLMMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        _seed_portfolio()
+        self.job = JobApplication.objects.create(
+            company='Acme', position='SRE', job_description='Run the platform.',
+        )
+
+    def test_not_due_below_threshold(self):
+        _add_turns(self.job, 5)
+        self.assertFalse(conversation_summary.needs_update(self.job))
+        self.assertFalse(conversation_summary.update_summary(self.job))
+        self.assertEqual(self.server.requests, [])
+
+    def test_update_folds_older_turns_and_keeps_tail(self):
+        _add_turns(self.job, 6)
+        self.assertTrue(conversation_summary.needs_update(self.job))
+        self.assertTrue(conversation_summary.update_summary(self.job))
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.conversation_summary, 'Summary 1')
+        self.assertIsNotNone(self.job.summary_updated_at)
+        remaining = conversation_summary.unsummarized_messages(self.job).order_by('pk')
+        self.assertEqual([m.content for m in remaining], ['turn 04', 'turn 05'])
+
+        (request,) = self.summary_requests()
+        self.assertEqual(request['temperature'], 0)
+        prompt = request['messages'][1]['content']
+        self.assertIn('(none)', prompt)
+        self.assertIn('User: turn 00', prompt)
+        self.assertIn('Assistant: turn 03', prompt)
+        self.assertNotIn('turn 04', prompt)
+
+    def test_next_update_builds_on_previous_summary(self):
+        _add_turns(self.job, 6)
+        conversation_summary.update_summary(self.job)
+        _add_turns(self.job, 4, start=6)
+        self.assertTrue(conversation_summary.update_summary(self.job))
+
+        second = self.summary_requests()[1]['messages'][1]['content']
+        self.assertIn('SUMMARY SO FAR:\nSummary 1', second)
+        self.assertIn('turn 04', second)
+        self.assertNotIn('turn 00', second)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.conversation_summary, 'Summary 2')
+
+    def test_trailing_user_message_is_not_folded(self):
+        # An odd count would end the folded part on a question; it stays
+        # with its answer in the tail.
+        _add_turns(self.job, 7)
+        conversation_summary.update_summary(self.job)
+        remaining = conversation_summary.unsummarized_messages(self.job).order_by('pk')
+        self.assertEqual([m.content for m in remaining], ['turn 04', 'turn 05', 'turn 06'])
+
+    def test_concurrent_update_is_not_overwritten(self):
+        _add_turns(self.job, 6)
+        stale = JobApplication.objects.get(pk=self.job.pk)
+        conversation_summary.update_summary(self.job)
+        self.assertFalse(conversation_summary.update_summary(stale))
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.conversation_summary, 'Summary 1')
+
+    def test_chat_prompt_sends_summary_and_tail_only(self):
+        _add_turns(self.job, 6)
+        conversation_summary.update_summary(self.job)
+        self.job.refresh_from_db()
+        newest = self.job.messages.create(role=ChatMessage.ROLE_USER, content='newest question')
+
+        conversation = _chat_conversation(self.job, newest)
+        contents = [m['content'] for m in conversation[1:]]
+        self.assertEqual(contents, [
+            'Summary of the earlier conversation:\nSummary 1',
+            'turn 04', 'turn 05', 'newest question',
+        ])
+
+    @override_settings(AI_SUMMARY_EVERY=0)
+    def test_disabled(self):
+        _add_turns(self.job, 20)
+        self.assertFalse(conversation_summary.needs_update(self.job))
+        self.assertFalse(conversation_summary.update_summary(self.job))
+
+
+class ConversationSummaryEndpointTest(_StubLLMMixin, APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user(username='staff', password='pw12345!', is_staff=True)
+
+    def setUp(self):
+        super().setUp()
+        _seed_portfolio()
+        self.job = JobApplication.objects.create(
+            company='Acme', position='SRE', job_description='Run the platform.',
+        )
+        resp = self.client.post(
+            TOKEN_URL, {'username': 'staff', 'password': 'pw12345!'}, format='json'
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {resp.json()['access']}")
+
+    def _chat(self, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(
+                f'{JOBS_URL}{self.job.pk}/messages/', {'content': content}, format='json'
+            )
+        self.assertEqual(resp.status_code, status.HTTP_201_CREATED)
+        return resp
+
+    def test_summary_is_updated_after_enough_turns(self):
+        for i in range(2):
+            self._chat(f'question {i}')
+        self.assertEqual(self.summary_requests(), [])
+        self._chat('question 2')
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.conversation_summary, 'Summary 1')
+        self.assertEqual(self.job.messages.filter(pk__gt=self.job.summarized_through).count(), 2)
+
+        self._chat('question 3')
+        chat_request = [r for r in self.server.requests
+                        if 'running summary' not in r['messages'][0]['content']][-1]
+        contents = [m['content'] for m in chat_request['messages']]
+        self.assertIn('Summary of the earlier conversation:\nSummary 1', contents)
+        self.assertNotIn('question 0', contents)
+        self.assertEqual(contents[-3:], ['question 2', 'Chat reply', 'question 3'])
+
+        resp = self.client.get(f'{JOBS_URL}{self.job.pk}/')
+        self.assertEqual(resp.json()['conversation_summary'], 'Summary 1')
+
+    def test_failed_summary_keeps_chat_working(self):
+        _add_turns(self.job, 6)
+        with patch.object(conversation_summary, 'chat_completion',
+                          side_effect=RuntimeError('provider down')):
+            with self.assertLogs('apps.cv_assistant.services.conversation_summary', 'ERROR'):
+                self._chat('question')
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.conversation_summary, '')
+        self.assertIsNone(self.job.summarized_through)
+
+        # The next reply retries the update.
+        self._chat('again')
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.conversation_summary, 'Summary 1')
+
+    def test_background_update_is_deferred_while_the_assistant_is_busy(self):
+        _add_turns(self.job, 6)
+        with patch.object(conversation_summary, 'chat_completion',
+                          side_effect=ai_client.AIBusy('busy')) as completion, \
+                patch.object(conversation_summary, 'close_old_connections'), \
+                self.assertLogs('apps.cv_assistant.services.conversation_summary', 'INFO') as logs:
+            conversation_summary._run_in_background(self.job.pk)
+        self.assertTrue(completion.call_args.kwargs['background'])
+        self.assertIn('deferred', logs.output[0])
+        self.job.refresh_from_db()
+        self.assertIsNone(self.job.summarized_through)
+
+    @override_settings(AI_SUMMARY_BACKGROUND=True)
+    def test_background_updates_are_deduplicated(self):
+        with patch.object(conversation_summary, '_get_executor') as get_executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                conversation_summary._submit(self.job.pk)
+                conversation_summary._submit(self.job.pk)
+        get_executor.return_value.submit.assert_called_once_with(
+            conversation_summary._run_in_background, self.job.pk,
+        )
+        conversation_summary._pending.discard(self.job.pk)
@@ -0,0 +1,176 @@
+"""Tests for base-data fingerprints and stale CV version regeneration."""
+import tempfile
+from datetime import date
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from apps.cv_assistant.models import JobApplication, PdfRenderJob
+from apps.cv_assistant.services import cv_builder, cv_versions
+from apps.portfolio.models import Experience, Skill, Summary
+
+HTML_TO_PDF_PATH = "apps.cv_assistant.services.pdf_generator.html_to_pdf"
+GENERATE_PDF_PATH = "apps.cv_assistant.services.pdf_generator.generate_cv_pdf"
+
+
+class _VersionsMixin:
+    def setUp(self):
+        Summary.objects.create(title="Summary", content="Experienced dev")
+        self.experience = Experience.objects.create(
+            company="Acme", position="Backend Dev",
+            description="Did backend work", start_date=date(2022, 1, 1),
+        )
+        job_application = JobApplication.objects.create(
+            company="Acme", position="Dev", job_description="Django",
+        )
+        self.fresh = job_application.cv_versions.create(version_number=1)
+        self.stale = job_application.cv_versions.create(version_number=2)
+        with patch(GENERATE_PDF_PATH, return_value=b"%PDF v1"):
+            cv_versions.regenerate(self.fresh)
+            cv_versions.regenerate(self.stale)
+        self.fresh.refresh_from_db()
+
+
+class TestBaseFingerprint(_VersionsMixin, TestCase):
+    def test_saved_pdf_records_current_fingerprint(self):
+        self.assertEqual(self.fresh.base_fingerprint, cv_builder.base_fingerprint())
+
+    def test_fingerprint_follows_portfolio_changes(self):
+        before = cv_builder.base_fingerprint()
+        Skill.objects.create(name="Go", category="Languages", years_of_experience=1)
+        self.assertNotEqual(cv_builder.base_fingerprint(), before)
+
+    def test_fingerprint_follows_stylesheet_changes(self):
+        before = cv_builder.base_fingerprint()
+        with patch("apps.cv_assistant.services.pdf_generator.stylesheet_digest",
+                   return_value="0" * 64):
+            self.assertNotEqual(cv_builder.base_fingerprint(), before)
+            self.assertEqual(cv_versions.stale_versions().count(), 2)
+
+    def test_fingerprint_is_stable(self):
+        self.assertEqual(cv_builder.base_fingerprint(), cv_builder.base_fingerprint())
+
+
+class TestRegenerateStale(_VersionsMixin, TestCase):
+    def _make_one_stale(self):
+        self.experience.position = "Staff Dev"
+        self.experience.save()
+        # Pretend the fresh version was already re-rendered from the new data.
+        type(self.fresh).objects.filter(pk=self.fresh.pk).update(
+            base_fingerprint=cv_builder.base_fingerprint(),
+        )
+
+    @patch(HTML_TO_PDF_PATH, return_value=b"%PDF v2")
+    def test_only_stale_versions_are_regenerated(self, mock_pdf):
+        self._make_one_stale()
+
+        counts = cv_versions.regenerate_stale()
+
+        self.assertEqual(counts, {"regenerated": 1, "queued": 0, "skipped": 1, "failed": 0})
+        mock_pdf.assert_called_once()
+        self.stale.refresh_from_db()
+        self.assertEqual(self.stale.base_fingerprint, cv_builder.base_fingerprint())
+        self.stale.pdf_file.open("rb")
+        self.assertEqual(self.stale.pdf_file.read(), b"%PDF v2")
+        self.stale.pdf_file.close()
+
+    @patch(HTML_TO_PDF_PATH, return_value=b"%PDF v2")
+    def test_up_to_date_versions_are_skipped(self, mock_pdf):
+        counts = cv_versions.regenerate_stale()
+        self.assertEqual(counts["skipped"], 2)
+        mock_pdf.assert_not_called()
+
+    @patch(HTML_TO_PDF_PATH, return_value=b"%PDF v2")
+    def test_force_regenerates_everything_in_parallel(self, mock_pdf):
+        counts = cv_versions.regenerate_stale(force=True, workers=2)
+        self.assertEqual(counts["regenerated"], 2)
+        self.assertEqual(mock_pdf.call_count, 2)
+
+    @override_settings(PDF_RENDER_POOL_SIZE=2)
+    @patch(HTML_TO_PDF_PATH, return_value=b"%PDF v2")
+    def test_workers_are_capped_at_the_pool_size(self, _mock_pdf):
+        with patch.object(cv_versions, "ThreadPoolExecutor",
+                          wraps=cv_versions.ThreadPoolExecutor) as executor:
+            cv_versions.regenerate_stale(force=True, workers=500)
+        executor.assert_called_once_with(max_workers=2)
+
+    @patch(HTML_TO_PDF_PATH, side_effect=RuntimeError("layout failed"))
+    def test_failures_are_counted(self, _mock_pdf):
+        self._make_one_stale()
+        with self.assertLogs("apps.cv_assistant.services.cv_versions", level="ERROR"):
+            counts = cv_versions.regenerate_stale()
+        self.assertEqual(counts["failed"], 1)
+
+    def test_async_mode_queues_jobs(self):
+        self._make_one_stale()
+        with override_settings(PDF_RENDER_ASYNC=True, PDF_CACHE_DIR=tempfile.mkdtemp(),
+                               PDF_CACHE_MAX_BYTES=1024 * 1024):
+            counts = cv_versions.regenerate_stale()
+
+        self.assertEqual(counts["queued"], 1)
+        job = PdfRenderJob.objects.get()
+        self.assertEqual(job.cv_version, self.stale)
+        self.assertEqual(job.base_fingerprint, cv_builder.base_fingerprint())
+
+    def test_worker_queues_stale_versions_after_a_portfolio_change(self):
+        with override_settings(PDF_RENDER_ASYNC=True, PDF_CACHE_DIR=tempfile.mkdtemp(),
+                               PDF_CACHE_MAX_BYTES=1024 * 1024):
+            seen = cv_versions.queue_stale_if_changed()
+            self.assertFalse(PdfRenderJob.objects.exists())
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                for position in ("Staff Dev", "Lead Dev", "Principal Dev"):
+                    self.experience.position = position
+                    self.experience.save()
+            # Saving schedules nothing; the worker notices the new version.
+            self.assertEqual(callbacks, [])
+            self.assertFalse(PdfRenderJob.objects.exists())
+
+            with patch.object(cv_versions, "regenerate_stale",
+                              wraps=cv_versions.regenerate_stale) as scan:
+                seen = cv_versions.queue_stale_if_changed(seen)
+                cv_versions.queue_stale_if_changed(seen)
+        scan.assert_called_once_with(queue=True)
+        self.assertEqual(PdfRenderJob.objects.filter(cv_version__isnull=False).count(), 2)
+
+    def test_worker_queues_stale_versions_with_async_rendering_off(self):
+        self.experience.position = "Staff Dev"
+        self.experience.save()
+        with override_settings(PDF_RENDER_ASYNC=False), \
+                patch(HTML_TO_PDF_PATH) as mock_pdf:
+            cv_versions.queue_stale_if_changed()
+        mock_pdf.assert_not_called()
+        self.assertEqual(
+            set(PdfRenderJob.objects.values_list("cv_version", flat=True)),
+            {self.fresh.pk, self.stale.pk},
+        )
+
+    @override_settings(PDF_RENDER_ASYNC=False)
+    def test_worker_command_renders_stale_versions_with_async_rendering_off(self):
+        self.experience.position = "Staff Dev"
+        self.experience.save()
+        with patch(HTML_TO_PDF_PATH, return_value=b"%PDF v2"):
+            call_command("render_pdf_jobs", "--once", stdout=StringIO())
+        self.assertEqual(cv_versions.stale_versions().count(), 0)
+
+    def test_worker_command_queues_stale_versions(self):
+        self.experience.position = "Staff Dev"
+        self.experience.save()
+        with override_settings(PDF_RENDER_ASYNC=True, PDF_CACHE_DIR=tempfile.mkdtemp(),
+                               PDF_CACHE_MAX_BYTES=1024 * 1024), \
+                patch(HTML_TO_PDF_PATH, return_value=b"%PDF v2"):
+            call_command("render_pdf_jobs", "--once", stdout=StringIO())
+        self.assertEqual(cv_versions.stale_versions().count(), 0)
+
+    def test_portfolio_change_does_nothing_when_sync(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.experience.save()
+        self.assertEqual(callbacks, [])
+
+    @patch(HTML_TO_PDF_PATH, return_value=b"%PDF v2")
+    def test_command_reports_counts(self, _mock_pdf):
+        self._make_one_stale()
+        out = StringIO()
+        call_command("regenerate_stale_cvs", stdout=out)
+        self.assertIn("Regenerated 1, queued 0, skipped 1 up to date, failed 0", out.getvalue())
@@ -0,0 +1,138 @@
+"""Tests for the background PDF render queue and its worker command."""
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.cv_assistant.models import JobApplication, PdfRenderJob
+from apps.cv_assistant.services import cv_builder, pdf_cache, pdf_jobs
+
+HTML_TO_PDF_PATH = "apps.cv_assistant.services.pdf_generator.html_to_pdf"
+RENDER_HTML_PATH = "apps.cv_assistant.services.pdf_generator.render_cv_html"
+
+
+class _PdfCacheMixin:
+    def setUp(self):
+        override = override_settings(
+            PDF_CACHE_DIR=tempfile.mkdtemp(),
+            PDF_CACHE_MAX_BYTES=1024 * 1024,
+            PDF_RENDER_ASYNC=True,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        job_application = JobApplication.objects.create(
+            company="Acme", position="Dev", job_description="Django",
+        )
+        self.cv_version = job_application.cv_versions.create(version_number=1)
+
+
+class TestEnqueue(_PdfCacheMixin, TestCase):
+    def test_public_renders_are_deduplicated(self):
+        first = pdf_jobs.enqueue("<p>cv</p>")
+        second = pdf_jobs.enqueue("<p>cv</p>")
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(first.digest, pdf_cache.html_digest("<p>cv</p>"))
+
+    def test_cv_version_renders_are_deduplicated_per_version(self):
+        first = pdf_jobs.enqueue("<p>cv</p>", cv_version=self.cv_version, pdf_name="a.pdf")
+        again = pdf_jobs.enqueue("<p>cv</p>", cv_version=self.cv_version, pdf_name="a.pdf")
+        public = pdf_jobs.enqueue("<p>cv</p>")
+        self.assertEqual(first.pk, again.pk)
+        self.assertNotEqual(first.pk, public.pk)
+
+    @patch(RENDER_HTML_PATH, return_value="<p>cv</p>")
+    def test_render_for_cv_version_uses_cached_pdf(self, _mock_html):
+        pdf_cache.put(pdf_cache.html_digest("<p>cv</p>"), b"%PDF cached")
+
+        job = pdf_jobs.render_for_cv_version(self.cv_version, {}, "cv.pdf")
+
+        self.assertIsNone(job)
+        self.cv_version.pdf_file.open("rb")
+        self.assertEqual(self.cv_version.pdf_file.read(), b"%PDF cached")
+        self.cv_version.pdf_file.close()
+
+    @patch(RENDER_HTML_PATH, return_value="<p>cv</p>")
+    def test_render_for_cv_version_queues_on_miss(self, _mock_html):
+        job = pdf_jobs.render_for_cv_version(self.cv_version, {}, "cv.pdf")
+
+        self.assertEqual(job.status, PdfRenderJob.STATUS_QUEUED)
+        self.assertEqual(job.cv_version, self.cv_version)
+        self.assertFalse(self.cv_version.pdf_file)
+
+
+class TestWorker(_PdfCacheMixin, TestCase):
+    @patch(HTML_TO_PDF_PATH, return_value=b"%PDF rendered")
+    def test_process_next_renders_into_cache_and_cv_version(self, _mock_pdf):
+        job = pdf_jobs.enqueue("<p>cv</p>", cv_version=self.cv_version, pdf_name="cv.pdf")
+
+        pdf_jobs.process_next()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfRenderJob.STATUS_DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.html, "")
+        self.assertEqual(pdf_cache.get(job.digest), b"%PDF rendered")
+        self.cv_version.refresh_from_db()
+        self.cv_version.pdf_file.open("rb")
+        self.assertEqual(self.cv_version.pdf_file.read(), b"%PDF rendered")
+        self.cv_version.pdf_file.close()
+
+    def test_process_next_on_empty_queue(self):
+        self.assertIsNone(pdf_jobs.process_next())
+
+    @override_settings(PDF_JOB_MAX_ATTEMPTS=2)
+    @patch(HTML_TO_PDF_PATH, side_effect=RuntimeError("layout failed"))
+    def test_failures_are_retried_then_marked_failed(self, _mock_pdf):
+        job = pdf_jobs.enqueue("<p>cv</p>")
+
+        with self.assertLogs("apps.cv_assistant.services.pdf_jobs", level="ERROR"):
+            pdf_jobs.process_next()
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfRenderJob.STATUS_QUEUED)
+
+        with self.assertLogs("apps.cv_assistant.services.pdf_jobs", level="ERROR"):
+            pdf_jobs.process_next()
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfRenderJob.STATUS_FAILED)
+        self.assertEqual(job.error, "layout failed")
+        self.assertIsNone(pdf_jobs.process_next())
+
+    def test_running_job_is_not_claimed_twice(self):
+        pdf_jobs.enqueue("<p>cv</p>")
+        self.assertIsNotNone(pdf_jobs.claim_next())
+        self.assertIsNone(pdf_jobs.claim_next())
+
+    @override_settings(PDF_JOB_STALE_AFTER=60)
+    def test_stale_running_job_is_reclaimed(self):
+        job = pdf_jobs.enqueue("<p>cv</p>")
+        PdfRenderJob.objects.filter(pk=job.pk).update(
+            status=PdfRenderJob.STATUS_RUNNING,
+            started_at=timezone.now() - timedelta(minutes=5),
+            attempts=1,
+        )
+
+        claimed = pdf_jobs.claim_next()
+
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.attempts, 2)
+
+    @patch(HTML_TO_PDF_PATH, return_value=b"%PDF rendered")
+    def test_command_once_drains_queue(self, _mock_pdf):
+        # An up-to-date version, so the worker's stale scan queues nothing.
+        type(self.cv_version).objects.filter(pk=self.cv_version.pk).update(
+            base_fingerprint=cv_builder.base_fingerprint(),
+        )
+        pdf_jobs.enqueue("<p>one</p>")
+        pdf_jobs.enqueue("<p>two</p>")
+        out = StringIO()
+
+        call_command("render_pdf_jobs", "--once", stdout=out)
+
+        self.assertIn("Processed 2 PDF job(s)", out.getvalue())
+        self.assertFalse(
+            PdfRenderJob.objects.exclude(status=PdfRenderJob.STATUS_DONE).exists()
+        )
@@ -0,0 +1,71 @@
+"""Tests for the renderer process pool.
+
+The renderers run small module-level stand-ins instead of WeasyPrint so the
+pool mechanics (pipes, timeouts, replacing dead renderers) are exercised in
+real processes.
+"""
+import os
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from apps.cv_assistant.services.pdf_pool import (
+    PdfRenderError,
+    PdfRenderTimeout,
+    RendererPool,
+)
+
+
+def _fake_render(html, output_path=None):
+    if html == 'boom':
+        raise ValueError('bad document')
+    if html == 'hang':
+        time.sleep(30)
+    if html == 'die':
+        os._exit(1)
+    pdf_bytes = b'%PDF ' + html.encode()
+    if output_path:
+        with open(output_path, 'wb') as fh:
+            fh.write(pdf_bytes)
+        return output_path
+    return pdf_bytes
+
+
+class TestRendererPool(SimpleTestCase):
+    def setUp(self):
+        self.pool = RendererPool(size=1, timeout=10, render=_fake_render)
+        self.addCleanup(self.pool.close)
+
+    def test_render_returns_pdf_bytes(self):
+        self.assertEqual(self.pool.render('<p>cv</p>'), b'%PDF <p>cv</p>')
+        self.assertEqual(self.pool.render('<p>again</p>'), b'%PDF <p>again</p>')
+
+    def test_renderer_writes_the_output_path_itself(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cv.pdf')
+            self.assertEqual(self.pool.render('<p>cv</p>', path), path)
+            with open(path, 'rb') as fh:
+                self.assertEqual(fh.read(), b'%PDF <p>cv</p>')
+
+    def test_renderer_process_is_reused(self):
+        self.pool.render('a')
+        renderer = self.pool._idle.queue[0]
+        self.pool.render('b')
+        self.assertIs(self.pool._idle.queue[0], renderer)
+
+    def test_render_error_is_raised_and_renderer_kept(self):
+        with self.assertRaisesMessage(PdfRenderError, 'ValueError: bad document'):
+            self.pool.render('boom')
+        self.assertEqual(self.pool.render('ok'), b'%PDF ok')
+
+    def test_timeout_replaces_renderer(self):
+        self.pool.render('warm')
+        with self.assertRaises(PdfRenderTimeout):
+            self.pool.render('hang', timeout=0.5)
+        self.assertEqual(self.pool.render('ok'), b'%PDF ok')
+
+    def test_dead_renderer_is_replaced(self):
+        with self.assertRaises(PdfRenderError):
+            self.pool.render('die')
+        self.assertEqual(self.pool.render('ok'), b'%PDF ok')
@@ -5,11 +5,22 @@ Task 5: ai_client.chat_completion
 Task 6: cv_adapter prompt builder / parser
 """
 
+import asyncio
 import json
+import os
+import pathlib
+import tempfile
+import threading
+import time
 from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import MagicMock, patch
 
-from django.test import TestCase
+import openai
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
 
 from apps.portfolio.models import (
     Certification,
@@ -19,7 +30,9 @@ from apps.portfolio.models import (
     SocialSettings,
     Summary,
 )
-from apps.cv_assistant.services import ai_client, cv_adapter, cv_builder, pdf_generator
+from apps.cv_assistant.models import BaseCVDataVersion
+from apps.cv_assistant.services import ai_client, cv_adapter, cv_builder, pdf_cache, pdf_generator
+from apps.cv_assistant.services.stub_llm import StubLLMServer
 
 
 def _make_summary():
@@ -124,6 +137,268 @@ class TestBuildCvContext(TestCase):
         self.assertEqual(exps[0].position, 'Senior Dev')
         self.assertIn('<strong>Adapted</strong>', exps[0].description_html)
 
+    def test_pdf_flavor_replaces_stored_web_html(self):
+        ctx = cv_builder.build_cv_context()
+        cert = list(ctx['certifications'])[0]
+        self.assertEqual(cert.description_html, '<p><strong>Cloud</strong> cert</p>')
+
+    def test_second_build_reuses_rendered_fragments(self):
+        cv_builder.build_cv_context()
+        with patch('core.markdown._render') as mock_render:
+            cv_builder.build_cv_context()
+        mock_render.assert_not_called()
+
+
+@override_settings(CV_CONTEXT_CACHE_TIMEOUT=300)
+class TestBuildCvContextCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        _make_summary()
+        self.exp = _make_experience()
+        _make_skill()
+        _make_social_settings()
+
+    def test_second_build_only_reads_the_version(self):
+        cv_builder.build_cv_context()
+        with self.assertNumQueries(1):
+            ctx = cv_builder.build_cv_context()
+        self.assertEqual(ctx['experiences'][0].position, 'Backend Dev')
+        self.assertIn('<strong>Experienced</strong>', ctx['summary'].content_html)
+
+    def test_returns_a_fresh_dict_each_call(self):
+        ctx = cv_builder.build_cv_context()
+        ctx['user'] = 'someone'
+        self.assertNotIn('user', cv_builder.build_cv_context())
+
+    def test_adapted_build_uses_cached_base(self):
+        cv_builder.build_cv_context()
+        adapted = {
+            'summary': 'Adapted',
+            'experiences': [{'id': self.exp.id, 'position': 'Lead',
+                             'company': 'Acme', 'description_adapted': 'New'}],
+        }
+        with self.assertNumQueries(1):
+            ctx = cv_builder.build_cv_context(adapted_data=adapted)
+        self.assertEqual(ctx['experiences'][0].position, 'Lead')
+
+    def test_save_invalidates(self):
+        cv_builder.build_cv_context()
+        self.exp.position = 'Staff Dev'
+        self.exp.save()
+        ctx = cv_builder.build_cv_context()
+        self.assertEqual(ctx['experiences'][0].position, 'Staff Dev')
+
+    def test_delete_invalidates(self):
+        cv_builder.build_cv_context()
+        self.exp.delete()
+        self.assertEqual(cv_builder.build_cv_context()['experiences'], [])
+
+    def test_change_committed_by_another_worker_invalidates(self):
+        cv_builder.build_cv_context()
+        # Another worker saved the data: this process' cache was not
+        # touched, only the version token in the database.
+        Experience.objects.filter(pk=self.exp.pk).update(position='Staff Dev')
+        BaseCVDataVersion.objects.update_or_create(pk=1, defaults={'token': 'other-worker'})
+        ctx = cv_builder.build_cv_context()
+        self.assertEqual(ctx['experiences'][0].position, 'Staff Dev')
+
+    def test_rolled_back_change_keeps_the_snapshot(self):
+        cv_builder.build_cv_context()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.exp.save()
+            raise RuntimeError
+        with self.assertNumQueries(1):
+            cv_builder.build_cv_context()
+
+    def test_related_model_change_invalidates(self):
+        cv_builder.build_cv_context()
+        Skill.objects.create(name='Go', category='Languages', years_of_experience=1)
+        ctx = cv_builder.build_cv_context()
+        names = [s.name for col in ctx['skill_columns'] for item in col for s in item['skills']]
+        self.assertIn('Go', names)
+
+
+@override_settings(CV_CONTEXT_CACHE_TIMEOUT=3600)
+class TestPromptCache(TestCase):
+    JOB = 'Senior SRE with observability focus'
+
+    def setUp(self):
+        cache.clear()
+        cv_adapter.clear_prompt_cache()
+        self.addCleanup(cache.clear)
+        self.addCleanup(cv_adapter.clear_prompt_cache)
+        _make_summary()
+        self.exp = _make_experience()
+        _make_skill()
+
+    def test_fingerprint_is_cached_with_snapshot(self):
+        cv_builder.get_base_context()
+        with self.assertNumQueries(1):
+            fingerprint = cv_builder.base_fingerprint()
+        self.assertEqual(fingerprint, cv_builder.base_fingerprint(cv_builder.get_base_context()))
+
+    def test_chat_prompt_matches_builder_and_is_memoized(self):
+        prompt = cv_adapter.chat_system_prompt(self.JOB)
+        self.assertEqual(
+            prompt, cv_adapter.build_chat_system_prompt(cv_builder.build_cv_context(), self.JOB),
+        )
+        with self.assertNumQueries(1), \
+                patch.object(cv_adapter, '_format_base_cv_data') as format_cv:
+            self.assertEqual(cv_adapter.chat_system_prompt(self.JOB), prompt)
+        format_cv.assert_not_called()
+        self.assertEqual(cv_adapter.prompt_cache_stats()['hits'], 1)
+
+    def test_prompt_reads_one_snapshot(self):
+        with override_settings(CV_CONTEXT_CACHE_TIMEOUT=0), \
+                patch.object(cv_builder, '_build_base_snapshot',
+                             wraps=cv_builder._build_base_snapshot) as build:
+            cv_adapter.chat_system_prompt(self.JOB)
+            cv_adapter.adaptation_system_prompt()
+        self.assertEqual(build.call_count, 2)
+
+    def test_adaptation_prompt_matches_builder(self):
+        self.assertEqual(
+            cv_adapter.adaptation_system_prompt(),
+            cv_adapter.build_system_prompt(cv_builder.build_cv_context()),
+        )
+        messages, _stats = cv_adapter.build_adaptation_messages(None, 'SRE role')
+        self.assertEqual(messages[0]['content'], cv_adapter.adaptation_system_prompt())
+
+    def test_jobs_share_the_cv_prefix(self):
+        first = cv_adapter.chat_system_prompt(self.JOB)
+        second = cv_adapter.chat_system_prompt('Data engineer')
+        prefix = first[:first.index('JOB DESCRIPTION')]
+        self.assertTrue(second.startswith(prefix))
+        self.assertIn('Acme', prefix)
+
+    def test_portfolio_change_yields_new_prompt(self):
+        before = cv_adapter.chat_system_prompt(self.JOB)
+        self.exp.company = 'Globex'
+        self.exp.save()
+        after = cv_adapter.chat_system_prompt(self.JOB)
+        self.assertNotEqual(after, before)
+        self.assertIn('Globex', after)
+
+
+class TestPdfCache(TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        override = override_settings(PDF_CACHE_DIR=self.dir, PDF_CACHE_MAX_BYTES=100)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_digest_is_stable_and_content_addressed(self):
+        self.assertEqual(pdf_cache.html_digest('<p>a</p>'), pdf_cache.html_digest('<p>a</p>'))
+        self.assertNotEqual(pdf_cache.html_digest('<p>a</p>'), pdf_cache.html_digest('<p>b</p>'))
+
+    def test_digest_covers_the_stylesheet(self):
+        before = pdf_cache.html_digest('<p>a</p>')
+        with patch('apps.cv_assistant.services.pdf_generator.stylesheet_digest', return_value='0' * 64):
+            self.assertNotEqual(pdf_cache.html_digest('<p>a</p>'), before)
+
+    def test_put_then_get_round_trips(self):
+        pdf_cache.put('abc', b'%PDF data')
+        self.assertEqual(pdf_cache.get('abc'), b'%PDF data')
+        self.assertIsNone(pdf_cache.get('missing'))
+
+    def test_prune_evicts_least_recently_used(self):
+        pdf_cache.put('old', b'x' * 40)
+        pdf_cache.put('new', b'x' * 40)
+        os.utime(os.path.join(self.dir, 'old.pdf'), (1, 1))
+        os.utime(os.path.join(self.dir, 'new.pdf'), (2, 2))
+        pdf_cache.get('old')  # bumps it to most recently used
+
+        pdf_cache.put('newest', b'x' * 40)
+
+        self.assertIsNotNone(pdf_cache.get('old'))
+        self.assertIsNone(pdf_cache.get('new'))
+        self.assertIsNotNone(pdf_cache.get('newest'))
+
+    def test_oversized_pdf_survives_its_own_write(self):
+        pdf_cache.put('big', b'x' * 150)
+        self.assertEqual(pdf_cache.get('big'), b'x' * 150)
+
+        # Evicted by the next write instead.
+        pdf_cache.put('next', b'x' * 40)
+        self.assertIsNone(pdf_cache.get('big'))
+        self.assertIsNotNone(pdf_cache.get('next'))
+
+    def test_put_file_renders_straight_into_cache(self):
+        def write(path):
+            with open(path, 'wb') as fh:
+                fh.write(b'%PDF streamed')
+
+        self.assertTrue(pdf_cache.put_file('abc', write))
+        with pdf_cache.open_pdf('abc') as fh:
+            self.assertEqual(fh.read(), b'%PDF streamed')
+
+    def test_put_file_render_error_propagates_and_cleans_up(self):
+        def write(path):
+            raise ValueError('layout failed')
+
+        with self.assertRaises(ValueError):
+            pdf_cache.put_file('abc', write)
+        self.assertEqual(os.listdir(self.dir), [])
+
+    def test_disabled_cache_stores_nothing(self):
+        with override_settings(PDF_CACHE_MAX_BYTES=0):
+            pdf_cache.put('abc', b'%PDF data')
+            self.assertIsNone(pdf_cache.get('abc'))
+        self.assertEqual(os.listdir(self.dir), [])
+
+
+class TestHtmlToPdfPool(TestCase):
+    @override_settings(PDF_RENDER_POOL_SIZE=2)
+    @patch('apps.cv_assistant.services.pdf_pool.render', return_value=b'%PDF pooled')
+    def test_uses_renderer_pool_when_enabled(self, mock_render):
+        self.assertEqual(pdf_generator.html_to_pdf('<p>cv</p>'), b'%PDF pooled')
+        mock_render.assert_called_once_with('<p>cv</p>', None)
+
+    @override_settings(PDF_RENDER_POOL_SIZE=2)
+    @patch('apps.cv_assistant.services.pdf_pool.render', side_effect=lambda html, path: path)
+    def test_pool_writes_the_output_path(self, mock_render):
+        self.assertEqual(pdf_generator.html_to_pdf('<p>cv</p>', output_path='/tmp/cv.pdf'),
+                         '/tmp/cv.pdf')
+        # The renderer process writes the file: no PDF bytes cross the pipe.
+        mock_render.assert_called_once_with('<p>cv</p>', '/tmp/cv.pdf')
+
+    @patch('apps.cv_assistant.services.pdf_pool.render')
+    @patch('apps.cv_assistant.services.pdf_generator.HTML')
+    def test_renders_in_process_when_pool_disabled(self, mock_html, mock_render):
+        pdf_generator.html_to_pdf('<p>cv</p>')
+        mock_html.return_value.write_pdf.assert_called_once()
+        mock_render.assert_not_called()
+
+
+class TestCompiledStylesheet(TestCase):
+    def test_stylesheet_file_exists(self):
+        self.assertTrue(pdf_generator.stylesheet_path().is_file())
+
+    def test_stylesheet_is_compiled_once_per_thread(self):
+        self.assertIs(pdf_generator.get_stylesheet(), pdf_generator.get_stylesheet())
+
+    def test_edited_stylesheet_is_recompiled(self):
+        compiled = pdf_generator.get_stylesheet()
+        with patch('apps.cv_assistant.services.pdf_generator.stylesheet_digest', return_value='0' * 64):
+            self.assertIsNot(pdf_generator.get_stylesheet(), compiled)
+
+    def test_digest_follows_the_file(self):
+        path = pathlib.Path(tempfile.mkdtemp()) / 'cv_pdf.css'
+        path.write_text('body { color: black; }')
+        with patch('apps.cv_assistant.services.pdf_generator.stylesheet_path', return_value=path):
+            before = pdf_generator.stylesheet_digest()
+            path.write_text('body { color: navy; }')
+            self.assertNotEqual(pdf_generator.stylesheet_digest(), before)
+
+    @patch('apps.cv_assistant.services.pdf_generator.HTML')
+    def test_write_pdf_passes_compiled_stylesheet(self, mock_html):
+        css, font_config = pdf_generator.get_stylesheet()
+        pdf_generator.layout_pdf('<p>cv</p>')
+        _, kwargs = mock_html.return_value.write_pdf.call_args
+        self.assertEqual(kwargs['stylesheets'], [css])
+        self.assertIs(kwargs['font_config'], font_config)
+
 
 class TestGenerateCvPdf(TestCase):
     def setUp(self):
@@ -173,6 +448,442 @@ class TestAiClient(TestCase):
         self.assertEqual(kwargs['max_tokens'], 100)
 
 
+class TestAiClientStream(TestCase):
+    def test_yields_content_deltas(self):
+        chunks = []
+        for content in ('Hel', None, 'lo'):
+            chunk = MagicMock()
+            chunk.choices[0].delta.content = content
+            chunks.append(chunk)
+        stream = MagicMock()
+        stream.__enter__.return_value = stream
+        stream.__iter__.return_value = iter(chunks)
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.return_value = stream
+
+        with patch('apps.cv_assistant.services.ai_client.get_ai_client', return_value=mock_client):
+            deltas = list(ai_client.chat_completion_stream([{'role': 'user', 'content': 'hi'}]))
+
+        self.assertEqual(deltas, ['Hel', 'lo'])
+        self.assertTrue(mock_client.chat.completions.create.call_args.kwargs['stream'])
+        stream.__exit__.assert_called_once()
+
+
+class _FakeCompletionHandler(BaseHTTPRequestHandler):
+    """Minimal keep-alive OpenAI-compatible ``/chat/completions`` endpoint."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = json.dumps({
+            'id': 'chatcmpl-1',
+            'object': 'chat.completion',
+            'created': 0,
+            'model': 'fake',
+            'choices': [{
+                'index': 0,
+                'finish_reason': 'stop',
+                'message': {'role': 'assistant', 'content': 'pong'},
+            }],
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSharedAiClient(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _FakeCompletionHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_port}/v1'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        ai_client.reset_ai_client()
+        ai_client.reset_client_stats()
+        self.addCleanup(ai_client.reset_ai_client)
+
+    def test_client_is_shared(self):
+        with override_settings(AI_BASE_URL=self.base_url):
+            self.assertIs(ai_client.get_ai_client(), ai_client.get_ai_client())
+        self.assertEqual(ai_client.client_stats()['clients_created'], 1)
+
+    def test_settings_change_rebuilds_client(self):
+        with override_settings(AI_BASE_URL=self.base_url):
+            first = ai_client.get_ai_client()
+        with override_settings(AI_BASE_URL=self.base_url, AI_TIMEOUT=5.0):
+            second = ai_client.get_ai_client()
+        self.assertIsNot(first, second)
+        self.assertEqual(second.timeout.read, 5.0)
+
+    def test_connections_are_reused(self):
+        with patch.dict(os.environ, {'NO_PROXY': '*'}), \
+                override_settings(AI_BASE_URL=self.base_url, AI_API_KEY='test'):
+            for _ in range(3):
+                self.assertEqual(
+                    ai_client.chat_completion([{'role': 'user', 'content': 'ping'}]), 'pong',
+                )
+
+        stats = ai_client.client_stats()
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['connections_opened'], 1)
+        self.assertEqual(stats['connections_reused'], 2)
+
+    def test_async_client_is_shared_per_event_loop(self):
+        async def chat_twice():
+            first = ai_client.get_async_ai_client()
+            replies = [
+                await ai_client.achat_completion([{'role': 'user', 'content': 'ping'}])
+                for _ in range(2)
+            ]
+            return first, ai_client.get_async_ai_client(), replies
+
+        with patch.dict(os.environ, {'NO_PROXY': '*'}), \
+                override_settings(AI_BASE_URL=self.base_url, AI_API_KEY='test'):
+            first, second, replies = asyncio.run(chat_twice())
+            other_loop_client = asyncio.run(self._current_async_client())
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other_loop_client)
+        self.assertEqual(replies, ['pong', 'pong'])
+        self.assertEqual(ai_client.client_stats()['connections_reused'], 1)
+
+    @staticmethod
+    async def _current_async_client():
+        return ai_client.get_async_ai_client()
+
+
+class TestAiClientResilience(TestCase):
+    PING = [{'role': 'user', 'content': 'ping'}]
+
+    def setUp(self):
+        ai_client.reset_ai_client()
+        ai_client.reset_breaker()
+        self.addCleanup(ai_client.reset_ai_client)
+        self.addCleanup(ai_client.reset_breaker)
+        patcher = patch.dict(os.environ, {'NO_PROXY': '*'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _serve(self, **options):
+        server = StubLLMServer(**options).start()
+        self.addCleanup(server.stop)
+        return server
+
+    @staticmethod
+    def _settings(server, **overrides):
+        # A context manager rather than enable()/addCleanup(): cleanups run
+        # after method decorators exit and would restore their settings.
+        return override_settings(AI_BASE_URL=server.base_url, AI_API_KEY='test', **overrides)
+
+    def test_transient_errors_are_retried(self):
+        server = self._serve(error_rate=1, error_status=503)
+        with self._settings(server, AI_MAX_RETRIES=2), \
+                self.assertRaises(openai.InternalServerError), \
+                self.assertLogs('apps.cv_assistant.services.ai_client', 'WARNING') as logs:
+            ai_client.chat_completion(self.PING)
+        self.assertEqual(server.stats()['requests'], 3)
+        self.assertIn('retry 2', logs.output[-1])
+
+    def test_client_errors_are_not_retried(self):
+        server = self._serve(error_rate=1, error_status=400)
+        with self._settings(server, AI_MAX_RETRIES=2), self.assertRaises(openai.BadRequestError):
+            ai_client.chat_completion(self.PING)
+        self.assertEqual(server.stats()['requests'], 1)
+        self.assertEqual(ai_client.breaker_state()['consecutive_failures'], 0)
+
+    def test_deadline_bounds_the_call(self):
+        server = self._serve(latency=1.0)
+        start = time.monotonic()
+        with self._settings(server, AI_MAX_RETRIES=5, AI_DEADLINE=0.3), \
+                self.assertRaises(openai.APITimeoutError):
+            ai_client.chat_completion(self.PING)
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertEqual(server.stats()['requests'], 1)
+
+    def test_breaker_opens_and_fails_fast(self):
+        server = self._serve(error_rate=1)
+        with self._settings(server, AI_MAX_RETRIES=0, AI_BREAKER_FAILURES=2,
+                            AI_BREAKER_RESET_TIMEOUT=60):
+            with self.assertLogs('apps.cv_assistant.services.ai_client', 'WARNING'):
+                for _ in range(2):
+                    with self.assertRaises(openai.InternalServerError):
+                        ai_client.chat_completion(self.PING)
+            self.assertEqual(ai_client.breaker_state()['state'], 'open')
+
+            with self.assertRaises(ai_client.AIUnavailable):
+                ai_client.chat_completion(self.PING)
+            with self.assertRaises(ai_client.AIUnavailable):
+                list(ai_client.chat_completion_stream(self.PING))
+        self.assertEqual(server.stats()['requests'], 2)
+
+    def test_half_open_trial_closes_breaker(self):
+        server = self._serve(error_rate=1)
+        with self._settings(server, AI_MAX_RETRIES=0, AI_BREAKER_FAILURES=1,
+                            AI_BREAKER_RESET_TIMEOUT=0):
+            with self.assertRaises(openai.InternalServerError), \
+                    self.assertLogs('apps.cv_assistant.services.ai_client', 'WARNING'):
+                ai_client.chat_completion(self.PING)
+            self.assertEqual(ai_client.breaker_state()['state'], 'open')
+
+            server.error_rate = 0
+            with self.assertLogs('apps.cv_assistant.services.ai_client', 'INFO') as logs:
+                self.assertTrue(ai_client.chat_completion(self.PING))
+            self.assertIn('AI circuit breaker closed', logs.output[0])
+            self.assertEqual(ai_client.breaker_state(),
+                             {'state': 'closed', 'consecutive_failures': 0, 'retry_in': 0.0})
+
+    @override_settings(AI_BREAKER_FAILURES=1, AI_BREAKER_RESET_TIMEOUT=0)
+    def test_half_open_admits_one_trial(self):
+        breaker = ai_client.CircuitBreaker()
+        with self.assertLogs('apps.cv_assistant.services.ai_client', 'WARNING'):
+            breaker.record_failure()
+        breaker.before_call()
+        self.assertEqual(breaker.state, breaker.HALF_OPEN)
+        with self.assertRaises(ai_client.AIUnavailable):
+            breaker.before_call()
+        with self.assertLogs('apps.cv_assistant.services.ai_client', 'WARNING'):
+            breaker.record_failure()
+        self.assertEqual(breaker.state, breaker.OPEN)
+
+    def test_async_completion_retries(self):
+        server = self._serve(error_rate=1, error_status=429)
+        with self._settings(server, AI_MAX_RETRIES=1), self.assertRaises(openai.RateLimitError), \
+                self.assertLogs('apps.cv_assistant.services.ai_client', 'WARNING'):
+            asyncio.run(ai_client.achat_completion(self.PING))
+        self.assertEqual(server.stats()['requests'], 2)
+
+
+class TestAiClientAdmission(TestCase):
+    PING = [{'role': 'user', 'content': 'ping'}]
+
+    def setUp(self):
+        ai_client.reset_ai_client()
+        ai_client.reset_admission_stats()
+        self.addCleanup(ai_client.reset_ai_client)
+        self.addCleanup(ai_client.reset_admission_stats)
+        self.addCleanup(cache.clear)
+        patcher = patch.dict(os.environ, {'NO_PROXY': '*'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.server = StubLLMServer(reply_tokens=1).start()
+        self.addCleanup(self.server.stop)
+
+    def _settings(self, **overrides):
+        return override_settings(
+            AI_BASE_URL=self.server.base_url, AI_API_KEY='test', **overrides,
+        )
+
+    def test_busy_process_rejects_after_queue_timeout(self):
+        with self._settings(AI_MAX_IN_FLIGHT=1, AI_QUEUE_TIMEOUT=0.05):
+            with ai_client._Admission():
+                self.assertEqual(ai_client.admission_stats()['in_flight'], 1)
+                with self.assertRaises(ai_client.AIBusy):
+                    ai_client.chat_completion(self.PING)
+            self.assertEqual(ai_client.chat_completion(self.PING), 'stub.')
+            stats = ai_client.admission_stats()
+        self.assertEqual(self.server.stats()['requests'], 1)
+        self.assertEqual(
+            {key: stats[key] for key in ('in_flight', 'admitted', 'queued', 'rejected')},
+            {'in_flight': 0, 'admitted': 2, 'queued': 1, 'rejected': 1},
+        )
+
+    def test_queued_call_runs_when_a_slot_frees(self):
+        with self._settings(AI_MAX_IN_FLIGHT=1, AI_QUEUE_TIMEOUT=5):
+            holder = ai_client._Admission().__enter__()
+            threading.Timer(0.1, holder.__exit__, (None, None, None)).start()
+            self.assertEqual(ai_client.chat_completion(self.PING), 'stub.')
+            stats = ai_client.admission_stats()
+        self.assertEqual(stats['queued'], 1)
+        self.assertEqual(stats['rejected'], 0)
+
+    def test_cluster_slots_are_shared_through_the_cache(self):
+        with self._settings(AI_MAX_IN_FLIGHT=0, AI_CLUSTER_MAX_IN_FLIGHT=1,
+                            AI_QUEUE_TIMEOUT=0.1):
+            # Another worker holds the only slot.
+            slot = ai_client._CLUSTER_SLOT_KEY.format(0)
+            cache.add(slot, 'other-worker')
+            with self.assertRaises(ai_client.AIBusy):
+                ai_client.chat_completion(self.PING)
+            self.assertEqual(self.server.stats()['requests'], 0)
+
+            cache.delete(slot)
+            self.assertEqual(ai_client.chat_completion(self.PING), 'stub.')
+            self.assertIsNone(cache.get(slot))
+
+    def test_broken_cache_falls_back_to_the_process_limit(self):
+        with self._settings(AI_MAX_IN_FLIGHT=1, AI_CLUSTER_MAX_IN_FLIGHT=1, AI_QUEUE_TIMEOUT=0), \
+                self.assertLogs('apps.cv_assistant.services.ai_client', 'WARNING') as logs:
+            with patch.object(ai_client.django_cache, 'add', side_effect=ConnectionError):
+                self.assertEqual(ai_client.chat_completion(self.PING), 'stub.')
+            with patch.object(ai_client.django_cache, 'delete', side_effect=ConnectionError):
+                self.assertEqual(ai_client.chat_completion(self.PING), 'stub.')
+            # Neither failure leaked the process slot (the undeleted cluster
+            # slot would only free itself when its key expires).
+            cache.clear()
+            self.assertEqual(ai_client.chat_completion(self.PING), 'stub.')
+            self.assertEqual(ai_client.admission_stats()['in_flight'], 0)
+        self.assertIn('cache is unavailable', logs.output[0])
+        self.assertEqual(len(logs.output), 2)
+
+    def test_expired_slot_taken_by_another_call_is_not_freed(self):
+        with self._settings(AI_MAX_IN_FLIGHT=0, AI_CLUSTER_MAX_IN_FLIGHT=1):
+            slot = ai_client._CLUSTER_SLOT_KEY.format(0)
+            with ai_client._Admission():
+                # The key expired and another worker took the slot.
+                cache.set(slot, 'other-worker')
+            self.assertEqual(cache.get(slot), 'other-worker')
+
+    def test_stream_holds_its_slot_until_closed(self):
+        with self._settings(AI_MAX_IN_FLIGHT=1, AI_QUEUE_TIMEOUT=0):
+            stream = ai_client.chat_completion_stream(self.PING)
+            self.assertEqual(next(stream), 'stub.')
+            with self.assertRaises(ai_client.AIBusy):
+                ai_client.chat_completion(self.PING)
+            stream.close()
+            self.assertEqual(ai_client.admission_stats()['in_flight'], 0)
+            self.assertEqual(ai_client.chat_completion(self.PING), 'stub.')
+
+    def test_async_calls_wait_without_blocking_the_loop(self):
+        async def scenario():
+            holder = ai_client._Admission()
+            await holder.__aenter__()
+            asyncio.get_running_loop().call_later(
+                0.1, lambda: asyncio.ensure_future(holder.__aexit__(None, None, None)),
+            )
+            return await ai_client.achat_completion(self.PING)
+
+        with self._settings(AI_ASYNC_MAX_IN_FLIGHT=1, AI_CLUSTER_MAX_IN_FLIGHT=1,
+                            AI_QUEUE_TIMEOUT=5):
+            self.assertEqual(asyncio.run(scenario()), 'stub.')
+            stats = ai_client.admission_stats()
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(stats['queued'], 1)
+
+    def test_async_calls_do_not_take_request_thread_slots(self):
+        with self._settings(AI_MAX_IN_FLIGHT=1, AI_QUEUE_TIMEOUT=0):
+            with ai_client._Admission():
+                self.assertEqual(asyncio.run(ai_client.achat_completion(self.PING)), 'stub.')
+
+    def test_background_calls_only_use_idle_capacity(self):
+        with self._settings(AI_MAX_IN_FLIGHT=1, AI_CLUSTER_MAX_IN_FLIGHT=1, AI_QUEUE_TIMEOUT=5):
+            with ai_client._Admission():
+                # The request-thread slot is taken, the cluster one too.
+                start = time.monotonic()
+                with self.assertRaises(ai_client.AIBusy):
+                    ai_client.chat_completion(self.PING, background=True)
+                self.assertLess(time.monotonic() - start, 1)
+
+            with self._settings(AI_CLUSTER_MAX_IN_FLIGHT=0), ai_client._Admission():
+                self.assertEqual(ai_client.chat_completion(self.PING, background=True), 'stub.')
+
+    @override_settings(AI_MAX_IN_FLIGHT=1, AI_QUEUE_TIMEOUT=0)
+    def test_rejection_is_unavailable(self):
+        self.assertTrue(issubclass(ai_client.AIBusy, ai_client.AIUnavailable))
+        with ai_client._Admission():
+            with self.assertRaises(ai_client.AIUnavailable):
+                ai_client.chat_completion(self.PING)
+
+
+class TestResponseCache(TestCase):
+    PING = [{'role': 'user', 'content': 'ping'}]
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _FakeCompletionHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.ai_settings = override_settings(
+            AI_BASE_URL=f'http://127.0.0.1:{cls.server.server_port}/v1',
+            AI_API_KEY='test',
+            AI_RESPONSE_CACHE_SIZE=8,
+        )
+        cls.ai_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.ai_settings.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        ai_client.reset_ai_client()
+        ai_client.reset_client_stats()
+        ai_client.clear_response_cache()
+        self.addCleanup(ai_client.reset_ai_client)
+        self.addCleanup(ai_client.clear_response_cache)
+        patcher = patch.dict(os.environ, {'NO_PROXY': '*'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_deterministic_requests_are_cached(self):
+        for _ in range(3):
+            self.assertEqual(ai_client.chat_completion(self.PING, temperature=0), 'pong')
+
+        self.assertEqual(ai_client.client_stats()['requests'], 1)
+        stats = ai_client.response_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (2, 1, 1))
+        self.assertAlmostEqual(stats['hit_rate'], 2 / 3)
+
+    def test_key_covers_messages_and_parameters(self):
+        ai_client.chat_completion(self.PING, temperature=0)
+        ai_client.chat_completion([{'role': 'user', 'content': 'ping!'}], temperature=0)
+        ai_client.chat_completion(self.PING, temperature=0, model='other-model')
+        ai_client.chat_completion(self.PING, temperature=0, max_tokens=10)
+        self.assertEqual(ai_client.client_stats()['requests'], 4)
+
+    def test_sampled_requests_bypass_cache_unless_forced(self):
+        for _ in range(2):
+            ai_client.chat_completion(self.PING, temperature=0.7)
+        self.assertEqual(ai_client.client_stats()['requests'], 2)
+        self.assertEqual(ai_client.response_cache_stats()['bypassed'], 2)
+
+        for _ in range(2):
+            ai_client.chat_completion(self.PING, temperature=0.7, cache=True)
+        with override_settings(AI_RESPONSE_CACHE_FORCE=True):
+            ai_client.chat_completion(self.PING, temperature=0.7)
+        self.assertEqual(ai_client.client_stats()['requests'], 3)
+
+    def test_cache_false_skips_the_cache(self):
+        for _ in range(2):
+            ai_client.chat_completion(self.PING, temperature=0, cache=False)
+        self.assertEqual(ai_client.client_stats()['requests'], 2)
+
+    def test_disabled_by_default(self):
+        with override_settings(AI_RESPONSE_CACHE_SIZE=0):
+            for _ in range(2):
+                ai_client.chat_completion(self.PING, temperature=0)
+            self.assertEqual(ai_client.response_cache_stats()['maxsize'], 0)
+        self.assertEqual(ai_client.client_stats()['requests'], 2)
+
+    def test_discarded_response_is_fetched_again(self):
+        ai_client.chat_completion(self.PING, temperature=0)
+        ai_client.discard_cached_response(self.PING, temperature=0)
+        ai_client.chat_completion(self.PING, temperature=0)
+        self.assertEqual(ai_client.client_stats()['requests'], 2)
+
+    def test_async_completion_shares_the_cache(self):
+        ai_client.chat_completion(self.PING, temperature=0)
+        reply = asyncio.run(ai_client.achat_completion(self.PING, temperature=0))
+        self.assertEqual(reply, 'pong')
+        self.assertEqual(ai_client.client_stats()['requests'], 1)
+
+
 class TestCvAdapter(TestCase):
     def setUp(self):
         _make_summary()
@@ -266,4 +977,118 @@ class TestCvAdapter(TestCase):
             'experiences': [{'id': 99999, 'description_adapted': 'Nope'}],
         }
         with self.assertRaises(ValueError):
-            cv_adapter.parse_ai_response(json.dumps(payload))
\ No newline at end of file
+            cv_adapter.parse_ai_response(json.dumps(payload))
+
+def _turns_newest_first(count, size=40):
+    """``count`` alternating turns of ``size`` characters, newest first."""
+    turns = [
+        {'role': 'user' if i % 2 == 0 else 'assistant', 'content': f'{i:03d}' + 'x' * (size - 3)}
+        for i in range(count)
+    ]
+    return turns[::-1]
+
+
+class TestConversationWindow(TestCase):
+    NEW_MESSAGE = {'role': 'user', 'content': 'Newest question?'}
+
+    def test_estimate_tokens(self):
+        self.assertEqual(cv_adapter.estimate_tokens(''), 0)
+        self.assertEqual(cv_adapter.estimate_tokens('abcd'), 1)
+        self.assertEqual(cv_adapter.estimate_tokens('abcde'), 2)
+        self.assertEqual(
+            cv_adapter.estimate_message_tokens({'role': 'user', 'content': 'abcd'}),
+            1 + cv_adapter.MESSAGE_OVERHEAD_TOKENS,
+        )
+
+    def test_short_history_is_sent_in_full(self):
+        messages, stats = cv_adapter.build_chat_messages(
+            'System', self.NEW_MESSAGE, _turns_newest_first(4), budget=1000,
+        )
+        self.assertEqual(len(messages), 6)
+        self.assertEqual(messages[0]['role'], 'system')
+        self.assertTrue(messages[1]['content'].startswith('000'))
+        self.assertEqual(messages[-1], self.NEW_MESSAGE)
+        self.assertFalse(stats['truncated'])
+        self.assertEqual(
+            stats['estimated_tokens'],
+            sum(cv_adapter.estimate_message_tokens(m) for m in messages),
+        )
+
+    def test_long_history_keeps_most_recent_turns_within_budget(self):
+        # Each 40-char turn costs 10 + 4 tokens.
+        messages, stats = cv_adapter.build_chat_messages(
+            'System', self.NEW_MESSAGE, _turns_newest_first(50), budget=100,
+        )
+        self.assertLessEqual(stats['estimated_tokens'], 100)
+        self.assertTrue(stats['truncated'])
+        self.assertEqual(stats['turns'], len(messages) - 2)
+        history = [m['content'][:3] for m in messages[1:-1]]
+        self.assertEqual(history, [f'{i:03d}' for i in range(50 - len(history), 50)])
+        self.assertEqual(messages[-1], self.NEW_MESSAGE)
+
+    def test_newest_message_is_kept_even_over_budget(self):
+        huge = {'role': 'user', 'content': 'y' * 4000}
+        messages, stats = cv_adapter.build_chat_messages(
+            'System', huge, _turns_newest_first(5), budget=10,
+        )
+        self.assertEqual(messages, [{'role': 'system', 'content': 'System'}, huge])
+        self.assertTrue(stats['truncated'])
+
+    def test_summary_replaces_dropped_turns(self):
+        messages, stats = cv_adapter.build_chat_messages(
+            'System', self.NEW_MESSAGE, _turns_newest_first(50),
+            summary='We discussed Kubernetes.', budget=100,
+        )
+        self.assertTrue(stats['summarized'])
+        self.assertEqual(messages[1]['role'], 'system')
+        self.assertIn('We discussed Kubernetes.', messages[1]['content'])
+        self.assertLessEqual(stats['estimated_tokens'], 100)
+
+    def test_summary_precedes_unsummarized_turns(self):
+        # The summary covers the turns before the history, so it is sent
+        # even when the whole history fits.
+        messages, stats = cv_adapter.build_chat_messages(
+            'System', self.NEW_MESSAGE, _turns_newest_first(2),
+            summary='Old summary', budget=1000,
+        )
+        self.assertTrue(stats['summarized'])
+        self.assertFalse(stats['truncated'])
+        self.assertEqual([m['role'] for m in messages],
+                         ['system', 'system', 'user', 'assistant', 'user'])
+        self.assertIn('Old summary', messages[1]['content'])
+
+    def test_history_is_consumed_lazily(self):
+        consumed = []
+
+        def turns():
+            for turn in _turns_newest_first(1000):
+                consumed.append(turn)
+                yield turn
+
+        cv_adapter.build_chat_messages('System', self.NEW_MESSAGE, turns(), budget=100)
+        self.assertLess(len(consumed), 10)
+
+    def test_prompt_size_is_logged(self):
+        with self.assertLogs('apps.cv_assistant.services.cv_adapter', level='INFO') as logs:
+            cv_adapter.build_chat_messages('System', self.NEW_MESSAGE, [], budget=100)
+        self.assertIn('chat prompt: ~', logs.output[0])
+
+    def test_adaptation_history_fits_budget(self):
+        _make_summary()
+        _make_experience()
+        ctx = cv_builder.build_cv_context()
+        system_tokens = cv_adapter.estimate_tokens(cv_adapter.build_system_prompt(ctx))
+        messages, stats = cv_adapter.build_adaptation_messages(
+            ctx, 'SRE role', 'Be brief',
+            history_newest_first=_turns_newest_first(200),
+            summary='Earlier: focus on on-call.',
+            budget=system_tokens + 200,
+        )
+        self.assertLessEqual(stats['estimated_tokens'], system_tokens + 200)
+        self.assertTrue(stats['summarized'])
+        prompt = messages[1]['content']
+        self.assertIn('SRE role', prompt)
+        self.assertIn('Be brief', prompt)
+        self.assertIn('Earlier: focus on on-call.', prompt)
+        self.assertIn('199', prompt)
+        self.assertNotIn('User: 000', prompt)
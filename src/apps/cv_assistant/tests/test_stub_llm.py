@@ -0,0 +1,94 @@
+"""Tests for the stub LLM server and the load-test command."""
+import io
+import os
+from unittest.mock import patch
+
+import openai
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from apps.cv_assistant.management.commands.loadtest_cv_assistant import percentile
+from apps.cv_assistant.models import JobApplication
+from apps.cv_assistant.services import ai_client, cv_adapter
+from apps.cv_assistant.services.stub_llm import StubLLMServer
+
+from .test_api import _seed_portfolio
+
+User = get_user_model()
+
+
+class StubLLMServerTest(TestCase):
+
+    def setUp(self):
+        ai_client.reset_ai_client()
+        self.addCleanup(ai_client.reset_ai_client)
+        patcher = patch.dict(os.environ, {'NO_PROXY': '*'})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _serve(self, **options):
+        server = StubLLMServer(**options).start()
+        self.addCleanup(server.stop)
+        settings = override_settings(
+            AI_BASE_URL=server.base_url, AI_API_KEY='stub', AI_MAX_RETRIES=0,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        return server
+
+    def test_chat_reply(self):
+        server = self._serve(reply_tokens=5)
+        reply = ai_client.chat_completion([{'role': 'user', 'content': 'Hi'}])
+        self.assertEqual(reply, 'stub stub stub stub stub.')
+        self.assertEqual(server.stats(), {'requests': 1, 'errors': 0})
+
+    def test_streamed_reply_arrives_token_by_token(self):
+        self._serve(reply_tokens=4, tokens_per_second=1000)
+        deltas = list(ai_client.chat_completion_stream([{'role': 'user', 'content': 'Hi'}]))
+        self.assertEqual(len(deltas), 4)
+        self.assertEqual(''.join(deltas), 'stub stub stub stub.')
+
+    def test_adaptation_reply_is_valid_for_the_base_cv(self):
+        _seed_portfolio()
+        self._serve()
+        messages, _stats = cv_adapter.build_adaptation_messages(None, 'Django developer')
+        parsed = cv_adapter.parse_ai_response(ai_client.chat_completion(messages))
+        self.assertTrue(parsed['experiences'])
+
+    def test_injected_errors(self):
+        server = self._serve(error_rate=1, error_status=503)
+        with self.assertRaises(openai.InternalServerError):
+            ai_client.chat_completion([{'role': 'user', 'content': 'Hi'}])
+        self.assertEqual(server.stats(), {'requests': 1, 'errors': 1})
+
+
+class LoadTestCommandTest(TestCase):
+
+    def test_percentile(self):
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([0.5], 95), 0.5)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    @patch('apps.cv_assistant.services.pdf_generator.generate_cv_pdf',
+           return_value=b'%PDF-1.4 fake')
+    def test_reports_latency_percentiles_and_cleans_up(self, _mock_pdf):
+        _seed_portfolio()
+        out = io.StringIO()
+        with patch.dict(os.environ, {'NO_PROXY': '*'}):
+            # One thread: the test's data lives in its open transaction.
+            call_command(
+                'loadtest_cv_assistant', requests=3, concurrency=1, latency=0, stdout=out,
+            )
+
+        output = out.getvalue()
+        self.assertIn('messages     3 requests', output)
+        self.assertIn('generate-cv  3 requests', output)
+        self.assertEqual(output.count('failures: none'), 2)
+        self.assertIn('p95', output)
+        self.assertIn('stub: 6 requests', output)
+        self.assertIn('6 admitted, 0 queued, 0 rejected', output)
+        self.assertFalse(JobApplication.objects.exists())
+        self.assertFalse(User.objects.exists())
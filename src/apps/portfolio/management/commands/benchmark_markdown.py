@@ -0,0 +1,99 @@
+"""Micro-benchmark for the markdown rendering pipeline.
+
+Compares a fresh ``markdown.markdown()`` call per document against the
+per-thread engine used by ``core.markdown``, with the render cache bypassed
+so only the engine setup cost differs. ``--threads`` mirrors gunicorn's
+``--threads`` setting (2 in docker-compose). The Pygments lexer/formatter
+cache counters are printed at the end.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import markdown
+from django.core.management.base import BaseCommand
+
+from core import markdown as core_markdown
+
+SAMPLE_DOCUMENT = """# Deploying Django behind Nginx
+
+Some **bold** text, a [link](https://example.com) and a list:
+
+- first item
+- second item with `inline code`
+
+```python
+def handler(request):
+    return HttpResponse("ok")
+```
+
+| Setting | Value |
+| --- | --- |
+| workers | 3 |
+| threads | 2 |
+
+```
++--------+      +--------+
+| Client | ---> | Server |
++--------+      +--------+
+```
+"""
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-call markdown.markdown() against the pooled per-thread engine."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500,
+                            help='Documents rendered per strategy (default: 500).')
+        parser.add_argument('--threads', type=int, default=2,
+                            help='Concurrent render threads (default: 2, like gunicorn --threads 2).')
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        threads = options['threads']
+
+        def fresh_instance(text):
+            return markdown.markdown(
+                text,
+                extensions=core_markdown._EXTENSIONS,
+                extension_configs=core_markdown._EXTENSION_CONFIGS,
+            )
+
+        def pooled_engine(text):
+            return core_markdown._convert(text, 'web')
+
+        # Warm both paths once so imports/plugin discovery are not measured.
+        fresh_instance(SAMPLE_DOCUMENT)
+        pooled_engine(SAMPLE_DOCUMENT)
+
+        results = {}
+        for label, func in (('markdown.markdown()', fresh_instance),
+                            ('pooled engine', pooled_engine)):
+            elapsed = self._run(func, iterations, threads)
+            results[label] = elapsed
+            self.stdout.write(
+                f"{label:<22} {iterations} docs / {threads} threads: "
+                f"{elapsed:.3f}s ({elapsed / iterations * 1e6:.0f} us/doc)"
+            )
+
+        baseline = results['markdown.markdown()']
+        pooled = results['pooled engine']
+        saved = (baseline - pooled) / iterations * 1e6
+        self.stdout.write(self.style.SUCCESS(
+            f"Pooled engine saves {saved:.0f} us/doc ({baseline / pooled:.2f}x)."
+        ))
+
+        for name, stats in core_markdown.highlight_cache_stats().items():
+            lookups = stats['hits'] + stats['misses']
+            hit_rate = stats['hits'] / lookups * 100 if lookups else 0.0
+            self.stdout.write(
+                f"{name} cache: {stats['hits']} hits / {stats['misses']} misses "
+                f"({hit_rate:.1f}% hit rate, {stats['size']}/{stats['maxsize']} entries)"
+            )
+
+    @staticmethod
+    def _run(func, iterations, threads):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(func, [SAMPLE_DOCUMENT] * iterations))
+        return time.perf_counter() - start
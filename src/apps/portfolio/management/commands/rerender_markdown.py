@@ -0,0 +1,96 @@
+"""Backfill / re-render the stored HTML of every markdown-bearing model.
+
+Run after deploying a renderer change (``core.markdown.RENDERER_VERSION``
+bump). By default only rows rendered by an older renderer are touched;
+``--force`` re-renders everything. Rows are loaded, rendered and written
+``--batch-size`` at a time, so memory stays flat however large the table;
+each batch is spread over a pool of ``--processes`` render processes.
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from core.markdown import RENDERER_VERSION, render_markdown_many
+from core.models import RenderedMarkdownModel
+
+
+class Command(BaseCommand):
+    help = "Re-render the stored HTML columns of all markdown-bearing models."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render every row, not only the ones with a stale renderer version.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Rows loaded, rendered and written per batch (default: 200).',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=2,
+            help='Markdown render processes for large batches; 0 renders in this process (default: 2).',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for model in self._markdown_models():
+            queryset = model._default_manager.order_by('pk')
+            if not options['force']:
+                queryset = queryset.exclude(markdown_version=RENDERER_VERSION)
+
+            count = 0
+            for rows in self._batches(queryset, options['batch_size']):
+                self._rerender(model, rows, options['processes'])
+                count += len(rows)
+
+            total += count
+            self.stdout.write(f"{model._meta.label}: {count} re-rendered")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-rendered {total} rows (renderer v{RENDERER_VERSION})."
+        ))
+
+    @staticmethod
+    def _batches(queryset, batch_size):
+        """Yield ``queryset`` as lists of up to ``batch_size`` rows.
+
+        Pages by primary key rather than offset, so rows updated (and thereby
+        dropped from a stale-only queryset) never shift the next page.
+        """
+        last_pk = None
+        while True:
+            page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            rows = list(page[:batch_size])
+            if not rows:
+                return
+            yield rows
+            last_pk = rows[-1].pk
+
+    @staticmethod
+    def _rerender(model, rows, processes):
+        # Render every distinct text of the batch at once so it is
+        # deduplicated and spread over the render pool.
+        texts = [
+            getattr(obj, source)
+            for obj in rows
+            for source in model.markdown_fields
+        ]
+        rendered = dict(zip(texts, render_markdown_many(texts, processes=processes)))
+        for obj in rows:
+            obj.render_markdown_fields(rendered=rendered)
+
+        # bulk_update skips save() so auto_now timestamps are not bumped
+        # by what is purely a cache refresh.
+        fields = list(model.markdown_fields.values()) + ['markdown_version']
+        model._default_manager.bulk_update(rows, fields)
+
+    @staticmethod
+    def _markdown_models():
+        return [
+            model for model in apps.get_models()
+            if issubclass(model, RenderedMarkdownModel)
+        ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+from core.models import backfill_markdown_html
+
+# Markdown source -> HTML column of each model, as in ``markdown_fields``.
+MARKDOWN_FIELDS = {
+    'About': {'content': 'content_html'},
+    'Project': {'description': 'description_html'},
+    'Experience': {'description': 'description_html'},
+    'Summary': {'content': 'content_html'},
+    'Certification': {'description': 'description_html'},
+    'Education': {'description': 'description_html'},
+}
+
+
+def backfill(apps, schema_editor):
+    # Rows saved before the HTML columns existed hold '' until rendered.
+    for model_name, markdown_fields in MARKDOWN_FIELDS.items():
+        backfill_markdown_html(apps.get_model('portfolio', model_name), markdown_fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0007_about_content_html_about_markdown_version_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
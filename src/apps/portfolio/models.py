@@ -1,9 +1,14 @@
 from django.db import models
 
-class About(models.Model):
+from core.models import RenderedMarkdownModel
+
+class About(RenderedMarkdownModel):
     """Model for storing personal information in the about section"""
+    markdown_fields = {'content': 'content_html'}
+
     title = models.CharField(max_length=100, default="About Me")
     content = models.TextField(help_text="Write your personal description in markdown format")
+    content_html = models.TextField(blank=True, default='', editable=False)
     profile_image = models.ImageField(upload_to='portfolio/', blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -30,10 +35,13 @@ class Skill(models.Model):
         verbose_name = "Skill"
         verbose_name_plural = "Skills"
 
-class Project(models.Model):
+class Project(RenderedMarkdownModel):
     """Model for storing portfolio projects"""
+    markdown_fields = {'description': 'description_html'}
+
     title = models.CharField(max_length=200)
     description = models.TextField(help_text="Project description in markdown format")
+    description_html = models.TextField(blank=True, default='', editable=False)
     image = models.ImageField(upload_to='portfolio/projects/', blank=True, null=True)
     github_url = models.URLField(blank=True, null=True, help_text="GitHub repository URL")
     live_url = models.URLField(blank=True, null=True, help_text="Live project URL")
@@ -64,11 +72,14 @@ class SocialSettings(models.Model):
         verbose_name = "Social Settings"
         verbose_name_plural = "Social Settings"
 
-class Experience(models.Model):
+class Experience(RenderedMarkdownModel):
     """Model for storing work experience"""
+    markdown_fields = {'description': 'description_html'}
+
     company = models.CharField(max_length=200, help_text="Company name")
     position = models.CharField(max_length=200, help_text="Job title/position")
     description = models.TextField(help_text="Job description and achievements in markdown format")
+    description_html = models.TextField(blank=True, default='', editable=False)
     location = models.CharField(max_length=200, blank=True, null=True, help_text="Job location (city, country)")
     start_date = models.DateField(help_text="Start date of employment")
     end_date = models.DateField(blank=True, null=True, help_text="End date (leave empty if current)")
@@ -104,10 +115,13 @@ class Experience(models.Model):
         verbose_name = "Work Experience"
         verbose_name_plural = "Work Experiences"
 
-class Summary(models.Model):
+class Summary(RenderedMarkdownModel):
     """Model for storing professional summary/bio"""
+    markdown_fields = {'content': 'content_html'}
+
     title = models.CharField(max_length=200, default="Professional Summary", help_text="Section title")
     content = models.TextField(help_text="Professional summary in markdown format")
+    content_html = models.TextField(blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -118,8 +132,10 @@ class Summary(models.Model):
         verbose_name = "Professional Summary"
         verbose_name_plural = "Professional Summary"
 
-class Certification(models.Model):
+class Certification(RenderedMarkdownModel):
     """Model for storing certifications and courses"""
+    markdown_fields = {'description': 'description_html'}
+
     name = models.CharField(max_length=200, help_text="Certification or course name")
     issuing_organization = models.CharField(max_length=200, help_text="Organization that issued the certification")
     issue_date = models.DateField(help_text="Date when certification was issued")
@@ -127,6 +143,7 @@ class Certification(models.Model):
     credential_id = models.CharField(max_length=200, blank=True, null=True, help_text="Credential ID or certificate number")
     credential_url = models.URLField(blank=True, null=True, help_text="URL to verify credential")
     description = models.TextField(blank=True, null=True, help_text="Brief description in markdown format")
+    description_html = models.TextField(blank=True, default='', editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -146,8 +163,10 @@ class Certification(models.Model):
         verbose_name = "Certification"
         verbose_name_plural = "Certifications"
 
-class Education(models.Model):
+class Education(RenderedMarkdownModel):
     """Model for storing education history"""
+    markdown_fields = {'description': 'description_html'}
+
     institution = models.CharField(max_length=200, help_text="Educational institution name")
     degree = models.CharField(max_length=200, help_text="Degree or diploma obtained")
     field_of_study = models.CharField(max_length=200, help_text="Major or field of study")
@@ -156,6 +175,7 @@ class Education(models.Model):
     current = models.BooleanField(default=False, help_text="Currently studying here")
     grade = models.CharField(max_length=100, blank=True, null=True, help_text="GPA or grade (e.g., '3.8/4.0', 'First Class')")
     description = models.TextField(blank=True, null=True, help_text="Additional details in markdown format")
+    description_html = models.TextField(blank=True, default='', editable=False)
     institution_url = models.URLField(blank=True, null=True, help_text="Institution website URL")
     location = models.CharField(max_length=200, blank=True, null=True, help_text="Institution location (city, country)")
     created_at = models.DateTimeField(auto_now_add=True)
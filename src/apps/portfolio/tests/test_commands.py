@@ -0,0 +1,71 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.blog.models import BlogPost
+from apps.portfolio.models import About, Project
+from core.markdown import RENDERER_VERSION, render_markdown_many
+
+
+class RerenderMarkdownCommandTest(TestCase):
+    def _run(self, *args):
+        out = StringIO()
+        call_command('rerender_markdown', *args, stdout=out)
+        return out.getvalue()
+
+    def test_rerenders_stale_rows(self):
+        about = About.objects.create(title="About", content="**Bold**")
+        About.objects.filter(pk=about.pk).update(content_html='', markdown_version=0)
+
+        self._run()
+
+        about.refresh_from_db()
+        self.assertIn("<strong>Bold</strong>", about.content_html)
+        self.assertEqual(about.markdown_version, RENDERER_VERSION)
+
+    def test_skips_current_rows_without_force(self):
+        Project.objects.create(title="P", description="*x*", technologies="T")
+        output = self._run()
+        self.assertIn("Re-rendered 0 rows", output)
+
+    def test_force_rerenders_everything(self):
+        Project.objects.create(title="P", description="*x*", technologies="T")
+        BlogPost.objects.create(title="Post", slug="post", content="text")
+        output = self._run('--force')
+        self.assertIn("Re-rendered 2 rows", output)
+
+    def test_does_not_bump_updated_at(self):
+        about = About.objects.create(title="About", content="text")
+        About.objects.filter(pk=about.pk).update(markdown_version=0)
+        original = About.objects.get(pk=about.pk).updated_at
+
+        self._run()
+
+        self.assertEqual(About.objects.get(pk=about.pk).updated_at, original)
+
+    def test_renders_with_a_process_pool(self):
+        Project.objects.create(title="P", description="*x*", technologies="T")
+        with patch(
+            'apps.portfolio.management.commands.rerender_markdown.render_markdown_many',
+            wraps=render_markdown_many,
+        ) as render_many:
+            self._run('--force', '--processes', '3')
+        self.assertEqual(render_many.call_args.kwargs['processes'], 3)
+
+    def test_rerenders_in_batches(self):
+        for number in range(5):
+            Project.objects.create(title=f"P{number}", description=f"*{number}*", technologies="T")
+        Project.objects.update(description_html='', markdown_version=0)
+
+        with patch(
+            'apps.portfolio.management.commands.rerender_markdown.render_markdown_many',
+            wraps=render_markdown_many,
+        ) as render_many:
+            output = self._run('--batch-size', '2')
+
+        self.assertIn("portfolio.Project: 5 re-rendered", output)
+        self.assertEqual(render_many.call_count, 3)
+        self.assertFalse(Project.objects.exclude(markdown_version=RENDERER_VERSION).exists())
+        self.assertIn("<em>4</em>", Project.objects.get(title="P4").description_html)
@@ -1,9 +1,13 @@
+import importlib
 import time
 from datetime import date as real_date
 from unittest.mock import patch
 
+from django.apps import apps
 from django.test import TestCase
 
+from core.markdown import RENDERER_VERSION
+
 from apps.portfolio.models import (
     About,
     Certification,
@@ -22,6 +26,19 @@ class AboutModelTest(TestCase):
         about = About.objects.create(title="About Luis", content="Some content")
         self.assertEqual(str(about), "About Luis")
 
+    def test_content_html_rendered_on_save(self):
+        about = About.objects.create(title="About Me", content="**Bold**")
+        about.refresh_from_db()
+        self.assertIn("<strong>Bold</strong>", about.content_html)
+        self.assertEqual(about.markdown_version, RENDERER_VERSION)
+
+    def test_content_html_rerendered_with_update_fields(self):
+        about = About.objects.create(title="About Me", content="old")
+        about.content = "*new*"
+        about.save(update_fields=["content"])
+        about.refresh_from_db()
+        self.assertIn("<em>new</em>", about.content_html)
+
     def test_auto_timestamps_set(self):
         about = About.objects.create(title="About Me", content="Content")
         self.assertIsNotNone(about.created_at)
@@ -194,6 +211,10 @@ class CertificationModelTest(TestCase):
         cert = self._make(real_date(2024, 1, 1))
         self.assertEqual(str(cert), "AWS Certified - Amazon")
 
+    def test_description_html_empty_without_description(self):
+        cert = self._make(real_date(2024, 1, 1))
+        self.assertEqual(cert.description_html, "")
+
     def test_is_expired_when_expiry_in_past(self):
         cert = self._make(real_date(2020, 1, 1), expiry_date=real_date(2025, 1, 1))
         with patch('datetime.date') as mock_date:
@@ -288,3 +309,28 @@ class LeadModelTest(TestCase):
         self.assertEqual(lead.name, "Test User")
         self.assertEqual(lead.email, "test@example.com")
         self.assertEqual(Lead.objects.count(), 1)
+
+
+class BackfillMarkdownMigrationTest(TestCase):
+    """The data migration that fills the HTML columns of existing rows."""
+
+    def test_backfills_rows_saved_before_the_html_columns(self):
+        migration = importlib.import_module(
+            'apps.portfolio.migrations.0008_backfill_markdown_html'
+        )
+        project = Project.objects.create(title="P", description="*x*", technologies="T")
+        summary = Summary.objects.create(title="S", content="**Bold**")
+        # As left by the AddField migration.
+        Project.objects.update(description_html='', markdown_version=0)
+        Summary.objects.update(content_html='', markdown_version=0)
+        updated_at = Project.objects.get().updated_at
+
+        # The live registry stands in for the historical models.
+        migration.backfill(apps, None)
+
+        project.refresh_from_db()
+        summary.refresh_from_db()
+        self.assertIn("<em>x</em>", project.description_html)
+        self.assertIn("<strong>Bold</strong>", summary.content_html)
+        self.assertEqual(project.markdown_version, RENDERER_VERSION)
+        self.assertEqual(project.updated_at, updated_at)
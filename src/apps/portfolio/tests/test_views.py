@@ -1,10 +1,11 @@
 import json
 import secrets
+import tempfile
 from datetime import date
 from unittest.mock import MagicMock, patch
 
 from django.core.signing import TimestampSigner
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from apps.portfolio.models import (
@@ -172,7 +173,7 @@ class TestExperienceListView(TestCase):
         cert = self._make_certification(description=None)
         response = self.client.get(reverse('portfolio:experience_list'))
         certs = list(response.context['certifications'])
-        self.assertFalse(hasattr(certs[0], 'description_html'))
+        self.assertEqual(certs[0].description_html, '')
 
     def test_context_contains_education_list_with_description_html(self):
         self._make_education(description='**Study** notes')
@@ -253,6 +254,14 @@ class TestDownloadCVView(TestCase):
         self.assertEqual(response.status_code, 500)
 
 
+def _write_fake_pdf(target, **kwargs):
+    if isinstance(target, str):
+        with open(target, 'wb') as fh:
+            fh.write(b'%PDF-1.7 cv')
+    else:
+        target.write(b'%PDF-1.7 cv')
+
+
 class TestGeneratePDFView(TestCase):
     URL = '/generate-pdf/'
 
@@ -311,3 +320,91 @@ class TestGeneratePDFView(TestCase):
 
         self.assertEqual(response.status_code, 500)
         self.assertIn(b'We had some errors', response.content)
+
+    def _get_pdf(self, token, **headers):
+        with patch('apps.cv_assistant.services.pdf_generator.HTML') as mock_html, \
+             patch('apps.cv_assistant.services.pdf_generator.get_template') as mock_get_template:
+            mock_template = MagicMock()
+            mock_template.render.return_value = '<html><body>CV</body></html>'
+            mock_get_template.return_value = mock_template
+            mock_html.return_value.write_pdf.side_effect = _write_fake_pdf
+
+            response = self.client.get(self.URL + f'?token={token}', headers=headers)
+        return response, mock_html
+
+    def test_pdf_response_has_etag_and_length(self):
+        token = TimestampSigner().sign(secrets.token_hex(16))
+        response, _ = self._get_pdf(token)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.getvalue(), b'%PDF-1.7 cv')
+        self.assertEqual(response['Content-Length'], str(len(b'%PDF-1.7 cv')))
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="cv.pdf"')
+        self.assertTrue(response['ETag'].startswith('"'))
+
+    def test_matching_if_none_match_returns_304(self):
+        token = TimestampSigner().sign(secrets.token_hex(16))
+        first, _ = self._get_pdf(token)
+
+        response, mock_html = self._get_pdf(token, if_none_match=first['ETag'])
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], first['ETag'])
+        mock_html.assert_not_called()
+
+    def test_cached_pdf_skips_weasyprint(self):
+        token = TimestampSigner().sign(secrets.token_hex(16))
+        with override_settings(PDF_CACHE_DIR=tempfile.mkdtemp(), PDF_CACHE_MAX_BYTES=1024 * 1024):
+            self._get_pdf(token)
+            response, mock_html = self._get_pdf(token)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response.getvalue(), b'%PDF-1.7 cv')
+        mock_html.assert_not_called()
+
+    def test_async_miss_returns_202_and_job_status(self):
+        from apps.cv_assistant.models import PdfRenderJob
+
+        token = TimestampSigner().sign(secrets.token_hex(16))
+        with override_settings(PDF_CACHE_DIR=tempfile.mkdtemp(), PDF_CACHE_MAX_BYTES=1024 * 1024,
+                               PDF_RENDER_ASYNC=True):
+            response, mock_html = self._get_pdf(token)
+
+            self.assertEqual(response.status_code, 202)
+            mock_html.assert_not_called()
+            data = response.json()
+            status_response = self.client.get(data['status_url'])
+
+        self.assertEqual(status_response.status_code, 200)
+        self.assertEqual(status_response.json()['status'], PdfRenderJob.STATUS_QUEUED)
+        self.assertEqual(PdfRenderJob.objects.get(pk=data['job_id']).status, PdfRenderJob.STATUS_QUEUED)
+
+    def test_async_pdf_larger_than_the_cache_is_still_served(self):
+        from apps.cv_assistant.models import PdfRenderJob
+        from apps.cv_assistant.services import pdf_jobs
+
+        token = TimestampSigner().sign(secrets.token_hex(16))
+        # The whole cache budget is smaller than one PDF.
+        with override_settings(PDF_CACHE_DIR=tempfile.mkdtemp(), PDF_CACHE_MAX_BYTES=4,
+                               PDF_RENDER_ASYNC=True):
+            queued, _ = self._get_pdf(token)
+            with patch('apps.cv_assistant.services.pdf_generator.HTML') as mock_html:
+                mock_html.return_value.write_pdf.side_effect = _write_fake_pdf
+                job = pdf_jobs.process_next()
+            response, mock_html = self._get_pdf(token)
+
+        self.assertEqual(queued.status_code, 202)
+        self.assertEqual(job.status, PdfRenderJob.STATUS_DONE)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.getvalue(), b'%PDF-1.7 cv')
+        mock_html.assert_not_called()
+        self.assertEqual(PdfRenderJob.objects.count(), 1)
+
+    def test_job_status_requires_token(self):
+        from apps.cv_assistant.models import PdfRenderJob
+
+        job = PdfRenderJob.objects.create(digest='0' * 64)
+        response = self.client.get(reverse('portfolio:generate_pdf_status', args=[job.pk]))
+        self.assertEqual(response.status_code, 403)
+
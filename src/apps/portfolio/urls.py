@@ -9,4 +9,5 @@ urlpatterns = [
     path('experience/', views.ExperienceListView.as_view(), name='experience_list'),
     path('download-cv/', views.DownloadCVView.as_view(), name='download_cv'),
     path('generate-pdf/', views.GeneratePDFView.as_view(), name='generate_pdf'),
+    path('generate-pdf/jobs/<int:job_id>/', views.GeneratePDFStatusView.as_view(), name='generate_pdf_status'),
 ]
\ No newline at end of file
@@ -1,14 +1,18 @@
 from django.shortcuts import render, get_object_or_404
 from django.views.generic import TemplateView, View
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, HttpResponse, JsonResponse
 from django.template.loader import get_template
 from django.core.signing import TimestampSigner
+from django.urls import reverse
+from django.utils.http import parse_etags, quote_etag
 from weasyprint import HTML
 from .models import About, Skill, Project, Experience, Summary, Certification, Education, Lead, SocialSettings
 from apps.cv_assistant.services.cv_builder import build_cv_context
-from apps.cv_assistant.services.pdf_generator import generate_cv_pdf
+from apps.cv_assistant.models import PdfRenderJob
+from apps.cv_assistant.services import pdf_cache, pdf_jobs
+from apps.cv_assistant.services.pdf_generator import html_to_pdf, render_cv_html
 from django.conf import settings
-from core.markdown import render_markdown
+import io
 import json
 import requests
 import secrets
@@ -23,8 +27,8 @@ class HomeView(TemplateView):
         # Get about section (most recent one)
         about = About.objects.first()
         if about:
-            # Convert markdown content to HTML for about section
-            context['about_html'] = render_markdown(about.content)
+            # Pre-rendered on save (see core.models.RenderedMarkdownModel)
+            context['about_html'] = about.content_html
         context['about'] = about
         
         # Get skills grouped by category
@@ -36,12 +40,8 @@ class HomeView(TemplateView):
             skills_by_category[skill.category].append(skill)
         context['skills_by_category'] = skills_by_category
         
-        # Get projects (featured first) and process markdown
-        projects = Project.objects.all()
-        for project in projects:
-            # Convert markdown description to HTML for project cards
-            project.description_html = render_markdown(project.description)
-        context['projects'] = projects
+        # Get projects (featured first); description_html is stored on save
+        context['projects'] = Project.objects.all()
         
         return context
 
@@ -52,8 +52,7 @@ class ProjectDetailView(TemplateView):
     def get_context_data(self, pk, **kwargs):
         context = super().get_context_data(**kwargs)
         project = get_object_or_404(Project, pk=pk)
-        # Convert markdown description to HTML
-        context['project_description_html'] = render_markdown(project.description)
+        context['project_description_html'] = project.description_html
         context['project'] = project
         return context
 
@@ -67,32 +66,18 @@ class ExperienceListView(TemplateView):
         # Get professional summary
         summary = Summary.objects.first()
         if summary:
-            # Convert markdown content to HTML
-            context['summary_html'] = render_markdown(summary.content)
+            context['summary_html'] = summary.content_html
         context['summary'] = summary
         
-        # Get all experiences ordered by start date (most recent first)
-        experiences = Experience.objects.all()
-        for experience in experiences:
-            # Convert markdown description to HTML
-            experience.description_html = render_markdown(experience.description)
-        context['experiences'] = experiences
+        # Get all experiences ordered by start date (most recent first).
+        # The description_html columns are rendered on save.
+        context['experiences'] = Experience.objects.all()
         
         # Get all certifications ordered by issue date (most recent first)
-        certifications = Certification.objects.all()
-        for certification in certifications:
-            if certification.description:
-                # Convert markdown description to HTML
-                certification.description_html = render_markdown(certification.description)
-        context['certifications'] = certifications
+        context['certifications'] = Certification.objects.all()
         
         # Get all education entries ordered by start date (most recent first)
-        education_list = Education.objects.all()
-        for education in education_list:
-            if education.description:
-                # Convert markdown description to HTML
-                education.description_html = render_markdown(education.description)
-        context['education_list'] = education_list
+        context['education_list'] = Education.objects.all()
         
         context['recaptcha_public_key'] = settings.RECAPTCHA_PUBLIC_KEY
         
@@ -160,12 +145,49 @@ class GeneratePDFView(View):
         context = build_cv_context()
         context['user'] = request.user
 
-        # Generate PDF using the reusable WeasyPrint service.
+        # The PDF is cached on disk keyed by the hash of its HTML, so only
+        # the first download after a portfolio change pays for WeasyPrint.
         try:
-            response = HttpResponse(content_type='application/pdf')
-            response['Content-Disposition'] = 'attachment; filename="cv.pdf"'
-            pdf_bytes = generate_cv_pdf(context)
-            response.write(pdf_bytes)
+            html = render_cv_html(context)
+            digest = pdf_cache.html_digest(html)
+            etag = quote_etag(digest)
+
+            if etag in parse_etags(request.headers.get('If-None-Match', '')):
+                response = HttpResponse(status=304)
+                response['ETag'] = etag
+                return response
+
+            pdf_file = pdf_cache.open_pdf(digest)
+            if pdf_file is None and pdf_jobs.is_async():
+                # Hand the render to the worker; the frontend polls the job
+                # and requests this URL again once the PDF is cached.
+                job = pdf_jobs.enqueue(html)
+                status_url = reverse('portfolio:generate_pdf_status', args=[job.pk])
+                return JsonResponse(
+                    {
+                        'job_id': job.pk,
+                        'status': job.status,
+                        'status_url': f'{status_url}?token={token}',
+                    },
+                    status=202,
+                )
+            if pdf_file is None:
+                # Lay the PDF out straight into the cache file, then stream
+                # that file like a hit.
+                if pdf_cache.put_file(digest, lambda path: html_to_pdf(html, output_path=path)):
+                    pdf_file = pdf_cache.open_pdf(digest)
+            if pdf_file is None:
+                # Cache disabled or not writable.
+                pdf_file = io.BytesIO(html_to_pdf(html))
+
+            # FileResponse streams the file in chunks (sendfile through
+            # wsgi.file_wrapper for real files) and sets Content-Length.
+            response = FileResponse(
+                pdf_file, as_attachment=True, filename='cv.pdf', content_type='application/pdf',
+            )
+            response['ETag'] = etag
+            # Token-gated download: browsers may revalidate, shared caches must not store it.
+            response['Cache-Control'] = 'private, no-cache'
         except Exception:
             return HttpResponse(
                 'We had some errors generating your PDF. Please try again later.',
@@ -173,3 +195,17 @@ class GeneratePDFView(View):
             )
 
         return response
+
+
+class GeneratePDFStatusView(View):
+    """Report the state of a queued CV render to the download page."""
+
+    def get(self, request, job_id, *args, **kwargs):
+        # Same download token as GeneratePDFView.
+        try:
+            TimestampSigner().unsign(request.GET.get('token', ''), max_age=600)
+        except Exception:
+            return JsonResponse({'error': 'Invalid or expired token.'}, status=403)
+
+        job = get_object_or_404(PdfRenderJob, pk=job_id, cv_version__isnull=True)
+        return JsonResponse({'job_id': job.pk, 'status': job.status})
@@ -40,7 +40,8 @@ def readiness(request):
 def health(request):
     """
     General health check endpoint for manual use or monitoring.
-    Returns detailed health status including database and cache (if configured).
+    Returns detailed health status including database and cache (if configured)
+    and the AI provider circuit breaker and call admission of this process.
     """
     health_status = {
         'status': 'healthy',
@@ -66,5 +67,11 @@ def health(request):
         # Cache not configured or unavailable - not a critical failure
         health_status['checks']['cache'] = 'not_configured'
 
+    # AI provider circuit breaker. An open circuit only disables the CV
+    # assistant, so it is reported without failing the check.
+    from apps.cv_assistant.services import ai_client
+    health_status['checks']['ai_provider'] = ai_client.breaker_state()
+    health_status['checks']['ai_admission'] = ai_client.admission_stats()
+
     status_code = 200 if health_status['status'] == 'healthy' else 503
     return JsonResponse(health_status, status=status_code)
@@ -4,58 +4,384 @@ python-Markdown's codehilite extension only supports a single global
 ``linenums`` setting - there is no per-block way to opt a fenced block out
 of line numbering. We render with ``linenums=True`` for every block (so
 language-labeled blocks get real Pygments highlighting + a numbered
-gutter), then post-process the HTML to strip the gutter back out of blocks
-that produced no highlighted tokens (i.e. unlabeled blocks such as ASCII
-diagrams).
+gutter) through a Pygments formatter that drops the gutter, per block and
+at render time, when the block produced no highlighted tokens (i.e.
+unlabeled blocks such as ASCII diagrams).
+
+Rendering is pure in (source text, extension config), so results are cached
+by a hash of both: a bounded in-process LRU sits in front of Django's cache
+framework, and ``render_cache_stats()`` exposes the hit/miss counters. Bump
+``RENDERER_VERSION`` whenever the output for a given input changes so stale
+fragments in the shared cache are never served.
+
+``markdown.markdown()`` builds a new ``Markdown`` instance (and re-instantiates
+every extension) per call, so each worker thread instead keeps one engine
+per rendering profile and ``reset()``s it between documents. Pygments lexers
+and formatters are likewise cached per language instead of being resolved
+and built for every fenced block; ``highlight_cache_stats()`` reports how
+effective that is.
+
+Every entry point takes a rendering ``profile``: ``web`` for the site and
+``pdf`` for the CV PDF. Profiles share the engines, caches and counters;
+only the extension config (and therefore the cache key) differs.
+
+``render_markdown_many()`` renders a batch: duplicates are rendered once,
+cached entries are served from the cache and, past
+``MARKDOWN_PARALLEL_THRESHOLD`` misses, the rest are rendered in a process
+pool of ``MARKDOWN_PROCESS_WORKERS`` processes. That is 0 (no pool) by
+default so web workers do not each spawn renderers; batch jobs such as the
+``rerender_markdown`` command pass ``processes`` to opt in.
 """
+import functools
+import hashlib
+import json
+import multiprocessing
 import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 import markdown
+from django.conf import settings
+from django.core.cache import cache
+from markdown.extensions import codehilite
+from pygments.formatters.html import HtmlFormatter
+from pygments.lexers import get_lexer_by_name
+from pygments.util import ClassNotFound
 
-_BLOCK_RE = re.compile(
-    r'<div class="codehilite"><table class="codehilitetable">.*?</table></div>',
-    re.DOTALL,
-)
+from core.cache import LRUCache
 
-_CODE_CELL_RE = re.compile(
-    r'^<div class="codehilite"><table class="codehilitetable">'
-    r'<tr><td class="linenos">.*?</td><td class="code">(?P<code>.*)</td></tr>'
-    r'</table></div>$',
-    re.DOTALL,
-)
+RENDERER_VERSION = 1
 
 _TOKEN_SPAN_RE = re.compile(r'<span class="[a-zA-Z0-9]+">')
 
-_PRE_RE = re.compile(r'<pre>.*</pre>', re.DOTALL)
 
+class SelectiveLinenosFormatter(HtmlFormatter):
+    """``HtmlFormatter`` that only keeps the line-number table for blocks
+    with highlighted tokens.
+
+    Lines are formatted once; if none of them carries a token class (or a
+    highlighted-line marker) the block falls back to a plain ``<pre>``
+    before any wrapping happens, so no HTML is ever re-parsed. Instances
+    are reused across blocks, so the decision is re-made on every call.
+    """
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._table_linenos = self.linenos == 1
+
+    def _format_lines(self, tokensource):
+        lines = list(super()._format_lines(tokensource))
+        if self._table_linenos:
+            self.linenos = 1 if self._has_highlighting(lines) else 0
+        return iter(lines)
+
+    def _has_highlighting(self, lines):
+        if any(index + 1 in self.hl_lines for index in range(len(lines))):
+            return True
+        return any(_TOKEN_SPAN_RE.search(line) for _, line in lines)
+
+
+def _freeze(options):
+    """Turn codehilite's option dict into a hashable cache key."""
+    return tuple(sorted(
+        (name, tuple(value) if isinstance(value, list) else value)
+        for name, value in options.items()
+    ))
+
+
+_lexer_cache = LRUCache(maxsize=128)
+_formatter_cache = LRUCache(maxsize=256)
+_NO_LEXER = object()
+
+
+def _cached_get_lexer_by_name(alias, **options):
+    """Drop-in for ``pygments.lexers.get_lexer_by_name`` with a cache.
+
+    Unknown aliases are cached too: resolving them makes Pygments scan the
+    installed plugin entry points, by far the most expensive lookup.
+    """
+    key = ((alias or '').lower(), _freeze(options))
+    lexer = _lexer_cache.get(key)
+    if lexer is None:
+        try:
+            lexer = get_lexer_by_name(alias, **options)
+        except ClassNotFound:
+            lexer = _NO_LEXER
+        _lexer_cache.set(key, lexer)
+    if lexer is _NO_LEXER:
+        raise ClassNotFound(f'no lexer for alias {alias!r} found')
+    return lexer
+
+
+def _cached_formatter(**options):
+    """``pygments_formatter`` factory handing codehilite a cached formatter.
 
-def render_markdown(text):
+    ``SelectiveLinenosFormatter`` toggles ``linenos`` while formatting, so
+    instances are cached per thread.
+    """
+    key = (threading.get_ident(), _freeze(options))
+    formatter = _formatter_cache.get(key)
+    if formatter is None:
+        formatter = SelectiveLinenosFormatter(**options)
+        _formatter_cache.set(key, formatter)
+    return formatter
+
+
+# codehilite resolves lexers through its own module-level import of
+# get_lexer_by_name; rebinding it is the only hook python-Markdown offers
+# short of re-implementing the fenced_code preprocessor.
+codehilite.get_lexer_by_name = _cached_get_lexer_by_name
+
+_EXTENSIONS = ['extra', 'codehilite']
+_EXTENSION_CONFIGS = {
+    'codehilite': {
+        'guess_lang': False,
+        'linenums': True,
+        'pygments_formatter': _cached_formatter,
+    },
+}
+
+# Rendering profiles: (extensions, extension_configs). ``web`` is the site
+# flavor; ``pdf`` is the plain flavor the CV PDF has always used.
+_PROFILES = {
+    'web': (_EXTENSIONS, _EXTENSION_CONFIGS),
+    'pdf': ([], {}),
+}
+
+# Folded into every cache key so a config change can never serve HTML that
+# was produced by a different set of extensions (or another profile).
+_CONFIG_FINGERPRINTS = {
+    profile: json.dumps(
+        [RENDERER_VERSION, profile, extensions, extension_configs],
+        sort_keys=True,
+        default=lambda obj: '{}.{}'.format(obj.__module__, obj.__qualname__),
+    )
+    for profile, (extensions, extension_configs) in _PROFILES.items()
+}
+
+_thread_state = threading.local()
+
+_local_cache = LRUCache(maxsize=getattr(settings, 'MARKDOWN_CACHE_SIZE', 512))
+_stats_lock = threading.Lock()
+_shared_hits = 0
+_misses = 0
+
+_process_pool = None
+_process_pool_size = None
+_process_pool_lock = threading.Lock()
+
+
+def render_markdown(text, profile='web'):
+    """Render markdown ``text`` to HTML, from the render cache when possible.
+
+    ``profile`` is ``'web'`` (the site flavor: extra, syntax highlighting)
+    or ``'pdf'`` (the plain flavor of the CV PDF).
+    """
     if not text:
         return ''
-    html = markdown.markdown(
-        text,
-        extensions=['extra', 'codehilite'],
-        extension_configs={'codehilite': {'guess_lang': False, 'linenums': True}},
-    )
-    return _strip_linenos_from_plain_blocks(html)
 
+    key = _cache_key(text, profile)
+    html = _cache_lookup(key)
+    if html is None:
+        html = _render(text, profile)
+        _cache_store(key, html)
+    return html
+
+
+def render_markdown_many(texts, profile='web', processes=None):
+    """Render a batch of markdown texts, returning HTML in input order.
+
+    Equal texts are rendered once and cached ones are not rendered at all.
+    When at least ``MARKDOWN_PARALLEL_THRESHOLD`` texts miss the cache they
+    are rendered in a shared pool of ``processes`` processes (defaults to
+    ``MARKDOWN_PROCESS_WORKERS``; 0 renders in this process).
+    """
+    texts = list(texts)
+    rendered = {}
+    misses = []
+    for text in dict.fromkeys(text for text in texts if text):
+        key = _cache_key(text, profile)
+        html = _cache_lookup(key)
+        if html is None:
+            misses.append((text, key))
+        else:
+            rendered[text] = html
+
+    if misses:
+        htmls = _render_batch([text for text, _ in misses], profile, processes)
+        for (text, key), html in zip(misses, htmls):
+            _cache_store(key, html)
+            rendered[text] = html
+
+    return [rendered[text] if text else '' for text in texts]
+
+
+def render_pdf_markdown(text):
+    """Render ``text`` with the plain flavor used by the CV PDF (cached)."""
+    return render_markdown(text, profile='pdf')
+
+
+def render_cache_stats():
+    """Return hit/miss counters for the render cache.
+
+    ``local_hits`` are served from the in-process LRU, ``shared_hits`` from
+    Django's cache and ``misses`` are actual markdown renders.
+    """
+    local = _local_cache.stats()
+    with _stats_lock:
+        shared_hits, misses = _shared_hits, _misses
+    return {
+        'hits': local['hits'] + shared_hits,
+        'local_hits': local['hits'],
+        'shared_hits': shared_hits,
+        'misses': misses,
+        'size': local['size'],
+        'maxsize': local['maxsize'],
+    }
+
+
+def highlight_cache_stats():
+    """Return hit/miss counters for the Pygments lexer and formatter caches."""
+    return {
+        'lexers': _lexer_cache.stats(),
+        'formatters': _formatter_cache.stats(),
+    }
+
+
+def clear_render_cache():
+    """Empty the in-process LRU and reset the counters.
+
+    Entries in Django's cache are left alone: they are content-addressed, so
+    they can never be stale for the current ``RENDERER_VERSION``.
+    """
+    global _shared_hits, _misses
+    _local_cache.clear()
+    with _stats_lock:
+        _shared_hits = 0
+        _misses = 0
+
+
+def _cache_lookup(key):
+    """Return cached HTML for ``key`` (LRU, then Django's cache) or None.
+
+    A ``None`` result is counted as a miss: the caller is about to render.
+    """
+    global _shared_hits, _misses
+    html = _local_cache.get(key)
+    if html is not None:
+        return html
+
+    html = _shared_cache_get(key)
+    with _stats_lock:
+        if html is None:
+            _misses += 1
+        else:
+            _shared_hits += 1
+    if html is not None:
+        _local_cache.set(key, html)
+    return html
+
+
+def _cache_store(key, html):
+    _shared_cache_set(key, html)
+    _local_cache.set(key, html)
+
+
+def _cache_key(text, profile='web'):
+    digest = hashlib.sha256()
+    digest.update(_CONFIG_FINGERPRINTS[profile].encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(text.encode('utf-8'))
+    return 'markdown:{}:{}'.format(RENDERER_VERSION, digest.hexdigest())
+
+
+def _shared_cache_get(key):
+    try:
+        return cache.get(key)
+    except Exception:
+        # A broken shared cache must never break page rendering.
+        return None
+
+
+def _shared_cache_set(key, html):
+    try:
+        cache.set(key, html, getattr(settings, 'MARKDOWN_CACHE_TIMEOUT', 86400))
+    except Exception:
+        pass
+
+
+def _get_engine(profile):
+    """Return this thread's ``Markdown`` instance for ``profile``.
+
+    ``Markdown`` objects are not thread-safe, hence one per thread rather
+    than one per process.
+    """
+    engines = _thread_state.__dict__.setdefault('engines', {})
+    engine = engines.get(profile)
+    if engine is None:
+        extensions, extension_configs = _PROFILES[profile]
+        engine = markdown.Markdown(
+            extensions=extensions,
+            extension_configs=extension_configs,
+        )
+        engines[profile] = engine
+    return engine
+
+
+def _convert(text, profile):
+    engine = _get_engine(profile)
+    try:
+        return engine.convert(text)
+    finally:
+        engine.reset()
+
+
+def _render(text, profile='web'):
+    return _convert(text, profile)
+
+
+def _render_batch(texts, profile='web', processes=None):
+    if processes is None:
+        processes = getattr(settings, 'MARKDOWN_PROCESS_WORKERS', 0)
+    threshold = getattr(settings, 'MARKDOWN_PARALLEL_THRESHOLD', 32)
+    if processes <= 0 or threshold <= 0 or len(texts) < threshold:
+        return [_render(text, profile) for text in texts]
 
-def _strip_linenos_from_plain_blocks(html):
-    return _BLOCK_RE.sub(_strip_block_if_plain, html)
+    render = functools.partial(_render, profile=profile)
+    try:
+        return list(_get_process_pool(processes).map(render, texts, chunksize=8))
+    except (BrokenProcessPool, OSError):
+        # Losing the pool (OOM-killed child, fd exhaustion...) must not lose
+        # the render: drop it so the next batch starts a fresh one.
+        _shutdown_process_pool()
+        return [_render(text, profile) for text in texts]
 
 
-def _strip_block_if_plain(match):
-    block = match.group(0)
-    cell_match = _CODE_CELL_RE.match(block)
-    if not cell_match:
-        return block
+def _get_process_pool(processes):
+    """Return the lazily started, process-wide render pool of ``processes``.
 
-    code_cell = cell_match.group('code')
-    if _TOKEN_SPAN_RE.search(code_cell):
-        return block
+    ``spawn`` rather than ``fork``: the web workers are multi-threaded, and
+    forking a threaded process can deadlock the child on inherited locks.
+    """
+    global _process_pool, _process_pool_size
+    with _process_pool_lock:
+        if _process_pool is not None and _process_pool_size != processes:
+            # Batches already submitted to the old pool still finish.
+            _process_pool.shutdown(wait=False)
+            _process_pool = None
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            _process_pool_size = processes
+        return _process_pool
 
-    pre_match = _PRE_RE.search(code_cell)
-    if not pre_match:
-        return block
 
-    return '<div class="codehilite">{}</div>'.format(pre_match.group(0))
+def _shutdown_process_pool():
+    global _process_pool, _process_pool_size
+    with _process_pool_lock:
+        pool, _process_pool, _process_pool_size = _process_pool, None, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,87 @@
+"""Abstract model helpers shared across apps."""
+from django.db import models
+
+from core.markdown import RENDERER_VERSION, render_markdown, render_markdown_many
+
+
+class RenderedMarkdownModel(models.Model):
+    """Persist pre-rendered HTML next to markdown source fields.
+
+    Subclasses map each markdown field to the column holding its HTML in
+    ``markdown_fields`` (e.g. ``{'content': 'content_html'}``). The HTML is
+    rendered on every save and ``markdown_version`` records the
+    ``core.markdown.RENDERER_VERSION`` that produced it, so the
+    ``rerender_markdown`` command can find rows rendered by an older
+    renderer. Reads then never touch the markdown pipeline.
+    """
+
+    markdown_fields = {}
+
+    markdown_version = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def clean_markdown_html(self, html):
+        """Post-process rendered HTML before it is stored. Override to sanitize."""
+        return html
+
+    def render_markdown_field(self, text):
+        return self.clean_markdown_html(render_markdown(text))
+
+    def render_markdown_fields(self, rendered=None):
+        """Fill every HTML column from its markdown source.
+
+        ``rendered`` optionally maps source text to HTML already produced by
+        ``core.markdown.render_markdown_many()`` for a whole batch of rows.
+        """
+        for source, target in self.markdown_fields.items():
+            text = getattr(self, source)
+            if rendered is not None and text in rendered:
+                html = self.clean_markdown_html(rendered[text])
+            else:
+                html = self.render_markdown_field(text)
+            setattr(self, target, html)
+        self.markdown_version = RENDERER_VERSION
+
+    @property
+    def markdown_is_stale(self):
+        return self.markdown_version != RENDERER_VERSION
+
+    def save(self, *args, **kwargs):
+        self.render_markdown_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = (
+                set(update_fields)
+                | set(self.markdown_fields.values())
+                | {'markdown_version'}
+            )
+        super().save(*args, **kwargs)
+
+
+def backfill_markdown_html(model, markdown_fields, batch_size=200):
+    """Render the HTML columns of rows whose ``markdown_version`` is stale.
+
+    For data migrations, which only get historical models: those lack the
+    ``RenderedMarkdownModel`` methods, so the source-to-HTML column map is
+    passed in. Rows are paged by primary key and written with
+    ``bulk_update``, leaving ``auto_now`` timestamps alone.
+    """
+    stale = model._default_manager.exclude(markdown_version=RENDERER_VERSION).order_by('pk')
+    last_pk = None
+    while True:
+        page = stale if last_pk is None else stale.filter(pk__gt=last_pk)
+        rows = list(page[:batch_size])
+        if not rows:
+            return
+        texts = [getattr(obj, source) for obj in rows for source in markdown_fields]
+        rendered = dict(zip(texts, render_markdown_many(texts)))
+        for obj in rows:
+            for source, target in markdown_fields.items():
+                setattr(obj, target, rendered[getattr(obj, source)])
+            obj.markdown_version = RENDERER_VERSION
+        model._default_manager.bulk_update(
+            rows, list(markdown_fields.values()) + ['markdown_version'],
+        )
+        last_pk = rows[-1].pk
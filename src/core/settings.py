@@ -154,6 +154,55 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cache
+# LocMem (per process) by default. Point CACHE_BACKEND/CACHE_LOCATION at a
+# shared backend (e.g. Redis or Memcached) so every gunicorn worker shares
+# the same cached fragments.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+# Markdown render cache (see core/markdown.py)
+MARKDOWN_CACHE_SIZE = config('MARKDOWN_CACHE_SIZE', default=512, cast=int)
+MARKDOWN_CACHE_TIMEOUT = config('MARKDOWN_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+# Batches with at least this many uncached texts render in a process pool of
+# MARKDOWN_PROCESS_WORKERS processes. 0 (the default) keeps web workers from
+# each spawning renderers; the rerender_markdown command opts in itself.
+MARKDOWN_PARALLEL_THRESHOLD = config('MARKDOWN_PARALLEL_THRESHOLD', default=32, cast=int)
+MARKDOWN_PROCESS_WORKERS = config('MARKDOWN_PROCESS_WORKERS', default=0, cast=int)
+
+# Base CV context snapshot cache (see apps/cv_assistant/services/cv_builder.py).
+# Keyed by a version token stored in the database and replaced on portfolio
+# model changes, so no worker serves a stale snapshot whatever the backend.
+# 0 disables it.
+CV_CONTEXT_CACHE_TIMEOUT = config('CV_CONTEXT_CACHE_TIMEOUT', default=60 * 60, cast=int)
+
+# Content-addressed cache of rendered CV PDFs (see
+# apps/cv_assistant/services/pdf_cache.py). Kept outside MEDIA_ROOT because
+# nginx serves media publicly. Least recently used files are pruned past
+# PDF_CACHE_MAX_BYTES; 0 disables the cache.
+PDF_CACHE_DIR = config('PDF_CACHE_DIR', default=str(BASE_DIR / '.cache' / 'pdf'))
+PDF_CACHE_MAX_BYTES = config('PDF_CACHE_MAX_BYTES', default=50 * 1024 * 1024, cast=int)
+
+# Background PDF rendering (see apps/cv_assistant/services/pdf_jobs.py). When
+# enabled, cache misses are queued for the `render_pdf_jobs` worker and the
+# endpoints answer 202 with a job id. Requires the PDF cache to be enabled
+# and shared with the worker.
+PDF_RENDER_ASYNC = config('PDF_RENDER_ASYNC', default=False, cast=bool)
+PDF_JOB_STALE_AFTER = config('PDF_JOB_STALE_AFTER', default=300, cast=int)
+PDF_JOB_MAX_ATTEMPTS = config('PDF_JOB_MAX_ATTEMPTS', default=3, cast=int)
+
+# Pre-warmed WeasyPrint renderer processes (see
+# apps/cv_assistant/services/pdf_pool.py), started lazily per web/worker
+# process. Each renderer holds its own WeasyPrint + fonts in memory.
+# 0 renders in-process. PDF_RENDER_TIMEOUT is per job, in seconds, and stays
+# below gunicorn's --timeout 120.
+PDF_RENDER_POOL_SIZE = config('PDF_RENDER_POOL_SIZE', default=1, cast=int)
+PDF_RENDER_TIMEOUT = config('PDF_RENDER_TIMEOUT', default=60, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -195,3 +244,60 @@ AI_BASE_URL = config('AI_BASE_URL', default='https://api.openai.com/v1')
 AI_MODEL = config('AI_MODEL', default='gpt-4o-mini')
 AI_TEMPERATURE = config('AI_TEMPERATURE', default=0.7, cast=float)
 AI_MAX_TOKENS = config('AI_MAX_TOKENS', default=4000, cast=int)
+
+# Shared HTTP connection pool of the AI client (see
+# apps/cv_assistant/services/ai_client.py). Timeouts are in seconds and
+# apply to each attempt.
+AI_TIMEOUT = config('AI_TIMEOUT', default=60.0, cast=float)
+AI_CONNECT_TIMEOUT = config('AI_CONNECT_TIMEOUT', default=10.0, cast=float)
+AI_MAX_CONNECTIONS = config('AI_MAX_CONNECTIONS', default=10, cast=int)
+AI_MAX_KEEPALIVE_CONNECTIONS = config('AI_MAX_KEEPALIVE_CONNECTIONS', default=5, cast=int)
+AI_KEEPALIVE_EXPIRY = config('AI_KEEPALIVE_EXPIRY', default=60.0, cast=float)
+
+# Resilience of AI calls. Transient failures are retried up to
+# AI_MAX_RETRIES times with exponential backoff (AI_RETRY_BACKOFF doubling up
+# to AI_RETRY_BACKOFF_MAX seconds), all within AI_DEADLINE seconds per call;
+# keep the deadline below gunicorn's --timeout. After AI_BREAKER_FAILURES
+# failed calls in a row, calls fail fast with 503 for
+# AI_BREAKER_RESET_TIMEOUT seconds (0 disables the breaker).
+AI_DEADLINE = config('AI_DEADLINE', default=90.0, cast=float)
+AI_MAX_RETRIES = config('AI_MAX_RETRIES', default=2, cast=int)
+AI_RETRY_BACKOFF = config('AI_RETRY_BACKOFF', default=0.5, cast=float)
+AI_RETRY_BACKOFF_MAX = config('AI_RETRY_BACKOFF_MAX', default=8.0, cast=float)
+AI_BREAKER_FAILURES = config('AI_BREAKER_FAILURES', default=5, cast=int)
+AI_BREAKER_RESET_TIMEOUT = config('AI_BREAKER_RESET_TIMEOUT', default=30.0, cast=float)
+
+# Admission control of AI calls, so the assistant cannot take every request
+# thread from the public pages (3 workers x 2 threads in docker-compose).
+# At most AI_MAX_IN_FLIGHT sync calls run at once per process and, with a
+# shared CACHE_BACKEND, AI_CLUSTER_MAX_IN_FLIGHT across all workers (0 = no
+# limit). The async endpoints (ASGI service) pin no thread; their per-process
+# limit is AI_ASYNC_MAX_IN_FLIGHT. Waiting sync calls hold their request
+# thread, so keep AI_QUEUE_TIMEOUT (seconds) short; calls still waiting after
+# it get a 503.
+AI_MAX_IN_FLIGHT = config('AI_MAX_IN_FLIGHT', default=1, cast=int)
+AI_ASYNC_MAX_IN_FLIGHT = config('AI_ASYNC_MAX_IN_FLIGHT', default=0, cast=int)
+AI_CLUSTER_MAX_IN_FLIGHT = config('AI_CLUSTER_MAX_IN_FLIGHT', default=0, cast=int)
+AI_QUEUE_TIMEOUT = config('AI_QUEUE_TIMEOUT', default=5.0, cast=float)
+
+# Per-process cache of AI replies, keyed by a hash of the request (see
+# apps/cv_assistant/services/ai_client.py). 0 entries disables it. Only
+# temperature 0 requests are cached unless AI_RESPONSE_CACHE_FORCE is set.
+AI_RESPONSE_CACHE_SIZE = config('AI_RESPONSE_CACHE_SIZE', default=0, cast=int)
+AI_RESPONSE_CACHE_TIMEOUT = config('AI_RESPONSE_CACHE_TIMEOUT', default=60 * 60, cast=int)
+AI_RESPONSE_CACHE_FORCE = config('AI_RESPONSE_CACHE_FORCE', default=False, cast=bool)
+
+# Estimated tokens of context sent per chat turn / CV generation (see
+# apps/cv_assistant/services/cv_adapter.py). The system prompt and the newest
+# user message always go out; older turns are dropped to fit.
+AI_CONTEXT_TOKEN_BUDGET = config('AI_CONTEXT_TOKEN_BUDGET', default=12000, cast=int)
+
+# Rolling per-job conversation summaries (see
+# apps/cv_assistant/services/conversation_summary.py). Once AI_SUMMARY_EVERY
+# messages wait beyond the AI_SUMMARY_KEEP_RECENT newest ones, they are
+# folded into the stored summary (0 disables). Updates run on a background
+# thread unless AI_SUMMARY_BACKGROUND is off.
+AI_SUMMARY_EVERY = config('AI_SUMMARY_EVERY', default=10, cast=int)
+AI_SUMMARY_KEEP_RECENT = config('AI_SUMMARY_KEEP_RECENT', default=6, cast=int)
+AI_SUMMARY_MAX_TOKENS = config('AI_SUMMARY_MAX_TOKENS', default=500, cast=int)
+AI_SUMMARY_BACKGROUND = config('AI_SUMMARY_BACKGROUND', default=True, cast=bool)
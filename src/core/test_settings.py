@@ -11,3 +11,30 @@ DATABASES = {
 MEDIA_ROOT = tempfile.mkdtemp(prefix='test-media-')
 
 PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Test transactions roll back without post_delete signals, so a cached base
+# CV snapshot would leak between tests. Caching tests opt back in.
+CV_CONTEXT_CACHE_TIMEOUT = 0
+
+# The on-disk PDF cache would serve one test's PDF to the next; the cache
+# tests enable it with a temporary directory.
+PDF_CACHE_DIR = tempfile.mkdtemp(prefix='test-pdf-cache-')
+PDF_CACHE_MAX_BYTES = 0
+PDF_RENDER_ASYNC = False
+
+# Render in-process so tests can patch WeasyPrint.
+PDF_RENDER_POOL_SIZE = 0
+
+# Summaries would call the AI provider from chat tests; the summary tests
+# enable them against a local stub.
+AI_SUMMARY_EVERY = 0
+AI_SUMMARY_BACKGROUND = False
+
+# Failed AI calls in one test must not open the process-wide circuit
+# breaker for the next; the breaker tests enable it.
+AI_BREAKER_FAILURES = 0
+AI_RETRY_BACKOFF = 0
+
+# Concurrency tests would queue behind the in-flight limit; the admission
+# tests enable it.
+AI_MAX_IN_FLIGHT = 0
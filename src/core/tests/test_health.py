@@ -1,6 +1,8 @@
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
+
+from apps.cv_assistant.services import ai_client
 
 
 class TestLiveness(TestCase):
@@ -88,3 +90,25 @@ class TestHealth(TestCase):
         self.assertEqual(data['status'], 'unhealthy')
         self.assertIn('database', data['checks'])
         self.assertTrue(data['checks']['database'].startswith('error:'))
+
+    def test_ai_provider_circuit_is_reported(self):
+        data = self.client.get('/health').json()
+        self.assertEqual(data['checks']['ai_provider']['state'], 'closed')
+
+    @override_settings(AI_BREAKER_FAILURES=1)
+    def test_open_circuit_does_not_fail_health(self):
+        self.addCleanup(ai_client.reset_breaker)
+        with self.assertLogs('apps.cv_assistant.services.ai_client', 'WARNING'):
+            ai_client._breaker.record_failure()
+        response = self.client.get('/health')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], 'healthy')
+        self.assertEqual(data['checks']['ai_provider']['state'], 'open')
+        self.assertEqual(data['checks']['ai_provider']['consecutive_failures'], 1)
+
+    @override_settings(AI_MAX_IN_FLIGHT=2)
+    def test_ai_admission_is_reported(self):
+        data = self.client.get('/health').json()
+        self.assertEqual(data['checks']['ai_admission']['max_in_flight'], 2)
+        self.assertEqual(data['checks']['ai_admission']['in_flight'], 0)
@@ -230,26 +230,87 @@
         area.appendChild(loading);
         area.scrollTop = area.scrollHeight;
 
-        apiCall('POST', 'jobs/' + state.selectedJobId + '/messages/', { content: content })
-            .then(function (resp) {
+        // Streamed reply: tokens are appended as they arrive.
+        var reply = null;
+        streamMessage(state.selectedJobId, content, function (event, data) {
+            if (event === 'token') {
                 if (loading.parentNode) loading.parentNode.removeChild(loading);
-                if (Array.isArray(resp) && resp.length > 0) {
-                    // resp is [user_message, assistant_message]
-                    // Replace optimistic with the real assistant reply
-                    area.appendChild(renderMessage(resp[resp.length - 1]));
+                if (!reply) {
+                    reply = renderMessage({ role: 'assistant', content: '' });
+                    reply.insertBefore(document.createTextNode(''), reply.firstChild);
+                    area.appendChild(reply);
                 }
-                area.scrollTop = area.scrollHeight;
-            })
+                reply.firstChild.textContent += data.content;
+            } else if (event === 'done') {
+                // Swap the raw text for the server-rendered message.
+                var final = renderMessage(data);
+                if (reply) area.replaceChild(final, reply);
+                else area.appendChild(final);
+                reply = final;
+            } else if (event === 'error') {
+                var err = new Error(data.detail);
+                err.data = data;
+                throw err;
+            }
+            area.scrollTop = area.scrollHeight;
+        })
             .catch(function (err) {
-                if (loading.parentNode) loading.parentNode.removeChild(loading);
                 showError(err.data ? JSON.stringify(err.data) : err.message);
             })
             .then(function () {
+                if (loading.parentNode) loading.parentNode.removeChild(loading);
                 state.sending = false;
                 $('send-btn').disabled = false;
             });
     }
 
+    // POST a chat message and feed the Server-Sent Events of the reply to
+    // onEvent(event, data) as they arrive.
+    function streamMessage(jobId, content, onEvent) {
+        var headers = {
+            'Accept': 'text/event-stream',
+            'Content-Type': 'application/json'
+        };
+        var csrf = getCSRFToken();
+        if (csrf) headers['X-CSRFToken'] = csrf;
+        return fetch(API_BASE + 'jobs/' + jobId + '/messages/stream/', {
+            method: 'POST',
+            headers: headers,
+            credentials: 'same-origin',
+            body: JSON.stringify({ content: content })
+        }).then(function (resp) {
+            if (resp.status >= 400) {
+                return resp.json().then(function (data) {
+                    var err = new Error('API Error ' + resp.status);
+                    err.data = data;
+                    err.status = resp.status;
+                    throw err;
+                });
+            }
+            var reader = resp.body.getReader();
+            var decoder = new TextDecoder();
+            var buffer = '';
+            function read() {
+                return reader.read().then(function (result) {
+                    buffer += decoder.decode(result.value || new Uint8Array(), { stream: !result.done });
+                    var blocks = buffer.split('\n\n');
+                    buffer = blocks.pop();
+                    blocks.forEach(function (block) {
+                        var event = 'message';
+                        var data = '';
+                        block.split('\n').forEach(function (line) {
+                            if (line.indexOf('event: ') === 0) event = line.slice(7);
+                            else if (line.indexOf('data: ') === 0) data += line.slice(6);
+                        });
+                        if (data) onEvent(event, JSON.parse(data));
+                    });
+                    if (!result.done) return read();
+                });
+            }
+            return read();
+        });
+    }
+
     // ---- Generate CV ----
     function generateCV() {
         if (!state.selectedJobId) return;
@@ -258,6 +319,14 @@
         btn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Generating...';
         apiCall('POST', 'jobs/' + state.selectedJobId + '/generate-cv/', {})
             .then(function (resp) {
+                // 202: the PDF is rendered by the background worker.
+                if (resp && resp.pdf_job) {
+                    btn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Rendering PDF...';
+                    loadCVVersions(state.selectedJobId);
+                    return waitForPdfJob(resp.pdf_job.id);
+                }
+            })
+            .then(function () {
                 btn.innerHTML = '<i class="fas fa-check"></i> CV Generated';
                 showSystemMessage('CV generated successfully.');
                 loadCVVersions(state.selectedJobId);
@@ -273,6 +342,28 @@
             });
     }
 
+    // ---- PDF render jobs ----
+    function waitForPdfJob(jobId) {
+        return new Promise(function (resolve, reject) {
+            function poll() {
+                apiCall('GET', 'pdf-jobs/' + jobId + '/')
+                    .then(function (job) {
+                        if (job.status === 'done') {
+                            resolve(job);
+                        } else if (job.status === 'failed') {
+                            var err = new Error('PDF rendering failed');
+                            err.data = { detail: job.error || 'PDF rendering failed' };
+                            reject(err);
+                        } else {
+                            setTimeout(poll, 1000);
+                        }
+                    })
+                    .catch(reject);
+            }
+            poll();
+        });
+    }
+
     function showSystemMessage(text) {
         var area = $('messages-area');
         var div = document.createElement('div');